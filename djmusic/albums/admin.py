@@ -1,10 +1,14 @@
 from django import forms
 from django.contrib import messages
 from django.contrib import admin
+from django.utils.html import format_html
 from django.utils.translation import ngettext
 from albums.models import Album, Song
 from django.utils.translation import gettext_lazy as _
-from django.contrib import messages
+from .approval import claim_job, create_job, run_job
+from .paginator import EstimatedCountPaginator
+from .renditions import rendition_urls
+from django.contrib.admin.views.main import ChangeList
 
 class SongInlineFormset(forms.models.BaseInlineFormSet):
 
@@ -42,7 +46,10 @@ class AlbumAdmin(admin.ModelAdmin):
   form = AlbumForm
   inlines = [SongInline]
 
-  list_display = ('album_name', 'is_approved')
+  list_display = ('album_name', 'artist', 'is_approved')
+  list_select_related = ('artist',)
+  paginator = EstimatedCountPaginator
+  show_full_result_count = False
   fields = (('album_name', 'artist'), ('released_at', 'created'), 'cost', 'is_approved', 'modified')
   readonly_fields = ('created', 'modified')
 
@@ -52,7 +59,10 @@ class AlbumAdmin(admin.ModelAdmin):
 
   @admin.action(description='Mark selected albums as approved')
   def make_approved(self, request, queryset):
-    updated = queryset.update(is_approved=True)
+    # Batched like the approval API, see albums.approval
+    job = create_job(album_ids=queryset.values_list('pk', flat=True), requested_by=request.user)
+    claim_job(job)
+    updated = run_job(job).approved
     self.message_user(request, ngettext(
       "%d album was successfully approved",
       "%d albums were successfully approved", updated) % updated, messages.SUCCESS)
@@ -72,13 +82,33 @@ class SongForm(forms.ModelForm):
       'audio_tag': _('Current playable audio')
     }
 
+# Looks the thumbnails of a changelist page up at once (see albums.renditions)
+class SongChangeList(ChangeList):
+  def get_results(self, request):
+    super().get_results(request)
+    urls = rendition_urls(self.result_list)
+    for song in self.result_list:
+      song.thumbnail_url = urls.get(song.pk)
+
+
 @admin.register(Song)
 class SongAdmin(admin.ModelAdmin):
   form = SongForm
-  list_display = ('name', 'image_tag', 'album')
+  list_display = ('name', 'thumbnail', 'album')
+  list_select_related = ('album',)
+  paginator = EstimatedCountPaginator
+  show_full_result_count = False
   fields = ('album', 'name', ('image', 'image_tag'), ('audio', 'audio_tag'))
   readonly_fields = ('image_tag', 'audio_tag')
 
+  def get_changelist(self, request, **kwargs):
+    return SongChangeList
+
+  @admin.display(description='Thumbnail')
+  def thumbnail(self, obj):
+    url = getattr(obj, 'thumbnail_url', None)
+    return format_html('<img src="{}" width="20" />', url) if url else '(No Image)'
+
   def delete_model(self, request, obj) -> None:
     try:
       super().delete_model(request, obj)
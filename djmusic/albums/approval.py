@@ -0,0 +1,137 @@
+import bisect
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Album, ApprovalJob
+from .signals import albums_approved
+
+logger = logging.getLogger(__name__)
+
+# A running job that saved no batch for this long lost its runner (the process
+# was killed), it can be resumed
+STALE_AFTER = timedelta(minutes=10)
+
+
+def create_job(album_ids=None, artist_ids=None, min_id=None, max_id=None, batch_size=1000, requested_by=None):
+  return ApprovalJob.objects.create(
+    # Sorted, so the batches of a job can be found by bisection
+    album_ids=sorted(set(album_ids)) if album_ids is not None else None,
+    artist_ids=sorted(set(artist_ids)) if artist_ids is not None else None,
+    min_id=min_id, max_id=max_id, batch_size=batch_size, requested_by=requested_by
+  )
+
+
+# Approves the next batch of a job in one transaction and returns the number
+# of albums it looked at, 0 once the job is done. A batch is the primary key
+# range (job.last_id, upper]: the next batch_size requested ids, or the next
+# batch_size unapproved albums when the job has no id list. Their rows are
+# locked, updated with a single UPDATE and announced with one albums_approved
+def approve_batch(job):
+  with transaction.atomic():
+    if job.album_ids is not None:
+      start = bisect.bisect_right(job.album_ids, job.last_id)
+      candidates = job.album_ids[start:start + job.batch_size]
+      if not candidates:
+        return 0
+      albums = job.albums(ids=candidates)
+    else:
+      albums = job.albums().filter(pk__gt=job.last_id).order_by('pk')[:job.batch_size]
+    rows = list(albums.select_for_update().values_list('pk', 'artist_id'))
+    if job.album_ids is None:
+      if not rows:
+        return 0
+      candidates = [pk for pk, _ in rows]
+
+    if rows:
+      album_ids = [pk for pk, _ in rows]
+      Album.objects.filter(pk__in=album_ids).update(is_approved=True, modified=timezone.now())
+      albums_approved.send(
+        sender=Album, album_ids=album_ids,
+        approved_per_artist=dict(Counter(artist_id for _, artist_id in rows))
+      )
+    job.last_id = candidates[-1]
+    job.approved += len(rows)
+    job.save(update_fields=['last_id', 'approved', 'modified'])
+    return len(candidates)
+
+
+# Marks the job as running in a single UPDATE, so that only one runner gets
+# it. Returns False when it is done or already running
+def claim_job(job):
+  claimable = Q(status__in=[ApprovalJob.PENDING, ApprovalJob.FAILED]) | \
+    Q(status=ApprovalJob.RUNNING, modified__lt=timezone.now() - STALE_AFTER)
+  claimed = ApprovalJob.objects.filter(claimable, pk=job.pk).update(status=ApprovalJob.RUNNING, error='', modified=timezone.now())
+  # Where the previous runner stopped
+  job.refresh_from_db()
+  return claimed == 1
+
+
+# Runs a claimed job to completion, from where it stopped if it was interrupted
+def run_job(job, progress=None):
+  try:
+    while approve_batch(job):
+      if progress:
+        progress(job)
+  except Exception as e:
+    job.status = ApprovalJob.FAILED
+    job.error = str(e)
+    job.save(update_fields=['status', 'error', 'modified'])
+    raise
+  job.status = ApprovalJob.DONE
+  job.save(update_fields=['status', 'modified'])
+  return job
+
+
+# Runs the jobs created through the API on a local worker pool
+class ApprovalRunner(object):
+
+  def __init__(self):
+    self._executor = None
+    self._pending = set()
+    self._lock = threading.Lock()
+
+  @property
+  def executor(self):
+    with self._lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(
+          max_workers=getattr(settings, 'ALBUM_APPROVAL_WORKERS', 1),
+          thread_name_prefix='album-approvals'
+        )
+      return self._executor
+
+  # After the current transaction commits, so the worker sees the job
+  def schedule(self, job_id):
+    transaction.on_commit(lambda: self._submit(job_id))
+
+  def _submit(self, job_id):
+    future = self.executor.submit(self._run, job_id)
+    with self._lock:
+      self._pending.add(future)
+    future.add_done_callback(self._done)
+
+  def _run(self, job_id):
+    try:
+      run_job(ApprovalJob.objects.get(pk=job_id))
+    except Exception:
+      logger.exception('Approval job %s failed', job_id)
+    finally:
+      close_old_connections()
+
+  def _done(self, future):
+    with self._lock:
+      self._pending.discard(future)
+
+  def wait(self, timeout=None):
+    with self._lock:
+      pending = set(self._pending)
+    wait(pending, timeout=timeout)
+
+
+runner = ApprovalRunner()
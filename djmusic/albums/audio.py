@@ -0,0 +1,166 @@
+import os
+import struct
+from collections import namedtuple
+
+# duration in seconds, bitrate in bits per second, size in bytes
+AudioInfo = namedtuple('AudioInfo', ['duration', 'bitrate', 'sample_rate', 'channels', 'size'])
+
+# Only this much of an MP3 is scanned for the first frame after the ID3 tag
+MP3_SCAN_BYTES = 64 * 1024
+
+
+class InvalidAudioFile(ValueError):
+  pass
+
+
+# Bitrates in kbps indexed by [version is MPEG1][layer][index]
+MP3_BITRATES = {
+  True: {
+    1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+  },
+  False: {
+    1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+  },
+}
+# Sample rates indexed by the version bits (00 MPEG2.5, 10 MPEG2, 11 MPEG1)
+MP3_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+def _parse_mp3_frame_header(header):
+  if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+    return None
+  version = (header[1] >> 3) & 0x03
+  layer = 4 - ((header[1] >> 1) & 0x03)
+  bitrate_index = header[2] >> 4
+  sample_rate_index = (header[2] >> 2) & 0x03
+  if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+    return None
+
+  mpeg1 = version == 3
+  bitrate = MP3_BITRATES[mpeg1][layer][bitrate_index] * 1000
+  sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+  padding = (header[2] >> 1) & 0x01
+  channels = 1 if header[3] >> 6 == 3 else 2
+  if layer == 1:
+    samples = 384
+    length = (12 * bitrate // sample_rate + padding) * 4
+  else:
+    samples = 1152 if (layer == 2 or mpeg1) else 576
+    length = (samples // 8) * bitrate // sample_rate + padding
+  return {
+    'mpeg1': mpeg1, 'bitrate': bitrate, 'sample_rate': sample_rate,
+    'channels': channels, 'samples': samples, 'length': length
+  }
+
+
+def _vbr_frame_count(frame, info):
+  # Xing/Info header follows the side information of the first frame
+  side_info = (32 if info['channels'] == 2 else 17) if info['mpeg1'] else (17 if info['channels'] == 2 else 9)
+  offset = 4 + side_info
+  if frame[offset:offset + 4] in (b'Xing', b'Info'):
+    flags = struct.unpack('>I', frame[offset + 4:offset + 8])[0]
+    if flags & 0x01:
+      return struct.unpack('>I', frame[offset + 8:offset + 12])[0]
+  # Fraunhofer VBRI header is at a fixed offset
+  if frame[36:40] == b'VBRI':
+    return struct.unpack('>I', frame[50:54])[0]
+  return None
+
+
+def read_mp3_info(file, size):
+  file.seek(0)
+  head = file.read(10)
+  start = 0
+  if head[:3] == b'ID3' and len(head) == 10:
+    # Synchsafe tag size, plus the optional footer
+    start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+    if head[5] & 0x10:
+      start += 10
+
+  file.seek(start)
+  data = file.read(MP3_SCAN_BYTES)
+  position = data.find(b'\xff')
+  while position != -1 and position + 4 <= len(data):
+    info = _parse_mp3_frame_header(data[position:position + 4])
+    if info is not None:
+      # A real frame is followed by another one, this avoids false syncs in garbage data
+      following = position + info['length']
+      if following + 4 > len(data) or _parse_mp3_frame_header(data[following:following + 4]) is not None:
+        break
+    position = data.find(b'\xff', position + 1)
+  else:
+    raise InvalidAudioFile('No MPEG audio frame found')
+
+  audio_start = start + position
+  audio_size = size - audio_start
+  file.seek(max(size - 128, 0))
+  if file.read(3) == b'TAG':
+    audio_size -= 128
+
+  frames = _vbr_frame_count(data[position:position + 200], info)
+  if frames:
+    duration = frames * info['samples'] / info['sample_rate']
+    bitrate = int(audio_size * 8 / duration) if duration else info['bitrate']
+  else:
+    duration = audio_size * 8 / info['bitrate']
+    bitrate = info['bitrate']
+  return AudioInfo(duration, bitrate, info['sample_rate'], info['channels'], size)
+
+
+def read_wav_info(file, size):
+  file.seek(0)
+  header = file.read(12)
+  if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+    raise InvalidAudioFile('Not a RIFF/WAVE file')
+
+  fmt = None
+  while True:
+    chunk = file.read(8)
+    if len(chunk) < 8:
+      raise InvalidAudioFile('WAVE file has no data chunk')
+    chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+    if chunk_id == b'fmt ':
+      fmt = file.read(chunk_size)
+      if len(fmt) < 16:
+        raise InvalidAudioFile('Truncated WAVE fmt chunk')
+      file.seek(chunk_size % 2, os.SEEK_CUR)
+    elif chunk_id == b'data':
+      if fmt is None:
+        raise InvalidAudioFile('WAVE data chunk before fmt chunk')
+      # Streamed recordings may leave the size unset
+      data_size = min(chunk_size, size - file.tell())
+      break
+    else:
+      # Chunks are word aligned, skip without reading
+      file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+  _, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+  if not channels or not sample_rate or not byte_rate:
+    raise InvalidAudioFile('Invalid WAVE fmt chunk')
+  return AudioInfo(data_size / byte_rate, byte_rate * 8, sample_rate, channels, size)
+
+
+READERS = {
+  '.mp3': read_mp3_info,
+  '.wav': read_wav_info,
+}
+
+
+# Read the audio properties of a file from its headers only, based on the
+# extension of `name`. Raises InvalidAudioFile if the content doesn't match it
+def read_audio_info(file, name, size=None):
+  reader = READERS.get(os.path.splitext(name)[1].lower())
+  if reader is None:
+    raise InvalidAudioFile('Unsupported file extension.')
+  if size is None:
+    size = file.size
+  try:
+    return reader(file, size)
+  except (struct.error, KeyError, ZeroDivisionError) as e:
+    raise InvalidAudioFile('Malformed audio file') from e
+  finally:
+    file.seek(0)
@@ -0,0 +1,184 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from artists.models import Artist
+from artists.cache import bump_list_version
+from changes import outbox
+from changes.models import Change
+from .models import Album, Song
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+
+
+def read_csv(file):
+  return csv.DictReader(file)
+
+
+def read_ndjson(file):
+  for line in file:
+    if line.strip():
+      yield json.loads(line)
+
+
+def _datetime(value):
+  parsed = parse_datetime(value)
+  if parsed is None:
+    raise ValueError('Invalid datetime %r' % value)
+  if timezone.is_naive(parsed):
+    parsed = timezone.make_aware(parsed)
+  return parsed
+
+
+def _bool(value):
+  if isinstance(value, bool):
+    return value
+  return str(value or '').strip().lower() in TRUE_VALUES
+
+
+# Imports catalogue rows in batches. Every row describes a song, an album
+# (without song columns) or an artist (without album columns):
+#   stage_name, social_link, album_name, released_at, cost, is_approved, song_name, image, audio
+# Artists are upserted on stage_name, albums are matched on (artist, album_name)
+# and songs on (album, song_name, audio), so importing the same file twice
+# doesn't create duplicates. Resolved ids are cached in memory for the whole run
+class CatalogueImporter(object):
+  def __init__(self, batch_size=5000, use_copy=True):
+    self.batch_size = batch_size
+    self.use_copy = use_copy and connection.vendor == 'postgresql'
+    self.artists = {}
+    self.albums = {}
+    self.counts = {'rows': 0, 'artists': 0, 'albums': 0, 'songs': 0}
+    self.changes = []
+
+  def run(self, rows, progress=None):
+    batch = []
+    for row in rows:
+      batch.append(row)
+      if len(batch) >= self.batch_size:
+        self.import_batch(batch)
+        batch = []
+        if progress:
+          progress(self.counts)
+    if batch:
+      self.import_batch(batch)
+      if progress:
+        progress(self.counts)
+    transaction.on_commit(bump_list_version)
+    return self.counts
+
+  def import_batch(self, rows):
+    self.changes = []
+    with transaction.atomic():
+      self.upsert_artists(rows)
+      self.create_albums(rows)
+      self.create_songs(rows)
+      Artist.objects.refresh_album_counts({self.artists[row['stage_name']] for row in rows if row.get('album_name')})
+      # The changes of a batch are added to the outbox with a single insert
+      outbox.insert_changes(self.changes)
+    self.counts['rows'] += len(rows)
+
+  def upsert_artists(self, rows):
+    # The first non-empty link of every artist, rows without one don't erase
+    # the stored link
+    social_links = {}
+    for row in rows:
+      if not social_links.get(row['stage_name']):
+        social_links[row['stage_name']] = row.get('social_link') or ''
+    # Artists unknown to this run are looked up before the upsert, the ones
+    # still missing afterwards are the created ones
+    missing = [name for name in social_links if name not in self.artists]
+    self.load_artists(missing)
+    existing = [self.artists[name] for name, link in social_links.items() if link and name in self.artists]
+    linked = [Artist(stage_name=name, social_link=link) for name, link in social_links.items() if link]
+    if linked:
+      Artist.objects.bulk_create(linked, update_conflicts=True, unique_fields=['stage_name'], update_fields=['social_link'])
+    unlinked = [Artist(stage_name=name) for name, link in social_links.items() if not link]
+    if unlinked:
+      Artist.objects.bulk_create(unlinked, ignore_conflicts=True)
+    created = [name for name in missing if name not in self.artists]
+    self.load_artists(created)
+    self.changes += outbox.build_changes(Artist, Change.UPDATED, existing, fields=['social_link'])
+    self.changes += outbox.build_changes(Artist, Change.CREATED, [self.artists[name] for name in created])
+    self.counts['artists'] += len(missing)
+
+  def load_artists(self, names):
+    for start in range(0, len(names), 500):
+      self.artists.update(Artist.objects.filter(stage_name__in=names[start:start + 500]).values_list('stage_name', 'id'))
+
+  def create_albums(self, rows):
+    wanted = {}
+    for row in rows:
+      if row.get('album_name'):
+        key = (self.artists[row['stage_name']], row['album_name'])
+        if key not in self.albums:
+          wanted.setdefault(key, row)
+    if not wanted:
+      return
+
+    artist_ids = {artist_id for artist_id, _ in wanted}
+    for album_id, artist_id, album_name in Album.objects.filter(artist_id__in=artist_ids) \
+        .values_list('id', 'artist_id', 'album_name').iterator():
+      self.albums.setdefault((artist_id, album_name), album_id)
+
+    new = [
+      Album(
+        artist_id=key[0], album_name=key[1], released_at=_datetime(row['released_at']),
+        cost=Decimal(str(row['cost'])), is_approved=_bool(row.get('is_approved'))
+      )
+      for key, row in wanted.items() if key not in self.albums
+    ]
+    # Plain querysets, the outbox managers would insert the changes separately
+    for album in models.QuerySet(Album).bulk_create(new, batch_size=self.batch_size):
+      self.albums[(album.artist_id, album.album_name)] = album.id
+    self.changes += outbox.build_changes(Album, Change.CREATED, [album.id for album in new])
+    self.counts['albums'] += len(new)
+
+  def create_songs(self, rows):
+    wanted = {}
+    for row in rows:
+      if row.get('album_name') and row.get('audio'):
+        album_id = self.albums[(self.artists[row['stage_name']], row['album_name'])]
+        # Song.save() isn't called, so apply its default name here
+        name = row.get('song_name') or row['album_name']
+        wanted.setdefault((album_id, name, row['audio']), row)
+    if not wanted:
+      return
+
+    existing = set(
+      Song.objects.filter(album_id__in={key[0] for key in wanted})
+      .values_list('album_id', 'name', 'audio').iterator()
+    )
+    now = timezone.now()
+    new = [
+      Song(album_id=album_id, name=name, audio=audio, image=row.get('image') or '', created=now, modified=now)
+      for (album_id, name, audio), row in wanted.items() if (album_id, name, audio) not in existing
+    ]
+    if self.use_copy:
+      self.copy_songs(new)
+    else:
+      models.QuerySet(Song).bulk_create(new, batch_size=self.batch_size)
+      self.changes += outbox.build_changes(Song, Change.CREATED, [song.id for song in new])
+    self.counts['songs'] += len(new)
+
+  # COPY is several times faster than multi-row INSERT for large batches
+  def copy_songs(self, songs):
+    if not songs:
+      return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for song in songs:
+      writer.writerow([song.created.isoformat(), song.modified.isoformat(), song.album_id, song.name, song.image.name, song.audio.name])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+      cursor.cursor.copy_expert(
+        'COPY %s (created, modified, album_id, name, image, audio) FROM STDIN WITH (FORMAT csv)' % Song._meta.db_table,
+        buffer
+      )
+    # COPY doesn't return ids, the songs of a batch share their creation time
+    self.changes += outbox.build_changes(Song, Change.CREATED, Song.objects.filter(
+      album_id__in={song.album_id for song in songs}, created=songs[0].created
+    ).values_list('pk', flat=True))
@@ -0,0 +1,56 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from albums.approval import claim_job, create_job, run_job
+from albums.models import ApprovalJob
+
+class Command(BaseCommand):
+  help = 'Approve albums in batched transactions, resumable with --resume after an interruption'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--ids-file', help='File with one album id per line (a moderation queue export), or - to read from stdin')
+    parser.add_argument('--artist', type=int, action='append', dest='artist_ids', help='Only albums of this artist, can be repeated')
+    parser.add_argument('--min-id', type=int, help='Smallest album id to approve')
+    parser.add_argument('--max-id', type=int, help='Largest album id to approve')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Number of albums approved per transaction')
+    parser.add_argument('--resume', type=int, metavar='JOB_ID', help='Continue an interrupted job')
+
+  def handle(self, *args, **options):
+    if options['resume']:
+      job = ApprovalJob.objects.filter(pk=options['resume']).first()
+      if job is None:
+        raise CommandError('No approval job %d' % options['resume'])
+      if not claim_job(job):
+        raise CommandError('Approval job %d is already %s' % (job.pk, job.status))
+    else:
+      album_ids = self.read_ids(options['ids_file']) if options['ids_file'] else None
+      if album_ids is None and not options['artist_ids'] and options['min_id'] is None and options['max_id'] is None:
+        raise CommandError('Select the albums with --ids-file, --artist, --min-id or --max-id')
+      job = create_job(
+        album_ids=album_ids, artist_ids=options['artist_ids'], min_id=options['min_id'],
+        max_id=options['max_id'], batch_size=options['batch_size']
+      )
+      claim_job(job)
+    self.stdout.write('Approval job %d, resume it with --resume %d if it is interrupted' % (job.pk, job.pk))
+    start = time.monotonic()
+
+    def progress(job):
+      if options['verbosity'] > 1:
+        self.stdout.write('%d albums approved, up to id %d' % (job.approved, job.last_id))
+
+    try:
+      run_job(job, progress=progress)
+    except Exception as e:
+      raise CommandError('Approval job %d failed after album %d: %s' % (job.pk, job.last_id, e))
+    self.stdout.write(self.style.SUCCESS('Approved %d albums in %.1fs' % (job.approved, time.monotonic() - start)))
+
+  def read_ids(self, path):
+    try:
+      file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    except OSError as e:
+      raise CommandError(e)
+    with file:
+      try:
+        return [int(line) for line in file if line.strip()]
+      except ValueError as e:
+        raise CommandError('Invalid album id: %s' % e)
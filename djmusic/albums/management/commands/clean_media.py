@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from albums.media import delete_unreferenced, stored_blobs
+
+class Command(BaseCommand):
+  help = 'Delete the stored song images and audio files no song references'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--hours', type=float, help='Only files not written for this many hours, by default SONG_MEDIA_GRACE_SECONDS')
+
+  def handle(self, *args, **options):
+    grace = None if options['hours'] is None else options['hours'] * 3600
+    deleted = delete_unreferenced(list(stored_blobs()), grace=grace)
+    self.stdout.write(self.style.SUCCESS('Deleted %d unreferenced files' % len(deleted)))
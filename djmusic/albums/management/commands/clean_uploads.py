@@ -0,0 +1,19 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from albums.models import Upload
+from albums.uploads import delete_upload
+
+class Command(BaseCommand):
+  help = 'Delete the chunked uploads that were not finalized, with their partial files'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--hours', type=int, default=24, help='Only uploads without a chunk for this many hours')
+
+  def handle(self, *args, **options):
+    deleted = 0
+    uploads = Upload.objects.filter(song__isnull=True, modified__lt=timezone.now() - timedelta(hours=options['hours']))
+    for upload in uploads.iterator():
+      delete_upload(upload)
+      deleted += 1
+    self.stdout.write(self.style.SUCCESS('Deleted %d abandoned uploads' % deleted))
@@ -0,0 +1,53 @@
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from albums.models import Song
+from albums.audio import read_audio_info, InvalidAudioFile
+
+FIELDS = ('duration', 'bitrate', 'sample_rate', 'channels', 'size')
+
+def read_song_info(song):
+  storage = song.audio.storage
+  try:
+    with storage.open(song.audio.name, 'rb') as file:
+      return song, read_audio_info(file, song.audio.name, storage.size(song.audio.name))
+  except (InvalidAudioFile, OSError) as e:
+    return song, e
+
+class Command(BaseCommand):
+  help = 'Read the audio metadata of stored songs from their file headers in parallel'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--workers', type=int, default=8, help='Number of files read in parallel')
+    parser.add_argument('--batch-size', type=int, default=500, help='Number of songs updated per query')
+    parser.add_argument('--all', action='store_true', help='Also process songs that already have metadata')
+
+  def handle(self, *args, **options):
+    songs = Song.objects.exclude(audio='').only('pk', 'audio').order_by('pk')
+    if not options['all']:
+      songs = songs.filter(duration__isnull=True)
+
+    start = time.monotonic()
+    done = failed = 0
+    iterator = songs.iterator(chunk_size=options['batch_size'])
+    # Reading headers is I/O bound, threads overlap the waits on the storage
+    with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+      while True:
+        batch = list(islice(iterator, options['batch_size']))
+        if not batch:
+          break
+        updated = []
+        for song, info in pool.map(read_song_info, batch):
+          if isinstance(info, Exception):
+            failed += 1
+            self.stderr.write('Song %d (%s): %s' % (song.pk, song.audio.name, info))
+            continue
+          for field in FIELDS:
+            setattr(song, field, getattr(info, field))
+          updated.append(song)
+        done += Song.objects.bulk_update(updated, FIELDS)
+
+    self.stdout.write(self.style.SUCCESS(
+      'Extracted audio metadata of %d songs in %.1fs (%d failed)' % (done, time.monotonic() - start, failed)
+    ))
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from albums.models import Song
+from albums.renditions import generate_song_renditions
+
+class Command(BaseCommand):
+  help = 'Generate the image renditions of all existing songs in parallel'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--workers', type=int, default=4, help='Number of parallel workers')
+    parser.add_argument('--processes', action='store_true', help='Use a process pool instead of threads')
+    parser.add_argument('--force', action='store_true', help='Regenerate renditions that already exist')
+
+  def handle(self, *args, **options):
+    images = Song.objects.exclude(image='').order_by().values_list('image', flat=True).distinct().iterator()
+    if options['processes']:
+      # Worker processes only touch the storage, they must not share the parent's connections
+      images = list(images)
+      connections.close_all()
+      pool = ProcessPoolExecutor(max_workers=options['workers'])
+    else:
+      pool = ThreadPoolExecutor(max_workers=options['workers'])
+
+    start = time.monotonic()
+    done = failed = 0
+    with pool:
+      futures = [pool.submit(generate_song_renditions, image, options['force']) for image in images]
+      for future in as_completed(futures):
+        try:
+          future.result()
+          done += 1
+        except Exception as e:
+          failed += 1
+          self.stderr.write('Could not generate renditions: %s' % e)
+
+    self.stdout.write(self.style.SUCCESS(
+      'Generated renditions for %d images in %.1fs (%d failed)' % (done, time.monotonic() - start, failed)
+    ))
@@ -0,0 +1,40 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from albums.importer import CatalogueImporter, read_csv, read_ndjson
+
+class Command(BaseCommand):
+  help = 'Import artists, albums and songs from a CSV or NDJSON file in batches'
+
+  def add_arguments(self, parser):
+    parser.add_argument('path', help='File to import, or - to read from stdin')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format, guessed from the extension by default')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows imported per transaction')
+    parser.add_argument('--no-copy', action='store_true', help='Use INSERT instead of COPY on PostgreSQL')
+
+  def handle(self, *args, **options):
+    path = options['path']
+    input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    reader = read_ndjson if input_format == 'ndjson' else read_csv
+    importer = CatalogueImporter(batch_size=options['batch_size'], use_copy=not options['no_copy'])
+    start = time.monotonic()
+
+    def progress(counts):
+      elapsed = time.monotonic() - start
+      self.stdout.write('%d rows (%.0f rows/s)' % (counts['rows'], counts['rows'] / elapsed if elapsed else 0))
+
+    try:
+      file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    except OSError as e:
+      raise CommandError(e)
+    with file:
+      try:
+        counts = importer.run(reader(file), progress=progress if options['verbosity'] > 1 else None)
+      except (KeyError, ValueError) as e:
+        raise CommandError('Invalid row: %s' % e)
+
+    elapsed = time.monotonic() - start
+    self.stdout.write(self.style.SUCCESS(
+      'Imported %(rows)d rows: %(artists)d artists, %(albums)d new albums, %(songs)d new songs' % counts
+      + ' in %.1fs (%.0f rows/s)' % (elapsed, counts['rows'] / elapsed if elapsed else 0)
+    ))
@@ -0,0 +1,33 @@
+from django.db.models import Q
+from .models import Song
+from .storage import song_storage
+
+BATCH_SIZE = 500
+
+
+# Deletes the stored files among `names` that no song references anymore,
+# counting the references of a batch of names in one query. Files written or
+# reused in the last `grace` seconds are kept. Returns the deleted names
+def delete_unreferenced(names, grace=None):
+  names = sorted(name for name in set(names) if song_storage.is_blob(name))
+  deleted = []
+  for start in range(0, len(names), BATCH_SIZE):
+    batch = names[start:start + BATCH_SIZE]
+    referenced = set()
+    for image, audio in Song.objects.filter(Q(image__in=batch) | Q(audio__in=batch)).values_list('image', 'audio').iterator():
+      referenced.update((image, audio))
+    deleted += [name for name in batch if name not in referenced and song_storage.delete_stale(name, grace)]
+  return deleted
+
+
+# Names of the content addressed files stored in the song media directories
+def stored_blobs():
+  for field in ('image', 'audio'):
+    directory = Song._meta.get_field(field).upload_to
+    if not song_storage.exists(directory):
+      continue
+    for prefix in song_storage.listdir(directory)[0]:
+      for filename in song_storage.listdir('%s/%s' % (directory, prefix))[1]:
+        name = '%s/%s/%s' % (directory, prefix, filename)
+        if song_storage.is_blob(name):
+          yield name
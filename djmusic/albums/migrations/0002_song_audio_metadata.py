@@ -0,0 +1,44 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:41
+
+import albums.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='bitrate',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='channels',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='duration',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='sample_rate',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='song',
+            name='audio',
+            field=models.FileField(upload_to='song_audio', validators=[albums.validators.validate_audio_file_extension, albums.validators.validate_audio_file_content]),
+        ),
+    ]
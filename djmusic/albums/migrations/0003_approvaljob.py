@@ -0,0 +1,39 @@
+# Generated by Django 4.1.13 on 2026-10-18 11:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('albums', '0002_song_audio_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('album_ids', models.JSONField(blank=True, null=True)),
+                ('artist_ids', models.JSONField(blank=True, null=True)),
+                ('min_id', models.BigIntegerField(blank=True, null=True)),
+                ('max_id', models.BigIntegerField(blank=True, null=True)),
+                ('batch_size', models.PositiveIntegerField(default=1000)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.13 on 2026-10-18 11:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_album_counters'),
+        ('albums', '0004_upload'),
+    ]
+
+    operations = [
+        # The new indexes are created before the foreign key indexes they replace are dropped
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['artist', 'released_at', 'id'], name='album_artist_released_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['artist'], name='album_approved_artist_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['id'], name='album_unapproved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['album', 'created', 'id'], name='song_album_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='album',
+            name='artist',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='artists.artist'),
+        ),
+        migrations.AlterField(
+            model_name='song',
+            name='album',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='albums.album'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 11:42
+
+import albums.storage
+import albums.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0005_catalogue_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='song',
+            name='audio',
+            field=models.FileField(storage=albums.storage.ContentAddressedStorage(), upload_to='song_audio', validators=[albums.validators.validate_audio_file_extension, albums.validators.validate_audio_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='song',
+            name='image',
+            field=models.ImageField(storage=albums.storage.ContentAddressedStorage(), upload_to='song_images'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['image'], name='song_image_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['audio'], name='song_audio_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0006_song_media_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='chunk_started',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
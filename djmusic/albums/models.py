@@ -1,18 +1,31 @@
+import uuid
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from artists.models import Artist
+from changes.outbox import OutboxManager, OutboxMixin
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
+from django.urls import reverse
 from django.utils.html import mark_safe
 
-from .validators import validate_audio_file_extension
+from .validators import validate_audio_file_extension, validate_audio_file_content
+from .audio import read_audio_info, InvalidAudioFile
+from . import renditions
+from .storage import song_storage
 
-class Album(TimeStampedModel):
-  artist = models.ForeignKey(Artist, on_delete=models.CASCADE)
+class Album(OutboxMixin, TimeStampedModel):
+  objects = OutboxManager()
+  # Indexed by album_artist_released_idx
+  artist = models.ForeignKey(Artist, on_delete=models.CASCADE, db_index=False)
   album_name = models.CharField(max_length=200, default='New Album')
   released_at = models.DateTimeField(blank=False)
   cost = models.DecimalField(max_digits=5, decimal_places=2, blank=False)
   is_approved = models.BooleanField(default=False)
+  # Previous values are used to keep Artist album counters in sync
+  tracker = FieldTracker(fields=['artist_id', 'is_approved'])
   # From TimeStampedModel, we have:
   ## created
   ## modified
@@ -20,22 +33,69 @@ class Album(TimeStampedModel):
   def __str__(self):
     return self.album_name
 
+  class Meta:
+    indexes = [
+      # Albums of an artist in their serialized order (artist details, importer, counters)
+      models.Index(fields=['artist', 'released_at', 'id'], name='album_artist_released_idx'),
+      # Approved album counters of the artists
+      models.Index(fields=['artist'], condition=Q(is_approved=True), name='album_approved_artist_idx'),
+      # Approval batches only scan the albums left to approve
+      models.Index(fields=['id'], condition=Q(is_approved=False), name='album_unapproved_idx'),
+    ]
 
-class Song(TimeStampedModel):
-  
-  album = models.ForeignKey(Album, on_delete=models.CASCADE)
+
+class Song(OutboxMixin, TimeStampedModel):
+  objects = OutboxManager()
+  # Indexed by song_album_created_idx
+  album = models.ForeignKey(Album, on_delete=models.CASCADE, db_index=False)
   name = models.CharField(max_length=200, null=True, blank=True)
-  image = models.ImageField(upload_to='song_images', null=False)
-  image_thumbnail = ImageSpecField(source='image', processors=[ResizeToFill(100, 50)], format='JPEG', options={'quality': 60})
-  audio = models.FileField(upload_to='song_audio', validators=[validate_audio_file_extension])
+  # Stored under the hash of their content (see albums.storage)
+  image = models.ImageField(upload_to='song_images', storage=song_storage, null=False)
+  # Renditions are generated in the background when the image is saved
+  # (see albums.renditions), use rendition_url() to avoid waiting on them
+  image_thumbnail = ImageSpecField(source='image', processors=[ResizeToFill(100, 50)], format='JPEG', options={'quality': 60},
+                                   cachefile_backend=renditions.backend, cachefile_strategy=renditions.Eager)
+  image_thumbnail_webp = ImageSpecField(source='image', processors=[ResizeToFill(100, 50)], format='WEBP', options={'quality': 60},
+                                        cachefile_backend=renditions.backend, cachefile_strategy=renditions.Eager)
+  image_cover_webp = ImageSpecField(source='image', processors=[ResizeToFill(300, 300)], format='WEBP', options={'quality': 75},
+                                    cachefile_backend=renditions.backend, cachefile_strategy=renditions.Eager)
+  audio = models.FileField(upload_to='song_audio', storage=song_storage, validators=[validate_audio_file_extension, validate_audio_file_content])
+  # Read from the audio headers when it is uploaded
+  duration = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+  bitrate = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)
+  sample_rate = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)
+  channels = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, db_index=True)
+  size = models.PositiveBigIntegerField(null=True, blank=True, editable=False, db_index=True)
   
     # Default value of song is the album name
   def save(self, *args, **kwargs):
     if self.name is None:
       self.name = self.album.album_name
+    # Only new uploads are parsed, stored files keep their metadata
+    if self.audio and not self.audio._committed:
+      self.set_audio_info(self.audio)
     super(Song, self).save(*args, **kwargs)
+
+  def set_audio_info(self, file):
+    try:
+      info = read_audio_info(file, file.name)
+    except InvalidAudioFile:
+      info = None
+    for field in ('duration', 'bitrate', 'sample_rate', 'channels', 'size'):
+      setattr(self, field, getattr(info, field) if info else None)
+    return info
     
 
+  # URL of a generated rendition, or a placeholder while it is being generated
+  def rendition_url(self, rendition='image_thumbnail'):
+    if not self.image:
+      return None
+    file = getattr(self, rendition)
+    if renditions.is_ready(file):
+      return file.url
+    file.generate()
+    return renditions.placeholder_url()
+
   def image_tag(self):
     if self.image:
         return mark_safe('<img src="%s" width="20" />' % self.image.url)
@@ -44,8 +104,69 @@ class Song(TimeStampedModel):
   image_tag.short_description = 'Thumbnail'
   
   def audio_tag(self):
-    if self.audio:
-        return mark_safe('<audio controls><source src="%s"></audio>' % self.audio.url)
+    if self.audio and self.pk:
+        # The streaming view supports seeking, the plain media URL does not
+        return mark_safe('<audio controls preload="none"><source src="%s"></audio>' % reverse('albums:song_audio', args=[self.pk]))
     else:
         return '(No Image)'
   audio_tag.short_description = 'Audio'
+
+  class Meta:
+    indexes = [
+      # Songs of an album in their serialized and paginated order
+      models.Index(fields=['album', 'created', 'id'], name='song_album_created_idx'),
+      # References of stored files, counted when songs are deleted (see albums.media)
+      models.Index(fields=['image'], name='song_image_idx'),
+      models.Index(fields=['audio'], name='song_audio_idx'),
+    ]
+
+
+# Bulk approval of the unapproved albums matching its criteria (see
+# albums.approval). Albums are processed in primary key order and `last_id`
+# is saved with every batch, so an interrupted job resumes after it
+class ApprovalJob(TimeStampedModel):
+  PENDING = 'pending'
+  RUNNING = 'running'
+  DONE = 'done'
+  FAILED = 'failed'
+  STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+  requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+  album_ids = models.JSONField(null=True, blank=True)
+  artist_ids = models.JSONField(null=True, blank=True)
+  min_id = models.BigIntegerField(null=True, blank=True)
+  max_id = models.BigIntegerField(null=True, blank=True)
+  batch_size = models.PositiveIntegerField(default=1000)
+  status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+  last_id = models.BigIntegerField(default=0)
+  approved = models.PositiveIntegerField(default=0)
+  error = models.TextField(blank=True)
+
+  # Unapproved albums matching the criteria, among `ids` (by default album_ids)
+  def albums(self, ids=None):
+    albums = Album.objects.filter(is_approved=False)
+    ids = self.album_ids if ids is None else ids
+    if ids is not None:
+      albums = albums.filter(pk__in=ids)
+    if self.artist_ids is not None:
+      albums = albums.filter(artist_id__in=self.artist_ids)
+    if self.min_id is not None:
+      albums = albums.filter(pk__gte=self.min_id)
+    if self.max_id is not None:
+      albums = albums.filter(pk__lte=self.max_id)
+    return albums
+
+
+# Chunked upload of a song audio file (see albums.uploads). The chunks are
+# written straight into the file `path` of the audio storage, which is renamed
+# to its content name and becomes the audio of `song` once the upload is finalized
+class Upload(TimeStampedModel):
+  id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+  filename = models.CharField(max_length=200)
+  path = models.CharField(max_length=255)
+  length = models.PositiveBigIntegerField()
+  offset = models.PositiveBigIntegerField(default=0)
+  # Set while a request writes a chunk, see albums.uploads.append_chunk
+  chunk_started = models.DateTimeField(null=True, blank=True, editable=False)
+  song = models.OneToOneField(Song, null=True, blank=True, on_delete=models.SET_NULL)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+# Row count of the table of an unfiltered queryset from the PostgreSQL
+# statistics (pg_class.reltuples, refreshed by VACUUM and ANALYZE), or None
+# when it can't be estimated
+def estimated_count(queryset):
+  connection = connections[queryset.db]
+  query = queryset.query
+  if connection.vendor != 'postgresql' or query.where or query.distinct or query.low_mark or query.high_mark is not None:
+    return None
+  with connection.cursor() as cursor:
+    cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(queryset.model._meta.db_table)])
+    row = cursor.fetchone()
+  # -1 until the table has been analyzed
+  return row[0] if row and row[0] >= 0 else None
+
+
+# Admin paginator that doesn't COUNT(*) unfiltered tables with more than
+# ADMIN_ESTIMATED_COUNT_THRESHOLD rows, the page count is then approximate
+class EstimatedCountPaginator(Paginator):
+  @cached_property
+  def count(self):
+    estimate = estimated_count(self.object_list) if hasattr(self.object_list, 'query') else None
+    if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000):
+      return estimate
+    return super().count
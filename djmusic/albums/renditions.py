@@ -0,0 +1,128 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from imagekit.cachefiles.backends import BaseAsync, CacheFileState
+from imagekit.utils import sanitize_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Every rendition generated for Song.image
+RENDITIONS = ('image_thumbnail', 'image_thumbnail_webp', 'image_cover_webp')
+
+# Served until a rendition has been generated (a 1x1 grey GIF)
+DEFAULT_PLACEHOLDER_URL = 'data:image/gif;base64,R0lGODlhAQABAIAAAMLCwgAAACH5BAAAAAAALAAAAAABAAEAAAICRAEAOw=='
+
+
+# Imagekit cache file backend that generates renditions on a local worker pool
+# instead of inside the request that first accesses them. Pillow releases the
+# GIL while decoding, resizing and encoding, so threads run in parallel here
+class ThreadPoolBackend(BaseAsync):
+
+  def __init__(self):
+    super().__init__()
+    self._executor = None
+    self._pending = set()
+    self._lock = threading.Lock()
+
+  @property
+  def executor(self):
+    with self._lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(
+          max_workers=getattr(settings, 'SONG_RENDITION_WORKERS', 2),
+          thread_name_prefix='song-renditions'
+        )
+      return self._executor
+
+  # The URL of a rendition is cached with its state, so lists of songs (see
+  # rendition_urls) don't ask the storage for every row. The generating state
+  # expires quickly: a rendition whose worker died (the process restarted
+  # with queued jobs) is scheduled again instead of staying a placeholder
+  def set_state(self, file, state):
+    if state == CacheFileState.GENERATING:
+      self.cache.set(self.get_key(file), state, getattr(settings, 'SONG_RENDITION_GENERATING_TIMEOUT', 300))
+    else:
+      super().set_state(file, state)
+    if state == CacheFileState.EXISTS:
+      self.cache.set(url_cache_key(file), file.storage.url(file.name), settings.IMAGEKIT_CACHE_TIMEOUT)
+    else:
+      self.cache.delete(url_cache_key(file))
+
+  def schedule_generation(self, file, force=False):
+    # Mark the file as generating straight away so concurrent requests
+    # keep serving the placeholder instead of scheduling it again
+    self.set_state(file, CacheFileState.GENERATING)
+    future = self.executor.submit(self._generate_in_background, file)
+    with self._lock:
+      self._pending.add(future)
+    future.add_done_callback(self._done)
+
+  def _generate_in_background(self, file):
+    try:
+      self.generate_now(file, force=True)
+    except Exception:
+      logger.exception('Could not generate the rendition %s', file.name)
+      # Allow the next access to schedule it again
+      self.set_state(file, CacheFileState.DOES_NOT_EXIST)
+
+  def _done(self, future):
+    with self._lock:
+      self._pending.discard(future)
+
+  def wait(self, timeout=None):
+    with self._lock:
+      pending = set(self._pending)
+    wait(pending, timeout=timeout)
+
+
+# Cache file strategy that schedules generation as soon as the source image is
+# saved, or when a missing rendition is looked up. Only reading the content of
+# a rendition generates it synchronously
+class Eager(object):
+
+  def on_source_saved(self, file):
+    file.generate()
+
+  def on_existence_required(self, file):
+    file.generate()
+
+  def on_content_required(self, file):
+    file.cachefile_backend.generate_now(file)
+
+
+backend = ThreadPoolBackend()
+
+
+def url_cache_key(file):
+  return sanitize_cache_key('%srendition-url:%s' % (settings.IMAGEKIT_CACHE_PREFIX, file.name))
+
+
+# URLs of a rendition of many songs with one cache query, {song pk: url}.
+# Renditions that aren't known to exist go through Song.rendition_url
+def rendition_urls(songs, rendition='image_thumbnail'):
+  files = {song.pk: (song, getattr(song, rendition)) for song in songs if song.image}
+  keys = {pk: url_cache_key(file) for pk, (_, file) in files.items()}
+  cached = backend.cache.get_many(list(keys.values()))
+  urls = {}
+  for pk, (song, _) in files.items():
+    urls[pk] = cached.get(keys[pk]) or song.rendition_url(rendition)
+  return urls
+
+
+def is_ready(file):
+  return backend.get_state(file) == CacheFileState.EXISTS
+
+
+def placeholder_url():
+  return getattr(settings, 'SONG_IMAGE_PLACEHOLDER_URL', DEFAULT_PLACEHOLDER_URL)
+
+
+# Generate all the renditions of one song image synchronously, module level
+# so that it can be sent to a process pool by the backfill command
+def generate_song_renditions(image_name, force=False):
+  from .models import Song
+  song = Song(image=image_name)
+  for rendition in RENDITIONS:
+    backend.generate_now(getattr(song, rendition), force=force)
+  return image_name
@@ -0,0 +1,100 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+# ?fields=id,album_name,songs.name is parsed to {'id': {}, 'album_name': {}, 'songs': {'name': {}}}
+# where an empty dict selects every field of a nested serializer
+def parse_fields(value):
+  if not value:
+    return None
+  tree = {}
+  for path in value.split(','):
+    node = tree
+    for name in path.strip().split('.'):
+      if name:
+        node = node.setdefault(name, {})
+  return tree or None
+
+
+# Serializer mixin that accepts a `fields` tree and drops every other field,
+# recursing into nested serializers
+class SelectableFieldsMixin(object):
+  def __init__(self, *args, fields=None, **kwargs):
+    super().__init__(*args, **kwargs)
+    if fields:
+      restrict_fields(self, fields)
+
+
+def restrict_fields(serializer, tree):
+  for name in set(serializer.fields) - set(tree):
+    serializer.fields.pop(name)
+  for name, subtree in tree.items():
+    if subtree and name in serializer.fields:
+      nested = serializer.fields[name]
+      nested = getattr(nested, 'child', nested)
+      if isinstance(nested, serializers.Serializer):
+        restrict_fields(nested, subtree)
+
+
+# Restrict a queryset to the columns used by a (possibly restricted) model
+# serializer, and prefetch its nested serializers with the same rule, so the
+# number of queries only depends on the nesting depth.
+# Serializer Meta may declare `field_columns` for fields that are not model
+# fields and `ordering` for the order of a nested (prefetched) list
+def select_for_serializer(queryset, serializer, extra_columns=()):
+  model = queryset.model
+  opts = model._meta
+  relations = {rel.get_accessor_name(): rel for rel in opts.related_objects}
+  field_columns = getattr(serializer.Meta, 'field_columns', {})
+  columns = {opts.pk.name, *extra_columns}
+  prefetches = []
+
+  for name, field in serializer.fields.items():
+    if name in field_columns:
+      columns.update(field_columns[name])
+      continue
+    source = field.source
+    if source in relations:
+      rel = relations[source]
+      child = getattr(field, 'child', field)
+      related_queryset = rel.related_model._default_manager.all()
+      ordering = getattr(child.Meta, 'ordering', None)
+      if ordering:
+        related_queryset = related_queryset.order_by(*ordering)
+      related_queryset = select_for_serializer(
+        related_queryset, child, extra_columns=(rel.field.name, *[o.lstrip('-') for o in ordering or ()])
+      )
+      prefetches.append(Prefetch(source, queryset=related_queryset))
+      continue
+    try:
+      model_field = opts.get_field(source)
+    except FieldDoesNotExist:
+      continue
+    if model_field.concrete:
+      columns.add(model_field.name)
+
+  queryset = queryset.only(*columns)
+  if prefetches:
+    queryset = queryset.prefetch_related(*prefetches)
+  return queryset
+
+
+# View mixin reading ?fields= and applying it to both the serializer and the queryset
+class SelectableFieldsViewMixin(object):
+  def get_selected_fields(self):
+    if not hasattr(self, '_selected_fields'):
+      self._selected_fields = parse_fields(self.request.query_params.get('fields'))
+    return self._selected_fields
+
+  def get_serializer(self, *args, **kwargs):
+    kwargs.setdefault('fields', self.get_selected_fields())
+    return super().get_serializer(*args, **kwargs)
+
+  def select_fields(self, queryset):
+    ordering = getattr(self.pagination_class, 'ordering', None) or ()
+    if isinstance(ordering, str):
+      ordering = (ordering,)
+    return select_for_serializer(queryset, self.get_serializer(), extra_columns=[o.lstrip('-') for o in ordering])
+
+  def get_queryset(self):
+    return self.select_fields(super().get_queryset())
@@ -0,0 +1,84 @@
+from django.db import models
+from django.urls import reverse
+from rest_framework import serializers
+from .models import Album, ApprovalJob, Song, Upload
+from .renditions import rendition_urls
+from .selection import SelectableFieldsMixin
+
+# The thumbnails of a list of songs are looked up with one cache query
+class SongListSerializer(serializers.ListSerializer):
+  def to_representation(self, data):
+    songs = list(data.all() if isinstance(data, models.Manager) else data)
+    if 'thumbnail' in self.child.fields:
+      self.child.thumbnails = rendition_urls(songs)
+    return super().to_representation(songs)
+
+class SongSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
+  thumbnail = serializers.SerializerMethodField()
+  audio = serializers.SerializerMethodField()
+
+  class Meta:
+    model = Song
+    fields = ['id', 'name', 'image', 'thumbnail', 'audio', 'duration', 'bitrate', 'sample_rate', 'channels', 'size', 'created']
+    field_columns = {'thumbnail': ['image'], 'audio': ['audio']}
+    ordering = ['created', 'id']
+    list_serializer_class = SongListSerializer
+
+  # Set by SongListSerializer, {song pk: url} of the songs with an image
+  thumbnails = None
+
+  def get_thumbnail(self, obj):
+    if self.thumbnails is not None and obj.pk in self.thumbnails:
+      return self.thumbnails[obj.pk]
+    return obj.rendition_url()
+
+  # Songs are played through the streaming view rather than the media URL
+  def get_audio(self, obj):
+    if not obj.audio:
+      return None
+    url = reverse('albums:song_audio', args=[obj.pk])
+    request = self.context.get('request')
+    return request.build_absolute_uri(url) if request else url
+
+class AlbumSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
+  class Meta:
+    model = Album
+    fields = ['id', 'artist', 'album_name', 'released_at', 'cost', 'is_approved', 'created']
+    ordering = ['released_at', 'id']
+
+class AlbumWithSongsSerializer(AlbumSerializer):
+  songs = SongSerializer(many=True, read_only=True, source='song_set')
+
+  class Meta(AlbumSerializer.Meta):
+    fields = AlbumSerializer.Meta.fields + ['songs']
+
+class ApprovalJobSerializer(serializers.ModelSerializer):
+  album_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_null=True, write_only=True)
+  # The id list can be long, responses only return its size
+  album_count = serializers.SerializerMethodField()
+  artist_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_null=True)
+  batch_size = serializers.IntegerField(min_value=1, max_value=10000, default=1000)
+
+  class Meta:
+    model = ApprovalJob
+    fields = ['id', 'album_ids', 'album_count', 'artist_ids', 'min_id', 'max_id', 'batch_size', 'status', 'last_id', 'approved', 'error', 'created', 'modified']
+    read_only_fields = ['status', 'last_id', 'approved', 'error']
+
+  def validate(self, data):
+    if all(data.get(name) is None for name in ('album_ids', 'artist_ids', 'min_id', 'max_id')):
+      raise serializers.ValidationError('Select the albums with album_ids, artist_ids, min_id or max_id.')
+    return data
+
+  def get_album_count(self, obj):
+    return len(obj.album_ids) if obj.album_ids is not None else None
+
+class UploadSerializer(serializers.ModelSerializer):
+  class Meta:
+    model = Upload
+    fields = ['id', 'filename', 'length', 'offset', 'song', 'created']
+    read_only_fields = ['offset', 'song']
+
+class FinalizeUploadSerializer(serializers.Serializer):
+  checksum = serializers.CharField(max_length=200)
+  album = serializers.PrimaryKeyRelatedField(queryset=Album.objects.all())
+  name = serializers.CharField(max_length=200, required=False, allow_blank=True)
@@ -1,21 +1,107 @@
-from django.db.models.signals import pre_delete
-from .models import Song
+from django.db import transaction
+from django.db.models.signals import pre_delete, post_save, post_delete
+from django.dispatch import Signal
+from .models import Album, Song
 from django.dispatch import receiver
-from django.db.models import QuerySet
+from django.db.models import QuerySet, F, Count, Q, Case, When, Value
+from weakref import WeakKeyDictionary, WeakSet
+from artists.models import Artist
+from artists.cache import bump_list_version
+from .media import delete_unreferenced
+
+# Sent once per batch of a bulk approval (see albums.approval), inside its
+# transaction, with the `album_ids` approved and `approved_per_artist`
+# ({artist id: number of albums}). Receivers should defer cache updates to on_commit
+albums_approved = Signal()
+
+# Bulk deletes send pre_delete once per song with the same origin queryset,
+# so the guard runs once per delete operation and later songs of it are let
+# through. The mark is dropped once the songs are deleted, a later delete()
+# of the same queryset is checked again
+_validated_origins = WeakSet()
 
 @receiver(pre_delete, sender=Song, weak=True, dispatch_uid='delete')
 def validate_deletion(sender, instance, **kwargs):
-  
-  if(type(kwargs['origin']) is not QuerySet):
-    if(instance.album.song_set.count() == 1):
+  origin = kwargs['origin']
+
+  if isinstance(origin, Song):
+    if not Song.objects.filter(album_id=instance.album_id).exclude(pk=instance.pk).exists():
       raise Exception('Cannot delete the song ' + instance.name + ' because it is the only one belonging to the album ' + instance.album.album_name)
-  else:
-    rem = {}
-    for q in kwargs['origin']:
-      if(q.album.id not in rem):
-        rem[q.album.id] = q.album.song_set.count()
-      rem[q.album.id] -= 1
-      if(rem[q.album.id] == 0):
-        raise Exception('Cannot delete the selected songs because that would leave albums with no songs')
-
-  
\ No newline at end of file
+  elif isinstance(origin, QuerySet) and origin.model is Song:
+    if origin in _validated_origins:
+      return
+    # Remaining songs per affected album in one grouped query
+    emptied_albums = Song.objects.order_by() \
+      .filter(album__in=origin.order_by().values('album')) \
+      .values('album') \
+      .annotate(remaining=Count('pk', filter=~Q(pk__in=origin.order_by().values('pk')))) \
+      .filter(remaining=0)
+    if emptied_albums.exists():
+      raise Exception('Cannot delete the selected songs because that would leave albums with no songs')
+    _validated_origins.add(origin)
+  # Otherwise the songs are cascading from their album being deleted
+
+# Files of the deleted songs, collected per delete operation (cascades
+# included) and deleted after its commit when no other song references them
+_deleted_files = WeakKeyDictionary()
+
+@receiver(pre_delete, sender=Song, dispatch_uid='albums_collect_song_files')
+def collect_song_files(sender, instance, origin=None, **kwargs):
+  _deleted_files.setdefault(origin, set()).update(name for name in (instance.image.name, instance.audio.name) if name)
+
+@receiver(post_delete, sender=Song, dispatch_uid='albums_delete_song_files')
+def delete_song_files(sender, instance, origin=None, using=None, **kwargs):
+  names = _deleted_files.pop(origin, None)
+  if names:
+    transaction.on_commit(lambda: delete_unreferenced(names), using=using)
+
+@receiver(post_delete, sender=Song, dispatch_uid='albums_delete_validated')
+def forget_validated_origin(sender, instance, origin=None, **kwargs):
+  if isinstance(origin, QuerySet):
+    _validated_origins.discard(origin)
+
+@receiver([post_save, post_delete, albums_approved], sender=Album, dispatch_uid='albums_artists_list_cache')
+def invalidate_artists_list(sender, **kwargs):
+  transaction.on_commit(bump_list_version)
+
+@receiver(post_save, sender=Album, dispatch_uid='albums_artist_counters_save')
+def update_artist_counters_on_save(sender, instance, created, **kwargs):
+  approved = int(instance.is_approved)
+  if created:
+    Artist.objects.filter(pk=instance.artist_id).update(
+      album_count=F('album_count') + 1,
+      approved_album_count=F('approved_album_count') + approved
+    )
+    return
+
+  previous_artist = instance.tracker.previous('artist_id')
+  was_approved = int(bool(instance.tracker.previous('is_approved')))
+  if previous_artist != instance.artist_id:
+    Artist.objects.filter(pk=previous_artist).update(
+      album_count=F('album_count') - 1,
+      approved_album_count=F('approved_album_count') - was_approved
+    )
+    Artist.objects.filter(pk=instance.artist_id).update(
+      album_count=F('album_count') + 1,
+      approved_album_count=F('approved_album_count') + approved
+    )
+  elif was_approved != approved:
+    Artist.objects.filter(pk=instance.artist_id).update(
+      approved_album_count=F('approved_album_count') + approved - was_approved
+    )
+
+@receiver(post_delete, sender=Album, dispatch_uid='albums_artist_counters_delete')
+def update_artist_counters_on_delete(sender, instance, **kwargs):
+  Artist.objects.filter(pk=instance.artist_id).update(
+    album_count=F('album_count') - 1,
+    approved_album_count=F('approved_album_count') - int(instance.is_approved)
+  )
+
+@receiver(albums_approved, sender=Album, dispatch_uid='albums_artist_counters_approved')
+def update_artist_counters_on_approval(sender, approved_per_artist, **kwargs):
+  Artist.objects.filter(pk__in=list(approved_per_artist)).update(
+    approved_album_count=F('approved_album_count') + Case(
+      *[When(pk=artist_id, then=Value(count)) for artist_id, count in approved_per_artist.items()],
+      default=Value(0)
+    )
+  )
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import time
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BUFFER_SIZE = 64 * 1024
+BLOB_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+# Content hash URLs never change content, clients and proxies may cache them for good
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def file_digest(path):
+  digest = hashlib.sha256()
+  with open(path, 'rb') as file:
+    for data in iter(lambda: file.read(BUFFER_SIZE), b''):
+      digest.update(data)
+  return digest.hexdigest()
+
+
+# File system storage naming files after the SHA-256 of their content, as
+# <directory>/<2 hex digits>/<64 hex digits><extension>, the directory being
+# the one of the requested name (the upload_to of the field). Files are
+# hashed while they are written to a temporary file, which is renamed to its
+# final name or dropped when the same content is already stored, so identical
+# uploads share one file. Songs referencing a file are counted when one is
+# deleted, see albums.media
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+  # The name depends on the content, so it is chosen by _save
+  def get_available_name(self, name, max_length=None):
+    return name
+
+  def is_blob(self, name):
+    return bool(name and BLOB_RE.search(name))
+
+  def _save(self, name, content):
+    directory = posixpath.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    os.makedirs(self.path(directory), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=self.path(directory), prefix='.', suffix='.part')
+    try:
+      if hasattr(content, 'temporary_file_path'):
+        # Large uploads already are on disk, they are only read to be hashed
+        os.close(fd)
+        digest = file_digest(content.temporary_file_path())
+        file_move_safe(content.temporary_file_path(), temporary, allow_overwrite=True)
+      else:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as file:
+          for chunk in content.chunks(BUFFER_SIZE):
+            data = chunk.encode() if isinstance(chunk, str) else chunk
+            digest.update(data)
+            file.write(data)
+        digest = digest.hexdigest()
+      return self.commit(temporary, directory, digest, extension)
+    finally:
+      if os.path.exists(temporary):
+        os.remove(temporary)
+
+  # Stores the file `name` of this storage under its content name in
+  # `directory`, by renaming it. `digest` is its SHA-256 when already computed
+  def adopt(self, name, directory, digest=None):
+    path = self.path(name)
+    return self.commit(path, directory, digest or file_digest(path), os.path.splitext(name)[1].lower())
+
+  def commit(self, path, directory, digest, extension):
+    name = posixpath.join(directory, digest[:2], digest + extension)
+    target = self.path(name)
+    if os.path.exists(target):
+      # Renews the grace period of a file an orphan cleanup may be looking at
+      os.utime(target)
+      os.remove(path)
+    else:
+      os.makedirs(os.path.dirname(target), exist_ok=True)
+      if self.file_permissions_mode is not None:
+        os.chmod(path, self.file_permissions_mode)
+      os.replace(path, target)
+    return name
+
+  # Deletes a stored file unless it was written or reused in the last `grace`
+  # seconds, by a request whose song may not be committed yet
+  def delete_stale(self, name, grace=None):
+    grace = settings.SONG_MEDIA_GRACE_SECONDS if grace is None else grace
+    path = self.path(name)
+    try:
+      if time.time() - os.stat(path).st_mtime < grace:
+        return False
+      os.remove(path)
+    except FileNotFoundError:
+      return False
+    return True
+
+
+song_storage = ContentAddressedStorage()
@@ -0,0 +1,143 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views import static
+from .storage import BLOB_RE, IMMUTABLE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+  pass
+
+
+# Returns (start, end) with an inclusive end, or None if the whole file should be sent
+def parse_range(header, size):
+  if not header:
+    return None
+  match = RANGE_RE.match(header.strip())
+  # Multiple ranges and other units are allowed to be answered with the full file
+  if not match:
+    return None
+  first, last = match.groups()
+  if not first and not last:
+    return None
+  if not first:
+    # Suffix range: the last N bytes
+    length = int(last)
+    # An empty file has no last bytes either
+    if length == 0 or size == 0:
+      raise RangeNotSatisfiable
+    return max(size - length, 0), size - 1
+  start = int(first)
+  end = min(int(last), size - 1) if last else size - 1
+  if start >= size or start > end:
+    raise RangeNotSatisfiable
+  return start, end
+
+
+# File-like view of `length` bytes of an open file starting at `start`.
+# It exposes fileno() and leaves the OS offset at `start` so that WSGI servers
+# implementing wsgi.file_wrapper can sendfile() the range without copying it
+class RangeFile(object):
+  def __init__(self, file, start, length):
+    file.seek(start)
+    self.file = file
+    self.remaining = length
+
+  def read(self, size=-1):
+    if self.remaining <= 0:
+      return b''
+    if size < 0 or size > self.remaining:
+      size = self.remaining
+    data = self.file.read(size)
+    self.remaining -= len(data)
+    return data
+
+  def fileno(self):
+    return self.file.fileno()
+
+  def close(self):
+    self.file.close()
+
+
+class ChunkedFileResponse(FileResponse):
+  block_size = 64 * 1024
+
+
+def _stat(storage, name):
+  try:
+    stat = os.stat(storage.path(name))
+    return stat.st_size, stat.st_mtime_ns / 1e9
+  except NotImplementedError:
+    # Remote storages have no local path
+    return storage.size(name), storage.get_modified_time(name).timestamp()
+
+
+def _if_range_matches(request, etag, last_modified):
+  if_range = request.headers.get('If-Range')
+  if not if_range:
+    return True
+  if if_range.startswith('"') or if_range.startswith('W/'):
+    return if_range == etag
+  return parse_http_date_safe(if_range) == int(last_modified)
+
+
+# Files of MEDIA_URL served by the development server (see djmusic.urls),
+# content addressed files with their immutable cache headers
+def serve_media(request, path, **kwargs):
+  response = static.serve(request, path, **kwargs)
+  if BLOB_RE.search(path) and response.status_code == 200:
+    response['Cache-Control'] = IMMUTABLE
+  return response
+
+
+# Serve a stored file with Range and conditional GET support.
+# With SONG_AUDIO_SENDFILE set to 'x-accel-redirect' or 'x-sendfile' only the
+# headers are produced and the front proxy sends the bytes (and handles ranges)
+def serve_file(request, storage, name):
+  size, last_modified = _stat(storage, name)
+  if getattr(storage, 'is_blob', None) and storage.is_blob(name):
+    # The content hash, the same on every server
+    etag = '"%s"' % os.path.splitext(os.path.basename(name))[0]
+  else:
+    etag = '"%x-%x"' % (int(last_modified * 1e6), size)
+  content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+  response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+  if response is not None:
+    return response
+
+  sendfile = getattr(settings, 'SONG_AUDIO_SENDFILE', None)
+  if sendfile == 'x-accel-redirect':
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = getattr(settings, 'SONG_AUDIO_ACCEL_PREFIX', '/protected-media/') + quote(name)
+  elif sendfile == 'x-sendfile':
+    response = HttpResponse(content_type=content_type)
+    response['X-Sendfile'] = storage.path(name)
+  else:
+    try:
+      byte_range = parse_range(request.headers.get('Range'), size) if _if_range_matches(request, etag, last_modified) else None
+    except RangeNotSatisfiable:
+      response = HttpResponse(status=416)
+      response['Content-Range'] = 'bytes */%d' % size
+      return response
+
+    file = storage.open(name, 'rb')
+    if byte_range is None:
+      response = ChunkedFileResponse(file, content_type=content_type)
+    else:
+      start, end = byte_range
+      response = ChunkedFileResponse(RangeFile(file, start, end - start + 1), content_type=content_type, status=206)
+      response['Content-Length'] = end - start + 1
+      response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+
+  response['Accept-Ranges'] = 'bytes'
+  response['ETag'] = etag
+  response['Last-Modified'] = http_date(last_modified)
+  return response
@@ -0,0 +1,29 @@
+import pytest
+from django.core.cache import cache
+from albums import renditions
+from .test_factories import AlbumFactory, SongFactory
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  yield
+  # Renditions scheduled by the test are generated before MEDIA_ROOT is restored
+  renditions.backend.wait(timeout=10)
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+  cache.clear()
+  yield
+  cache.clear()
+
+@pytest.fixture
+def create_albums():
+  def batch_create(n = 3, **kwargs):
+    return AlbumFactory.create_batch(n, **kwargs)
+  return batch_create
+
+@pytest.fixture
+def create_songs():
+  def batch_create(n = 3, **kwargs):
+    return SongFactory.create_batch(n, **kwargs)
+  return batch_create
@@ -0,0 +1,40 @@
+import pytest
+from rest_framework.test import APIClient
+from albums import paginator, renditions
+from albums.models import Album, Song
+from .test_factories import SongFactory
+from users.tests.test_factories import UserFactory
+
+@pytest.fixture
+def admin_client():
+  client = APIClient()
+  client.force_login(UserFactory(is_staff=True, is_superuser=True))
+  return client
+
+@pytest.mark.django_db
+def test_song_changelist_thumbnails(admin_client, monkeypatch):
+  # Identical images would share their file and renditions
+  songs = [SongFactory(image__color=color) for color in ('red', 'green', 'blue')]
+  renditions.backend.wait()
+  pending = songs[0]
+  renditions.backend.set_state(pending.image_thumbnail, renditions.CacheFileState.GENERATING)
+  monkeypatch.setattr(renditions.backend, 'schedule_generation', lambda file, force=False: None)
+
+  # Generated thumbnails are served from the cache, without asking the storage
+  def url(name):
+    raise AssertionError('Storage URL of %s' % name)
+  monkeypatch.setattr(pending.image_thumbnail.storage, 'url', url)
+  content = admin_client.get('/admin/albums/song/').content.decode()
+  assert content.count(renditions.placeholder_url()) == 1
+  for song in songs[1:]:
+    assert '/media/%s' % song.image_thumbnail.name in content
+
+@pytest.mark.django_db
+def test_estimated_count(monkeypatch, create_albums):
+  create_albums(3)
+  assert paginator.estimated_count(Album.objects.all()) is None
+
+  monkeypatch.setattr(paginator, 'estimated_count', lambda queryset: 200000)
+  assert paginator.EstimatedCountPaginator(Album.objects.order_by('pk'), 100).count == 200000
+  monkeypatch.setattr(paginator, 'estimated_count', lambda queryset: 50)
+  assert paginator.EstimatedCountPaginator(Album.objects.order_by('pk'), 100).count == 3
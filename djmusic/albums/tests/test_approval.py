@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from rest_framework.test import APIClient
+from albums.approval import STALE_AFTER, claim_job, create_job, runner
+from albums.models import Album, ApprovalJob
+from albums.signals import albums_approved
+from artists.cache import get_list_version
+from artists.models import Artist
+from artists.tests.test_factories import ArtistFactory
+from users.tests.test_factories import UserFactory
+
+@pytest.fixture
+def approvals():
+  batches = []
+  def receiver(sender, album_ids, approved_per_artist, **kwargs):
+    batches.append((album_ids, approved_per_artist))
+  albums_approved.connect(receiver, sender=Album, dispatch_uid='test_approvals')
+  yield batches
+  albums_approved.disconnect(sender=Album, dispatch_uid='test_approvals')
+
+@pytest.fixture
+def catalogue(create_albums):
+  [artist1, artist2] = ArtistFactory.create_batch(2)
+  albums = create_albums(3, artist=artist1) + create_albums(2, artist=artist2) + create_albums(1, artist=artist2, is_approved=True)
+  return artist1, artist2, albums
+
+def counters(artist):
+  artist.refresh_from_db()
+  return (artist.album_count, artist.approved_album_count)
+
+@pytest.mark.django_db
+def test_approve_albums_by_id_range(catalogue, approvals, django_capture_on_commit_callbacks):
+  artist1, artist2, albums = catalogue
+  modified = {album.pk: album.modified for album in albums}
+  version = get_list_version()
+  with django_capture_on_commit_callbacks(execute=True):
+    call_command('approve_albums', min_id=albums[1].pk, batch_size=2)
+
+  assert list(Album.objects.order_by('pk').values_list('is_approved', flat=True)) == [False, True, True, True, True, True]
+  for album in Album.objects.filter(pk__in=[album.pk for album in albums[1:5]]):
+    assert album.modified > modified[album.pk]
+  # One event per batch of 2, the approved album is skipped
+  assert [ids for ids, _ in approvals] == [[albums[1].pk, albums[2].pk], [albums[3].pk, albums[4].pk]]
+  assert approvals[1][1] == {artist2.pk: 2}
+  assert counters(artist1) == (3, 2)
+  assert counters(artist2) == (3, 3)
+  assert get_list_version() != version
+
+  job = ApprovalJob.objects.get()
+  assert (job.status, job.approved, job.last_id) == (ApprovalJob.DONE, 4, albums[4].pk)
+
+@pytest.mark.django_db
+def test_approve_albums_from_ids_file(catalogue, approvals, tmp_path):
+  artist1, artist2, albums = catalogue
+  path = tmp_path / 'queue.txt'
+  path.write_text('\n'.join(str(pk) for pk in [albums[4].pk, albums[0].pk, albums[5].pk, 999999]) + '\n')
+  call_command('approve_albums', ids_file=str(path), batch_size=2)
+  assert set(Album.objects.filter(is_approved=True).values_list('pk', flat=True)) == {albums[0].pk, albums[4].pk, albums[5].pk}
+  assert [ids for ids, _ in approvals] == [[albums[0].pk, albums[4].pk]]
+  assert ApprovalJob.objects.get().approved == 2
+
+@pytest.mark.django_db
+def test_resume_interrupted_approval(catalogue, approvals):
+  artist1, artist2, albums = catalogue
+  def interrupt(sender, **kwargs):
+    if len(approvals) == 2:
+      raise RuntimeError('Interrupted')
+  albums_approved.connect(interrupt, sender=Album, dispatch_uid='test_interrupt')
+  try:
+    with pytest.raises(CommandError, match='Interrupted'):
+      call_command('approve_albums', artist_ids=[artist1.pk, artist2.pk], batch_size=2)
+  finally:
+    albums_approved.disconnect(sender=Album, dispatch_uid='test_interrupt')
+
+  # The failed batch was rolled back
+  job = ApprovalJob.objects.get()
+  assert (job.status, job.approved, job.last_id) == (ApprovalJob.FAILED, 2, albums[1].pk)
+  assert Album.objects.filter(is_approved=True).count() == 3
+  assert counters(artist2) == (3, 1)
+
+  call_command('approve_albums', resume=job.pk)
+  job.refresh_from_db()
+  assert (job.status, job.approved) == (ApprovalJob.DONE, 5)
+  assert counters(artist1) == (3, 3)
+  assert counters(artist2) == (3, 3)
+  with pytest.raises(CommandError, match='already done'):
+    call_command('approve_albums', resume=job.pk)
+
+@pytest.mark.django_db
+def test_running_job_is_not_resumed_twice(catalogue):
+  artist1, artist2, albums = catalogue
+  job = create_job(artist_ids=[artist1.pk])
+  assert claim_job(job)
+  assert not claim_job(job)
+  with pytest.raises(CommandError, match='already running'):
+    call_command('approve_albums', resume=job.pk)
+  client = APIClient()
+  client.force_authenticate(UserFactory(is_staff=True))
+  assert client.post('/albums/approvals/%d/resume/' % job.pk).status_code == 409
+
+  # Unless its runner is gone
+  ApprovalJob.objects.filter(pk=job.pk).update(modified=timezone.now() - STALE_AFTER - timedelta(minutes=1))
+  call_command('approve_albums', resume=job.pk)
+  job.refresh_from_db()
+  assert (job.status, job.approved) == (ApprovalJob.DONE, 3)
+
+def test_approve_albums_needs_a_selection():
+  with pytest.raises(CommandError, match='Select the albums'):
+    call_command('approve_albums')
+
+@pytest.mark.django_db(transaction=True)
+def test_approval_api(catalogue):
+  artist1, artist2, albums = catalogue
+  client = APIClient()
+  client.force_authenticate(UserFactory(is_staff=True))
+  response = client.post('/albums/approvals/', {'artist_ids': [artist1.pk], 'batch_size': 2}, format='json')
+  assert response.status_code == 202
+  runner.wait(timeout=10)
+
+  data = client.get('/albums/approvals/%d/' % response.data['id']).data
+  assert (data['status'], data['approved'], data['album_count']) == ('done', 3, None)
+  assert counters(artist1) == (3, 3)
+  assert client.post('/albums/approvals/%d/resume/' % data['id']).status_code == 409
+
+  assert client.post('/albums/approvals/', {'batch_size': 2}, format='json').status_code == 400
+  client.force_authenticate(UserFactory())
+  assert client.post('/albums/approvals/', {'artist_ids': [artist2.pk]}, format='json').status_code == 403
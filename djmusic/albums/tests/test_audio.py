@@ -0,0 +1,83 @@
+import io
+import struct
+import wave
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from albums.audio import read_audio_info, InvalidAudioFile
+from albums.models import Song
+from albums.validators import validate_audio_file_content
+
+def wav_bytes(seconds=2, sample_rate=8000, channels=2):
+  buffer = io.BytesIO()
+  with wave.open(buffer, 'wb') as wav:
+    wav.setnchannels(channels)
+    wav.setsampwidth(2)
+    wav.setframerate(sample_rate)
+    wav.writeframes(b'\0' * 2 * channels * sample_rate * seconds)
+  return buffer.getvalue()
+
+# MPEG1 layer III, 128 kbps, 44.1 kHz, joint stereo, 417 bytes per frame
+MP3_FRAME = b'\xff\xfb\x90\x40' + b'\0' * 413
+
+def mp3_bytes(frames=100, id3=False, xing_frames=None):
+  data = MP3_FRAME * frames
+  if xing_frames is not None:
+    # Xing header after the 32 bytes of stereo side information
+    xing = b'Xing' + struct.pack('>II', 1, xing_frames)
+    data = MP3_FRAME[:36] + xing + MP3_FRAME[36 + len(xing):] + data
+  if id3:
+    data = b'ID3\x04\x00\x00\x00\x00\x01\x00' + b'\0' * 128 + data
+  return data
+
+def info(data, name):
+  return read_audio_info(io.BytesIO(data), name, len(data))
+
+def test_wav_info():
+  data = wav_bytes(seconds=2, sample_rate=8000, channels=2)
+  result = info(data, 'track.wav')
+  assert result.duration == 2
+  assert result.sample_rate == 8000
+  assert result.channels == 2
+  assert result.bitrate == 8000 * 2 * 16
+  assert result.size == len(data)
+
+def test_mp3_cbr_info():
+  data = mp3_bytes(frames=100, id3=True)
+  result = info(data, 'track.mp3')
+  assert result.sample_rate == 44100
+  assert result.channels == 2
+  assert result.bitrate == 128000
+  assert result.duration == pytest.approx(100 * 1152 / 44100, rel=0.01)
+
+def test_mp3_vbr_info():
+  result = info(mp3_bytes(frames=10, xing_frames=1000), 'track.mp3')
+  assert result.duration == pytest.approx(1000 * 1152 / 44100)
+
+@pytest.mark.parametrize('data,name', [
+  (wav_bytes(), 'track.mp3'),
+  (mp3_bytes(), 'track.wav'),
+  (b'not audio at all', 'track.mp3'),
+  (b'RIFF\0\0\0\0WAVEfmt ', 'track.wav'),
+])
+def test_mismatching_content(data, name):
+  with pytest.raises(InvalidAudioFile):
+    info(data, name)
+  with pytest.raises(ValidationError):
+    validate_audio_file_content(ContentFile(data, name=name))
+
+@pytest.mark.django_db
+def test_song_metadata_on_upload(create_songs):
+  song = create_songs(1, audio__data=wav_bytes(seconds=3), audio__filename='track.wav')[0]
+  song.refresh_from_db()
+  assert (song.duration, song.sample_rate, song.channels) == (3, 8000, 2)
+  assert song.size == song.audio.size
+
+@pytest.mark.django_db
+def test_extract_audio_metadata_command(create_songs):
+  create_songs(3, audio__data=mp3_bytes(), audio__filename='track.mp3')
+  Song.objects.update(duration=None, bitrate=None)
+  call_command('extract_audio_metadata', workers=2, batch_size=2)
+  assert not Song.objects.filter(duration__isnull=True).exists()
+  assert set(Song.objects.values_list('bitrate', flat=True)) == {128000}
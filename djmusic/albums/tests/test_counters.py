@@ -0,0 +1,69 @@
+import pytest
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from albums.models import Album
+from artists.models import Artist
+from artists.tests.test_factories import ArtistFactory
+from users.tests.test_factories import UserFactory
+
+def counters(artist):
+  artist.refresh_from_db()
+  return (artist.album_count, artist.approved_album_count)
+
+@pytest.mark.django_db
+def test_counters_on_create_and_delete(create_albums):
+  artist = ArtistFactory()
+  albums = create_albums(3, artist=artist)
+  create_albums(1, artist=artist, is_approved=True)
+  assert counters(artist) == (4, 1)
+
+  albums[0].delete()
+  assert counters(artist) == (3, 1)
+
+  Album.objects.filter(artist=artist, is_approved=True).delete()
+  assert counters(artist) == (2, 0)
+
+@pytest.mark.django_db
+def test_counters_on_update(create_albums):
+  [artist1, artist2] = ArtistFactory.create_batch(2)
+  album = create_albums(1, artist=artist1)[0]
+
+  album.is_approved = True
+  album.save()
+  assert counters(artist1) == (1, 1)
+
+  album.artist = artist2
+  album.save()
+  assert counters(artist1) == (0, 0)
+  assert counters(artist2) == (1, 1)
+
+  album.is_approved = False
+  album.save()
+  assert counters(artist2) == (1, 0)
+
+@pytest.mark.django_db
+def test_counters_on_make_approved(rf, monkeypatch, create_albums):
+  artist = ArtistFactory()
+  create_albums(3, artist=artist)
+  admin = site._registry[Album]
+  monkeypatch.setattr(admin, 'message_user', lambda *args, **kwargs: None)
+  request = rf.post('/')
+  request.user = UserFactory(is_staff=True)
+  admin.make_approved(request, Album.objects.all())
+  assert counters(artist) == (3, 3)
+
+@pytest.mark.django_db
+def test_recount_albums_command(create_albums):
+  artist = ArtistFactory()
+  create_albums(2, artist=artist, is_approved=True)
+  Artist.objects.update(album_count=0, approved_album_count=0)
+  call_command('recount_albums', batch_size=1)
+  assert counters(artist) == (2, 2)
+
+@pytest.mark.django_db
+def test_saving_a_stale_artist_keeps_counters(create_albums):
+  artist = ArtistFactory()
+  create_albums(2, artist=artist)
+  artist.stage_name = 'Renamed'
+  artist.save()
+  assert counters(artist) == (2, 0)
@@ -0,0 +1,20 @@
+import factory
+from albums.models import Album, Song
+from artists.tests.test_factories import ArtistFactory
+
+class AlbumFactory(factory.django.DjangoModelFactory):
+  class Meta:
+    model = Album
+  artist = factory.SubFactory(ArtistFactory)
+  album_name = factory.Faker('sentence', nb_words=3)
+  released_at = factory.Faker('date_time', tzinfo=factory.Faker('pytimezone'))
+  cost = factory.Faker('pydecimal', left_digits=2, right_digits=2, positive=True)
+
+class SongFactory(factory.django.DjangoModelFactory):
+  class Meta:
+    model = Song
+  album = factory.SubFactory(AlbumFactory)
+  name = factory.Faker('sentence', nb_words=2)
+  image = factory.django.ImageField(filename='cover.jpg')
+  audio = factory.django.FileField(filename='track.mp3')
+
@@ -0,0 +1,80 @@
+import csv
+import json
+import pytest
+from django.core.management import call_command
+from albums.importer import CatalogueImporter
+from albums.models import Album, Song
+from artists.models import Artist
+
+COLUMNS = ['stage_name', 'social_link', 'album_name', 'released_at', 'cost', 'is_approved', 'song_name', 'image', 'audio']
+
+def catalogue_rows():
+  rows = []
+  for a in range(3):
+    for b in range(2):
+      for c in range(4):
+        rows.append({
+          'stage_name': f'artist{a}', 'social_link': f'https://example.com/{a}',
+          'album_name': f'album{b}', 'released_at': '2022-11-07T17:37:00', 'cost': '9.99',
+          'is_approved': 'true' if b == 0 else 'false', 'song_name': f'song{c}',
+          'image': f'song_images/{a}{b}{c}.jpg', 'audio': f'song_audio/{a}{b}{c}.mp3'
+        })
+  # An artist without albums
+  rows.append({'stage_name': 'solo', 'social_link': ''})
+  return rows
+
+@pytest.fixture
+def csv_file(tmp_path):
+  path = tmp_path / 'catalogue.csv'
+  with open(path, 'w', newline='') as file:
+    writer = csv.DictWriter(file, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(catalogue_rows())
+  return str(path)
+
+@pytest.fixture
+def ndjson_file(tmp_path):
+  path = tmp_path / 'catalogue.ndjson'
+  path.write_text(''.join(json.dumps(row) + '\n' for row in catalogue_rows()))
+  return str(path)
+
+def assert_imported():
+  assert Artist.objects.count() == 4
+  assert Album.objects.count() == 6
+  assert Song.objects.count() == 24
+  artist = Artist.objects.get(stage_name='artist0')
+  assert (artist.album_count, artist.approved_album_count) == (2, 1)
+  assert Song.objects.filter(album__artist=artist, name='song0').count() == 2
+
+@pytest.mark.django_db
+def test_import_catalogue_csv(csv_file):
+  call_command('import_catalogue', csv_file, batch_size=5)
+  assert_imported()
+
+@pytest.mark.django_db
+def test_import_catalogue_ndjson(ndjson_file):
+  call_command('import_catalogue', ndjson_file, batch_size=7)
+  assert_imported()
+
+@pytest.mark.django_db
+def test_import_catalogue_is_idempotent(csv_file, ndjson_file):
+  call_command('import_catalogue', csv_file, batch_size=5)
+  call_command('import_catalogue', ndjson_file, batch_size=11)
+  assert_imported()
+
+@pytest.mark.django_db
+def test_import_catalogue_updates_existing_artists(csv_file):
+  Artist.objects.create(stage_name='artist1', social_link='old')
+  call_command('import_catalogue', csv_file)
+  assert Artist.objects.get(stage_name='artist1').social_link == 'https://example.com/1'
+  assert_imported()
+
+@pytest.mark.django_db
+def test_import_keeps_social_links_missing_from_rows():
+  Artist.objects.create(stage_name='kept', social_link='https://keep')
+  CatalogueImporter().run([
+    {'stage_name': 'kept'}, {'stage_name': 'kept', 'social_link': ''},
+    {'stage_name': 'new', 'social_link': ''}, {'stage_name': 'new', 'social_link': 'https://first'},
+    {'stage_name': 'new', 'social_link': 'https://second'},
+  ])
+  assert dict(Artist.objects.values_list('stage_name', 'social_link')) == {'kept': 'https://keep', 'new': 'https://first'}
@@ -0,0 +1,63 @@
+from concurrent.futures import Future
+import pytest
+from django.core.management import call_command
+from imagekit.cachefiles.backends import CacheFileState
+from albums import renditions
+from albums.models import Song
+
+@pytest.mark.django_db
+def test_renditions_generated_on_save(create_songs):
+  song = create_songs(1)[0]
+  renditions.backend.wait()
+  for rendition in renditions.RENDITIONS:
+    file = getattr(song, rendition)
+    assert renditions.is_ready(file)
+    assert file.storage.exists(file.name)
+  assert song.rendition_url('image_thumbnail').endswith('.jpg')
+  assert song.rendition_url('image_cover_webp').endswith('.webp')
+
+@pytest.mark.django_db
+def test_placeholder_until_generated(monkeypatch, create_songs):
+  scheduled = []
+  monkeypatch.setattr(renditions.backend, 'schedule_generation', lambda file, force=False: scheduled.append(file.name))
+  song = create_songs(1)[0]
+  assert len(scheduled) == len(renditions.RENDITIONS)
+  assert song.rendition_url() == renditions.placeholder_url()
+  assert not song.image_thumbnail.storage.exists(song.image_thumbnail.name)
+
+@pytest.mark.django_db
+def test_generate_renditions_command(monkeypatch, create_songs):
+  monkeypatch.setattr(renditions.backend, 'schedule_generation', lambda file, force=False: None)
+  songs = create_songs(3)
+  call_command('generate_renditions', workers=2)
+  for song in Song.objects.filter(pk__in=[song.pk for song in songs]):
+    assert song.rendition_url().endswith('.jpg')
+
+@pytest.mark.django_db
+def test_lost_generation_is_scheduled_again(monkeypatch, settings, create_songs):
+  settings.SONG_RENDITION_GENERATING_TIMEOUT = 60
+  # The queued jobs are lost, as with a process restarting
+  scheduled = []
+  def submit(function, file):
+    scheduled.append(file.name)
+    future = Future()
+    future.cancel()
+    return future
+  monkeypatch.setattr(renditions.backend.executor, 'submit', submit)
+  states = []
+  cache_set = renditions.backend.cache.set
+  def record_set(key, value, timeout=None):
+    states.append((key, value, timeout))
+    cache_set(key, value, timeout)
+  monkeypatch.setattr(renditions.backend.cache, 'set', record_set)
+  song = create_songs(1)[0]
+  file = song.image_thumbnail
+  key = renditions.backend.get_key(file)
+  assert (key, CacheFileState.GENERATING, 60) in states
+  file.generate()
+  assert scheduled.count(file.name) == 1
+
+  # Once the generating state expired
+  renditions.backend.cache.delete(key)
+  file.generate()
+  assert scheduled.count(file.name) == 2
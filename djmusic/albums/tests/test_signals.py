@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from albums.models import Album, Song
+from .test_factories import AlbumFactory
+
+@pytest.mark.django_db
+def test_delete_last_song_of_album(create_songs):
+  song = create_songs(1)[0]
+  with pytest.raises(Exception, match='only one belonging to the album'), transaction.atomic():
+    song.delete()
+  assert Song.objects.filter(pk=song.pk).exists()
+
+@pytest.mark.django_db
+def test_delete_song_with_siblings(create_songs):
+  album = AlbumFactory()
+  songs = create_songs(2, album=album)
+  songs[0].delete()
+  assert list(album.song_set.all()) == [songs[1]]
+
+@pytest.mark.django_db
+def test_bulk_delete_emptying_album(create_songs):
+  album = AlbumFactory()
+  create_songs(3, album=album)
+  create_songs(2, album=AlbumFactory())
+  with pytest.raises(Exception, match='would leave albums with no songs'), transaction.atomic():
+    Song.objects.filter(album=album).delete()
+  assert Song.objects.count() == 5
+
+@pytest.mark.django_db
+def test_bulk_delete_keeping_songs(create_songs):
+  albums = AlbumFactory.create_batch(3)
+  for album in albums:
+    create_songs(3, album=album)
+  Song.objects.filter(pk__in=[album.song_set.first().pk for album in albums]).delete()
+  for album in albums:
+    assert album.song_set.count() == 2
+
+@pytest.mark.django_db
+def test_bulk_delete_of_the_same_queryset_is_checked_again(create_songs):
+  album = AlbumFactory()
+  songs = create_songs(2, album=album, name='tmp')
+  create_songs(1, album=album)
+  queryset = Song.objects.filter(name='tmp')
+  queryset.delete()
+  # The last song of the album now matches the same queryset
+  Song.objects.filter(album=album).update(name='tmp')
+  with pytest.raises(Exception, match='would leave albums with no songs'), transaction.atomic():
+    queryset.delete()
+  assert album.song_set.count() == 1
+
+@pytest.mark.django_db
+def test_delete_album_cascades_to_songs(create_songs):
+  song = create_songs(1)[0]
+  song.album.delete()
+  assert not Song.objects.exists()
+  assert not Album.objects.exists()
+
+@pytest.mark.django_db
+def test_bulk_delete_query_count_is_constant(create_songs):
+  def delete_queries(albums_count, songs_per_album):
+    for _ in range(albums_count):
+      create_songs(songs_per_album + 1, album=AlbumFactory())
+    keep = [album.song_set.first().pk for album in Album.objects.all()]
+    with CaptureQueriesContext(connection) as queries:
+      Song.objects.exclude(pk__in=keep).delete()
+    assert Song.objects.count() == albums_count
+    Album.objects.all().delete()
+    return len(queries)
+
+  assert delete_queries(2, 2) == delete_queries(10, 5)
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import Client, RequestFactory
+from albums.models import Song
+from albums.storage import IMMUTABLE, song_storage
+from albums.streaming import serve_media
+from .test_factories import AlbumFactory, SongFactory
+
+AUDIO = b'ID3' + bytes(range(256)) * 1000
+
+def blob_name(directory, data, extension):
+  digest = hashlib.sha256(data).hexdigest()
+  return '%s/%s/%s%s' % (directory, digest[:2], digest, extension)
+
+@pytest.fixture
+def grace(settings):
+  settings.SONG_MEDIA_GRACE_SECONDS = 0
+
+def test_files_are_named_after_their_content(settings):
+  name = song_storage.save('song_audio/Track One.MP3', ContentFile(AUDIO))
+  assert name == blob_name('song_audio', AUDIO, '.mp3')
+  # The same content is stored once, whatever its name
+  assert song_storage.save('song_audio/copy.mp3', ContentFile(AUDIO)) == name
+  assert song_storage.save('song_audio/other.mp3', ContentFile(AUDIO[:-1])) != name
+  with open(song_storage.path(name), 'rb') as file:
+    assert file.read() == AUDIO
+  assert sorted(os.listdir(song_storage.path('song_audio/%s' % name.split('/')[1])))[0] == os.path.basename(name)
+  assert not [filename for filename in os.listdir(song_storage.path('song_audio')) if filename.endswith('.part')]
+
+def test_uploads_on_disk_are_moved():
+  upload = TemporaryUploadedFile('take.mp3', 'audio/mpeg', len(AUDIO), None)
+  upload.write(AUDIO)
+  upload.flush()
+  name = song_storage.save('song_audio/take.mp3', upload)
+  assert name == blob_name('song_audio', AUDIO, '.mp3')
+  assert not os.path.exists(upload.temporary_file_path())
+  upload.close()
+
+@pytest.mark.django_db
+def test_songs_share_identical_files(grace, django_capture_on_commit_callbacks):
+  album = AlbumFactory()
+  first, second = SongFactory.create_batch(2, album=album, audio__data=AUDIO)
+  third = SongFactory(album=album, image__color='red')
+  assert first.audio.name == second.audio.name == blob_name('song_audio', AUDIO, '.mp3')
+  assert first.image.name == second.image.name != third.image.name
+
+  with django_capture_on_commit_callbacks(execute=True):
+    first.delete()
+  assert song_storage.exists(second.audio.name) and song_storage.exists(second.image.name)
+
+  # The last song referencing a file deletes it, cascades included
+  image, audio = second.image.name, second.audio.name
+  with django_capture_on_commit_callbacks(execute=True):
+    album.delete()
+  assert not song_storage.exists(image) and not song_storage.exists(audio) and not song_storage.exists(third.image.name)
+
+@pytest.mark.django_db
+def test_recent_files_are_kept(django_capture_on_commit_callbacks):
+  songs = SongFactory.create_batch(2, album=AlbumFactory())
+  songs[1].image = ContentFile(b'another image', 'cover.png')
+  songs[1].save()
+  with django_capture_on_commit_callbacks(execute=True):
+    Song.objects.filter(pk=songs[0].pk).delete()
+  # Within the grace period a request may be saving a song with the same file
+  assert song_storage.exists(songs[0].image.name)
+
+@pytest.mark.django_db
+def test_clean_media(grace, capsys):
+  song = SongFactory()
+  orphan = song_storage.save('song_images/orphan.png', ContentFile(b'not referenced'))
+  call_command('clean_media')
+  assert 'Deleted 1 unreferenced files' in capsys.readouterr().out
+  assert not song_storage.exists(orphan)
+  assert song_storage.exists(song.image.name) and song_storage.exists(song.audio.name)
+
+@pytest.mark.django_db
+def test_content_addressed_files_are_immutable(settings):
+  song = SongFactory(audio__data=AUDIO)
+  # MEDIA_URL is only served by Django with DEBUG on
+  request = RequestFactory().get('/media/' + song.audio.name)
+  response = serve_media(request, song.audio.name, document_root=settings.MEDIA_ROOT)
+  assert response.status_code == 200 and response['Cache-Control'] == IMMUTABLE
+  response = Client().get(f'/albums/songs/{song.pk}/audio/')
+  assert response['ETag'] == '"%s"' % hashlib.sha256(AUDIO).hexdigest()
+  assert 'Cache-Control' not in response
@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+from datetime import timedelta
+import pytest
+from django.core.management import call_command
+from django.http import UnreadablePostError
+from django.utils import timezone
+from rest_framework.test import APIClient
+from albums import uploads
+from albums.models import Song, Upload
+from albums.uploads import CHUNK_TIMEOUT, OffsetMismatch, UploadError, append_chunk, audio_storage, finalize_upload
+from users.tests.test_factories import UserFactory
+from .test_audio import wav_bytes
+
+CONTENT_TYPE = 'application/offset+octet-stream'
+
+@pytest.fixture
+def client():
+  client = APIClient()
+  client.force_authenticate(UserFactory(is_staff=True))
+  return client
+
+def send(client, url, offset, chunk):
+  return client.patch(url, chunk, content_type=CONTENT_TYPE, HTTP_UPLOAD_OFFSET=str(offset))
+
+@pytest.mark.django_db
+def test_chunked_upload(client, create_albums):
+  album = create_albums(1)[0]
+  data = wav_bytes(seconds=3)
+  response = client.post('/albums/uploads/', {'filename': '../track.wav', 'length': len(data)})
+  assert response.status_code == 201
+  url = response['Location']
+  upload = Upload.objects.get()
+  assert upload.path.startswith('song_audio/') and upload.filename == 'track.wav'
+  path = audio_storage().path(upload.path)
+
+  assert send(client, url, 0, data[:10000])['Upload-Offset'] == '10000'
+  # A retried chunk at an outdated offset
+  response = send(client, url, 0, data[:10000])
+  assert response.status_code == 409 and response['Upload-Offset'] == '10000'
+  # Chunks are written in place
+  assert os.path.getsize(path) == 10000
+  assert client.head(url)['Upload-Offset'] == '10000'
+  response = send(client, url, 10000, data[10000:])
+  assert response.status_code == 204 and response['Upload-Offset'] == str(len(data))
+  assert send(client, url, len(data), b'extra').status_code == 400
+
+  finalize = url + 'finalize/'
+  assert client.post(finalize, {'checksum': 'sha256:' + '0' * 64, 'album': album.pk}).status_code == 400
+  response = client.post(finalize, {'checksum': 'sha256:' + hashlib.sha256(data).hexdigest(), 'album': album.pk, 'name': 'Take 1'})
+  assert response.status_code == 201
+  song = Song.objects.get(pk=response.data['id'])
+  # The uploaded file is renamed to its content name
+  digest = hashlib.sha256(data).hexdigest()
+  assert (song.name, song.audio.name, song.duration, song.channels) == ('Take 1', 'song_audio/%s/%s.wav' % (digest[:2], digest), 3, 2)
+  assert os.path.exists(audio_storage().path(song.audio.name)) and not os.path.exists(path)
+  upload.refresh_from_db()
+  assert upload.song == song and upload.path == song.audio.name
+  assert client.delete(url).status_code == 409
+
+class DroppedConnection(object):
+  def __init__(self, data):
+    self.data = data
+
+  def read(self, size):
+    if not self.data:
+      raise UnreadablePostError('Connection reset')
+    data, self.data = self.data[:size], self.data[size:]
+    return data
+
+@pytest.mark.django_db
+def test_interrupted_chunk_resumes(client):
+  data = wav_bytes()
+  url = client.post('/albums/uploads/', {'filename': 'track.wav', 'length': len(data)})['Location']
+  upload = Upload.objects.get()
+  # The connection dropped after 1000 of the announced 5000 bytes
+  assert append_chunk(upload.pk, 0, DroppedConnection(data[:1000]), 5000).offset == 1000
+  assert client.head(url)['Upload-Offset'] == '1000'
+  assert send(client, url, 1000, data[1000:])['Upload-Offset'] == str(len(data))
+  with open(audio_storage().path(upload.path), 'rb') as file:
+    assert file.read() == data
+
+@pytest.mark.django_db
+def test_concurrent_chunks(client):
+  data = wav_bytes()
+  url = client.post('/albums/uploads/', {'filename': 'track.wav', 'length': len(data)})['Location']
+  upload = Upload.objects.get()
+  class SlowStream(object):
+    def read(self, size):
+      # Another request sends the same chunk while this one is being read
+      with pytest.raises(OffsetMismatch, match='already being written'):
+        append_chunk(upload.pk, 0, io.BytesIO(data), len(data))
+      return data[:size]
+  assert append_chunk(upload.pk, 0, SlowStream(), 1000).offset == 1000
+  assert Upload.objects.get().chunk_started is None
+
+  # The reservation of a request that died is taken over
+  Upload.objects.update(chunk_started=timezone.now() - CHUNK_TIMEOUT - timedelta(minutes=1))
+  assert send(client, url, 1000, data[1000:])['Upload-Offset'] == str(len(data))
+
+@pytest.mark.django_db
+def test_upload_is_finalized_once(client, create_albums, monkeypatch):
+  album = create_albums(1)[0]
+  data = wav_bytes()
+  url = client.post('/albums/uploads/', {'filename': 'track.wav', 'length': len(data)})['Location']
+  send(client, url, 0, data)
+  checksum = 'sha256:' + hashlib.sha256(data).hexdigest()
+  file_checksum = uploads.file_checksum
+  def concurrent_finalize(path, algorithm):
+    digest = file_checksum(path, algorithm)
+    # Another request finalizes the upload while this one checks the file
+    monkeypatch.setattr(uploads, 'file_checksum', file_checksum)
+    finalize_upload(Upload.objects.get(), checksum, album)
+    return digest
+  monkeypatch.setattr(uploads, 'file_checksum', concurrent_finalize)
+  with pytest.raises(UploadError, match='already finalized'):
+    finalize_upload(Upload.objects.get(), checksum, album)
+  assert Song.objects.count() == 1
+
+@pytest.mark.django_db
+def test_upload_validation(client, create_albums):
+  assert client.post('/albums/uploads/', {'filename': 'track.flac', 'length': 10}).status_code == 400
+  assert client.post('/albums/uploads/', {'filename': 'track.mp3', 'length': 10 * 1024 ** 3}).status_code == 400
+
+  data = b'not a wav file'
+  url = client.post('/albums/uploads/', {'filename': 'track.wav', 'length': len(data)})['Location']
+  assert client.patch(url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0').status_code == 415
+  send(client, url, 0, data)
+  response = client.post(url + 'finalize/', {'checksum': 'md5:' + hashlib.md5(data).hexdigest(), 'album': create_albums(1)[0].pk})
+  assert response.status_code == 400
+  assert not Song.objects.exists()
+
+  other = APIClient()
+  other.force_authenticate(UserFactory(is_staff=True))
+  assert other.head(url).status_code == 404
+
+@pytest.mark.django_db
+def test_clean_uploads(client):
+  url = client.post('/albums/uploads/', {'filename': 'track.wav', 'length': 10})['Location']
+  upload = Upload.objects.get()
+  Upload.objects.update(modified=upload.modified - timedelta(days=2))
+  call_command('clean_uploads', hours=24)
+  assert not Upload.objects.exists()
+  assert not audio_storage().exists(upload.path)
+  assert client.head(url).status_code == 404
@@ -0,0 +1,132 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from albums import renditions
+from albums.models import Song
+from .test_factories import SongFactory
+
+AUDIO = bytes(range(256)) * 40
+
+@pytest.fixture
+def song(db):
+  return SongFactory(audio__data=AUDIO)
+
+def content(response):
+  return b''.join(response.streaming_content)
+
+def test_song_audio_full(song):
+  response = APIClient().get(f'/albums/songs/{song.id}/audio/')
+  assert response.status_code == 200
+  assert response['Accept-Ranges'] == 'bytes'
+  assert response['Content-Type'] == 'audio/mpeg'
+  assert int(response['Content-Length']) == len(AUDIO)
+  assert content(response) == AUDIO
+
+def test_song_audio_range(song):
+  response = APIClient().get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE='bytes=100-299')
+  assert response.status_code == 206
+  assert response['Content-Range'] == f'bytes 100-299/{len(AUDIO)}'
+  assert int(response['Content-Length']) == 200
+  assert content(response) == AUDIO[100:300]
+
+def test_song_audio_open_and_suffix_ranges(song):
+  client = APIClient()
+  response = client.get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE='bytes=10000-')
+  assert response.status_code == 206
+  assert content(response) == AUDIO[10000:]
+
+  response = client.get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE='bytes=-500')
+  assert response.status_code == 206
+  assert content(response) == AUDIO[-500:]
+
+def test_song_audio_unsatisfiable_range(song):
+  response = APIClient().get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE=f'bytes={len(AUDIO)}-')
+  assert response.status_code == 416
+  assert response['Content-Range'] == f'bytes */{len(AUDIO)}'
+
+@pytest.mark.django_db
+def test_song_audio_empty_file_suffix_range():
+  song = SongFactory(audio__data=b'')
+  response = APIClient().get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE='bytes=-10')
+  assert response.status_code == 416
+  assert response['Content-Range'] == 'bytes */0'
+
+def test_song_audio_conditional(song):
+  client = APIClient()
+  response = client.get(f'/albums/songs/{song.id}/audio/')
+  etag, last_modified = response['ETag'], response['Last-Modified']
+
+  assert client.get(f'/albums/songs/{song.id}/audio/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+  assert client.get(f'/albums/songs/{song.id}/audio/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+  # A stale If-Range falls back to the full file
+  response = client.get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+  assert response.status_code == 200
+  response = client.get(f'/albums/songs/{song.id}/audio/', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+  assert response.status_code == 206
+
+def test_song_audio_accel_redirect(song, settings):
+  settings.SONG_AUDIO_SENDFILE = 'x-accel-redirect'
+  response = APIClient().get(f'/albums/songs/{song.id}/audio/')
+  assert response.status_code == 200
+  assert response['X-Accel-Redirect'] == '/protected-media/' + song.audio.name
+  assert response.content == b''
+
+@pytest.mark.django_db
+def test_song_audio_not_found():
+  assert APIClient().get('/albums/songs/1/audio/').status_code == 404
+
+def test_song_audio_range_asgi(song):
+  # The 4.1 AsyncClient sends extra keyword arguments as plain header names
+  async def get():
+    return await AsyncClient().get(f'/albums/songs/{song.id}/audio/', range='bytes=0-99')
+  response = async_to_sync(get)()
+  assert response.status_code == 206
+  assert content(response) == AUDIO[:100]
+
+@pytest.mark.django_db
+def test_albums_view(create_albums, django_assert_num_queries):
+  albums = create_albums(5)
+  with django_assert_num_queries(1):
+    response = APIClient().get('/albums/')
+  assert response.status_code == 200
+  results = response.json()['results']
+  assert [album['id'] for album in results] == sorted((album.id for album in albums), reverse=True)
+  assert set(results[0]) == {'id', 'artist', 'album_name', 'released_at', 'cost', 'is_approved', 'created'}
+
+@pytest.mark.django_db
+def test_albums_view_field_selection(create_albums, django_assert_num_queries):
+  create_albums(3)
+  with django_assert_num_queries(1) as queries:
+    response = APIClient().get('/albums/', {'fields': 'id,album_name'})
+  assert [set(album) for album in response.json()['results']] == [{'id', 'album_name'}] * 3
+  assert 'cost' not in queries.captured_queries[0]['sql']
+
+@pytest.mark.django_db
+def test_album_songs_view(create_albums, create_songs, django_assert_num_queries):
+  album = create_albums(1)[0]
+  songs = create_songs(4, album=album)
+  create_songs(2)
+  with django_assert_num_queries(2):
+    response = APIClient().get(f'/albums/{album.id}/songs/', {'page_size': 3})
+  content = response.json()
+  assert [song['id'] for song in content['results']] == [song.id for song in songs[:3]]
+  assert content['results'][0]['audio'].endswith(f'/albums/songs/{songs[0].id}/audio/')
+
+  content = APIClient().get(content['next']).json()
+  assert [song['id'] for song in content['results']] == [songs[3].id]
+
+@pytest.mark.django_db
+def test_album_songs_thumbnails_are_read_together(create_albums, create_songs, monkeypatch):
+  album = create_albums(1)[0]
+  create_songs(3, album=album)
+  renditions.backend.wait()
+  monkeypatch.setattr(Song, 'rendition_url', lambda song, rendition='image_thumbnail': pytest.fail('Thumbnail of a single song'))
+  content = APIClient().get(f'/albums/{album.id}/songs/').json()
+  assert len(content['results']) == 3
+  assert all(song['thumbnail'].endswith('.jpg') for song in content['results'])
+
+@pytest.mark.django_db
+def test_album_songs_view_not_found():
+  assert APIClient().get('/albums/1/songs/').status_code == 404
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import posixpath
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Song, Upload
+from .validators import validate_audio_file_content, validate_audio_file_extension
+
+# Bytes read from the request or the file at a time, whatever the chunk size
+BUFFER_SIZE = 64 * 1024
+CHECKSUM_ALGORITHMS = ('md5', 'sha1', 'sha256', 'sha512')
+UPLOAD_DIRECTORY = 'song_audio/uploads'
+# A chunk reservation older than this was left by a request that died, the
+# next chunk can take it over
+CHUNK_TIMEOUT = timedelta(minutes=30)
+
+
+class UploadError(ValueError):
+  pass
+
+
+class OffsetMismatch(UploadError):
+  pass
+
+
+def audio_storage():
+  return Song._meta.get_field('audio').storage
+
+
+# Creates the empty file of the upload in song_audio/uploads/ of the audio
+# storage, the chunks are written in place
+def create_upload(owner, filename, length):
+  filename = os.path.basename(filename)
+  if os.path.splitext(filename)[1].lower() not in ('.mp3', '.wav'):
+    raise UploadError('Unsupported file extension.')
+  if length > getattr(settings, 'SONG_UPLOAD_MAX_SIZE', 2 * 1024 ** 3):
+    raise UploadError('The file is larger than the upload limit.')
+  path = posixpath.join(UPLOAD_DIRECTORY, uuid.uuid4().hex + os.path.splitext(filename)[1].lower())
+  os.makedirs(os.path.dirname(audio_storage().path(path)), exist_ok=True)
+  open(audio_storage().path(path), 'xb').close()
+  return Upload.objects.create(owner=owner, filename=filename, path=path, length=length)
+
+
+# Writes `size` bytes read from `stream` at `offset` of the upload and returns
+# the upload with its new offset. The chunk is reserved in a first short
+# transaction, so concurrent chunks can't interleave, and the new offset is
+# committed in a second one: no row stays locked while the body is read from
+# the network. A chunk cut short by a dropped connection still counts for the
+# bytes received, the client resumes from the returned offset
+def append_chunk(upload_id, offset, stream, size):
+  with transaction.atomic():
+    upload = Upload.objects.select_for_update().get(pk=upload_id)
+    if upload.song_id is not None:
+      raise UploadError('The upload is already finalized.')
+    if upload.chunk_started is not None and upload.chunk_started > timezone.now() - CHUNK_TIMEOUT:
+      raise OffsetMismatch('A chunk is already being written at offset %d.' % upload.offset)
+    if offset != upload.offset:
+      raise OffsetMismatch('The upload is at offset %d.' % upload.offset)
+    if size > upload.length - upload.offset:
+      raise UploadError('The chunk goes past the upload length.')
+    upload.chunk_started = timezone.now()
+    upload.save(update_fields=['chunk_started', 'modified'])
+
+  written = 0
+  try:
+    with open(audio_storage().path(upload.path), 'r+b') as file:
+      file.seek(offset)
+      # Bytes of an earlier chunk that failed before being counted
+      file.truncate()
+      while written < size:
+        try:
+          data = stream.read(min(BUFFER_SIZE, size - written))
+        except OSError:
+          break
+        if not data:
+          break
+        file.write(data)
+        written += len(data)
+  finally:
+    # A reservation that timed out may have been taken over meanwhile, the
+    # bytes of this chunk don't count then
+    Upload.objects.filter(pk=upload_id, offset=offset, chunk_started=upload.chunk_started).update(
+      offset=offset + written, chunk_started=None, modified=timezone.now()
+    )
+  upload.refresh_from_db()
+  return upload
+
+
+def file_checksum(path, algorithm):
+  digest = hashlib.new(algorithm)
+  with audio_storage().open(path, 'rb') as file:
+    for data in iter(lambda: file.read(BUFFER_SIZE), b''):
+      digest.update(data)
+  return digest.hexdigest()
+
+
+# Checks a complete upload against `checksum` ("<algorithm>:<hex digest>")
+# and creates a song of `album` with the uploaded file as its audio, renamed
+# to its content name rather than copied. Raises UploadError or ValidationError
+def finalize_upload(upload, checksum, album, name=None):
+  algorithm, _, expected = checksum.partition(':')
+  if algorithm not in CHECKSUM_ALGORITHMS or not expected:
+    raise UploadError('The checksum must be <algorithm>:<hex digest>, with one of %s.' % ', '.join(CHECKSUM_ALGORITHMS))
+  if upload.song_id is not None:
+    raise UploadError('The upload is already finalized.')
+  if upload.offset != upload.length:
+    raise UploadError('The upload is incomplete, %d of %d bytes received.' % (upload.offset, upload.length))
+  try:
+    digest = file_checksum(upload.path, algorithm)
+  except FileNotFoundError:
+    # Renamed by a concurrent finalize
+    raise UploadError('The upload is already finalized.')
+  if digest != expected.lower():
+    raise UploadError('The checksum does not match the uploaded file.')
+
+  with transaction.atomic():
+    # A concurrent finalize of the same upload may have won meanwhile
+    upload = Upload.objects.select_for_update().get(pk=upload.pk)
+    if upload.song_id is not None:
+      raise UploadError('The upload is already finalized.')
+    song = Song(album=album, name=name or None, audio=upload.path)
+    validate_audio_file_extension(song.audio)
+    validate_audio_file_content(song.audio)
+    # Stored files aren't parsed by Song.save()
+    song.set_audio_info(song.audio)
+    song.audio.close()
+    upload.path = song.audio.name = audio_storage().adopt(
+      upload.path, Song._meta.get_field('audio').upload_to, digest if algorithm == 'sha256' else None
+    )
+    song.save()
+    upload.song = song
+    upload.save(update_fields=['song', 'path', 'modified'])
+  return song
+
+
+# The file of a finalized upload was renamed to its content name, it is
+# deleted with the last song referencing it instead (see albums.media)
+def delete_upload(upload):
+  if not audio_storage().is_blob(upload.path):
+    audio_storage().delete(upload.path)
+  upload.delete()
@@ -1,9 +1,20 @@
 from django.urls import path
 from . import views
 from django.contrib.auth.decorators import login_required
+from rest_framework.urlpatterns import format_suffix_patterns
 
 app_name = 'albums'
 
 urlpatterns = [
+  path('', views.AlbumsView.as_view(), name='json_list'),
+  path('<int:pk>/songs/', views.AlbumSongsView.as_view(), name='songs'),
   # path('create/', login_required(views.CreateAlbumView.as_view()), name='create')
+  path('songs/<int:pk>/audio/', views.SongAudioView.as_view(), name='song_audio'),
+  path('uploads/', views.UploadsView.as_view(), name='uploads'),
+  path('uploads/<uuid:pk>/', views.UploadView.as_view(), name='upload'),
+  path('uploads/<uuid:pk>/finalize/', views.FinalizeUploadView.as_view(), name='upload_finalize'),
+  path('approvals/', views.ApprovalJobsView.as_view(), name='approvals'),
+  path('approvals/<int:pk>/', views.ApprovalJobDetailView.as_view(), name='approval'),
+  path('approvals/<int:pk>/resume/', views.ApprovalJobResumeView.as_view(), name='approval_resume'),
 ]
+urlpatterns = format_suffix_patterns(urlpatterns)
@@ -1,8 +1,16 @@
 import os
 from django.core.exceptions import ValidationError
+from .audio import read_audio_info, InvalidAudioFile
 
 def validate_audio_file_extension(value):
   ext = os.path.splitext(value.name)[1]  # [0] returns path+filename
   valid_extensions = ['.mp3', '.wav']
   if not ext.lower() in valid_extensions:
       raise ValidationError('Unsupported file extension.')
+
+# Only reads the headers, so it is cheap even for large uploads
+def validate_audio_file_content(value):
+  try:
+    read_audio_info(value, value.name)
+  except InvalidAudioFile:
+    raise ValidationError('File content does not match its extension.')
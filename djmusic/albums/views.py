@@ -1,8 +1,140 @@
-from django.urls import reverse_lazy
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.views import View
 from django.views.generic.edit import FormView
 
-from .models import Album
+from .models import Album, ApprovalJob, Song, Upload
+from .approval import claim_job, create_job, runner
+from .uploads import UploadError, OffsetMismatch, create_upload, append_chunk, finalize_upload, delete_upload
 from .forms import CreateAlbumForm
+from .streaming import serve_file
+from .serializers import AlbumSerializer, ApprovalJobSerializer, SongSerializer, UploadSerializer, FinalizeUploadSerializer
+from .pagination import AlbumCursorPagination, SongCursorPagination
+from .selection import SelectableFieldsViewMixin
+from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+class AlbumsView(SelectableFieldsViewMixin, generics.ListAPIView):
+  queryset = Album.objects.all()
+  serializer_class = AlbumSerializer
+  pagination_class = AlbumCursorPagination
+
+class AlbumSongsView(SelectableFieldsViewMixin, generics.ListAPIView):
+  serializer_class = SongSerializer
+  pagination_class = SongCursorPagination
+
+  def get_queryset(self):
+    return self.select_fields(Song.objects.filter(album_id=self.kwargs['pk']))
+
+  def list(self, request, *args, **kwargs):
+    get_object_or_404(Album.objects.only('pk'), pk=kwargs['pk'])
+    return super().list(request, *args, **kwargs)
+
+# Bulk approvals run in the background, poll the job for their progress
+class ApprovalJobsView(generics.ListCreateAPIView):
+  queryset = ApprovalJob.objects.order_by('-id')
+  serializer_class = ApprovalJobSerializer
+  permission_classes = [IsAdminUser]
+
+  def create(self, request, *args, **kwargs):
+    serializer = self.get_serializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    serializer.instance = create_job(requested_by=request.user, **serializer.validated_data)
+    claim_job(serializer.instance)
+    runner.schedule(serializer.instance.pk)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+class ApprovalJobDetailView(generics.RetrieveAPIView):
+  queryset = ApprovalJob.objects.all()
+  serializer_class = ApprovalJobSerializer
+  permission_classes = [IsAdminUser]
+
+class ApprovalJobResumeView(APIView):
+  permission_classes = [IsAdminUser]
+
+  # Continues an interrupted or failed job after its last approved batch
+  def post(self, request, pk, format=None):
+    job = get_object_or_404(ApprovalJob, pk=pk)
+    if not claim_job(job):
+      detail = 'The job is already done.' if job.status == ApprovalJob.DONE else 'The job is already running.'
+      return Response({'detail': detail}, status=status.HTTP_409_CONFLICT)
+    runner.schedule(job.pk)
+    return Response(ApprovalJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+# Chunked, resumable uploads of song audio files, in the spirit of tus:
+# create the upload with its length, send the chunks with PATCH and an
+# Upload-Offset header, ask for the offset with HEAD to resume, then finalize
+class UploadsView(generics.CreateAPIView):
+  serializer_class = UploadSerializer
+  permission_classes = [IsAdminUser]
+
+  def create(self, request, *args, **kwargs):
+    serializer = self.get_serializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+      upload = create_upload(request.user, serializer.validated_data['filename'], serializer.validated_data['length'])
+    except UploadError as e:
+      return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    location = reverse('albums:upload', args=[upload.pk])
+    return Response(UploadSerializer(upload).data, status=status.HTTP_201_CREATED, headers={'Location': location})
+
+class UploadView(APIView):
+  permission_classes = [IsAdminUser]
+  CONTENT_TYPE = 'application/offset+octet-stream'
+
+  def get_upload(self, request, pk):
+    return get_object_or_404(Upload, pk=pk, owner=request.user)
+
+  def offset_headers(self, upload):
+    return {'Upload-Offset': str(upload.offset), 'Upload-Length': str(upload.length), 'Cache-Control': 'no-store'}
+
+  def get(self, request, pk, format=None):
+    upload = self.get_upload(request, pk)
+    return Response(UploadSerializer(upload).data, headers=self.offset_headers(upload))
+
+  # The body is read from the request stream as it is written, never as a whole
+  def patch(self, request, pk, format=None):
+    upload = self.get_upload(request, pk)
+    if request.content_type != self.CONTENT_TYPE:
+      return Response({'detail': 'Chunks must be sent as %s.' % self.CONTENT_TYPE}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    try:
+      offset = int(request.headers['Upload-Offset'])
+      size = int(request.headers['Content-Length'])
+    except (KeyError, ValueError):
+      return Response({'detail': 'Upload-Offset and Content-Length headers are required.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+      upload = append_chunk(upload.pk, offset, request.stream, size)
+    except OffsetMismatch as e:
+      return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT, headers=self.offset_headers(upload))
+    except UploadError as e:
+      return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(status=status.HTTP_204_NO_CONTENT, headers=self.offset_headers(upload))
+
+  def delete(self, request, pk, format=None):
+    upload = self.get_upload(request, pk)
+    if upload.song_id is not None:
+      return Response({'detail': 'The upload is already finalized.'}, status=status.HTTP_409_CONFLICT)
+    delete_upload(upload)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+class FinalizeUploadView(APIView):
+  permission_classes = [IsAdminUser]
+
+  def post(self, request, pk, format=None):
+    upload = get_object_or_404(Upload, pk=pk, owner=request.user)
+    serializer = FinalizeUploadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+      song = finalize_upload(upload, **serializer.validated_data)
+    except UploadError as e:
+      return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ValidationError as e:
+      return Response({'detail': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(SongSerializer(song, context={'request': request}).data, status=status.HTTP_201_CREATED)
 
 class CreateAlbumView(FormView):
   
@@ -19,3 +151,12 @@ class CreateAlbumView(FormView):
     error = 'Filling Error: Please fill all the required fields correctly'
     return super().render_to_response({'error': error, 'form': form})
 
+
+class SongAudioView(View):
+  
+  # Streams the audio of a song with support for Range requests and conditional GET
+  def get(self, request, pk):
+    name = Song.objects.filter(pk=pk).values_list('audio', flat=True).first()
+    if not name:
+      raise Http404('Song has no audio')
+    return serve_file(request, Song._meta.get_field('audio').storage, name)
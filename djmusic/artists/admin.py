@@ -1,30 +1,28 @@
 from django.contrib import admin
 from artists.models import Artist
+from albums.paginator import EstimatedCountPaginator
 
 
 @admin.register(Artist)
 class ArtistAdmin(admin.ModelAdmin):
   
-  list_display = ('stage_name', 'albums', 'approved_albums')
+  # The counters are columns kept up to date by albums.signals, no per row query
+  list_display = ('stage_name', 'album_count', 'approved_album_count')
+  paginator = EstimatedCountPaginator
+  show_full_result_count = False
   
-  readonly_fields = ('approved_albums', 'albums')
+  readonly_fields = ('approved_album_count', 'album_count')
   
   fieldsets = (
     (None, {
       'fields': ('stage_name', 'social_link')
     }),
     (None, {
-      'fields': ('albums',),
+      'fields': ('album_count',),
       'description': 'Number of albums beloning to this artist'
     }),
     (None, {
-      'fields': ('approved_albums',),
+      'fields': ('approved_album_count',),
       'description': 'Number of approved albums for this artist'
     })
   )
-  
-  def albums(self, obj):
-    return obj.album_set.count()
-  
-  def approved_albums(self, obj):
-    return obj.approved_albums
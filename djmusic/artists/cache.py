@@ -0,0 +1,44 @@
+import hashlib
+import time
+from django.core.cache import cache
+
+LIST_VERSION_KEY = 'artists:list:version'
+LIST_CACHE_TIMEOUT = 60 * 15
+
+def get_list_version():
+  version = cache.get(LIST_VERSION_KEY)
+  if version is None:
+    # Start from the current time rather than 1 so that an evicted version key
+    # never brings back entries cached under an older version
+    cache.add(LIST_VERSION_KEY, time.time_ns(), None)
+    version = cache.get(LIST_VERSION_KEY)
+  return version
+
+async def aget_list_version():
+  version = await cache.aget(LIST_VERSION_KEY)
+  if version is None:
+    await cache.aadd(LIST_VERSION_KEY, time.time_ns(), None)
+    version = await cache.aget(LIST_VERSION_KEY)
+  return version
+
+def bump_list_version():
+  try:
+    cache.incr(LIST_VERSION_KEY)
+  except ValueError:
+    cache.add(LIST_VERSION_KEY, time.time_ns(), None)
+
+def list_signature(request, version=None, format=None):
+  # The version changes on every catalogue write, so version + URL identifies
+  # the response body without having to load or hash it
+  signature = '%s:%s:%s' % (
+    get_list_version() if version is None else version,
+    format or request.accepted_renderer.format,
+    request.get_full_path()
+  )
+  return hashlib.sha1(signature.encode()).hexdigest()
+
+def list_cache_key(signature):
+  return 'artists:list:%s' % signature
+
+def list_etag(signature):
+  return '"%s"' % signature
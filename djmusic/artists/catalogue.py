@@ -0,0 +1,48 @@
+import json
+from itertools import groupby
+from operator import itemgetter
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Artist
+
+ALBUM_COLUMNS = ('album__id', 'album__album_name', 'album__created', 'album__released_at', 'album__cost')
+# Content type of the export, by json_array (see encode_artists)
+CONTENT_TYPES = {False: 'application/x-ndjson', True: 'application/json'}
+
+# Artists joined with their albums, one row per album (or one row with empty
+# album columns for artists without albums), ordered so that the rows of an
+# artist are consecutive. Iterated with a server side cursor when supported
+def catalogue_rows(queryset=None, chunk_size=2000):
+  if queryset is None:
+    queryset = Artist.objects.all()
+  return queryset \
+    .order_by('stage_name', 'id', 'album__id') \
+    .values('id', 'stage_name', 'social_link', *ALBUM_COLUMNS) \
+    .iterator(chunk_size=chunk_size)
+
+# Group consecutive rows of the same artist, only one artist's albums are held in memory
+def group_artist_albums(rows):
+  for artist_id, artist_rows in groupby(rows, key=itemgetter('id')):
+    albums = []
+    for row in artist_rows:
+      if row['album__id'] is not None:
+        albums.append({
+          'id': row['album__id'],
+          'album_name': row['album__album_name'],
+          'created': row['album__created'],
+          'released_at': row['album__released_at'],
+          'cost': row['album__cost']
+        })
+    yield {'id': artist_id, 'stage_name': row['stage_name'], 'social_link': row['social_link'], 'albums': albums}
+
+# The artists as NDJSON lines, or as the parts of a JSON array with `json_array`
+def encode_artists(artists, json_array=False):
+  if not json_array:
+    for artist in artists:
+      yield json.dumps(artist, cls=DjangoJSONEncoder) + '\n'
+    return
+  yield '['
+  separator = ''
+  for artist in artists:
+    yield separator + json.dumps(artist, cls=DjangoJSONEncoder)
+    separator = ','
+  yield ']'
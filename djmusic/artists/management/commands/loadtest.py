@@ -0,0 +1,93 @@
+import asyncio
+import ssl
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+async def read_response(reader):
+  status_line = await reader.readline()
+  if not status_line:
+    raise ConnectionError('Connection closed by the server')
+  status = int(status_line.split()[1])
+  headers = {}
+  while True:
+    line = await reader.readline()
+    if line in (b'\r\n', b'\n', b''):
+      break
+    name, _, value = line.decode('latin-1').partition(':')
+    headers[name.strip().lower()] = value.strip()
+  if headers.get('transfer-encoding') == 'chunked':
+    while True:
+      size = int((await reader.readline()).split(b';')[0], 16)
+      await reader.readexactly(size + 2)
+      if size == 0:
+        break
+  elif 'content-length' in headers:
+    await reader.readexactly(int(headers['content-length']))
+  return status, headers
+
+class Command(BaseCommand):
+  help = 'Send GET requests from concurrent keep-alive clients to a running server and report throughput and latency'
+
+  def add_arguments(self, parser):
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', type=int, default=50, help='Number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=5000, help='Total number of requests')
+    parser.add_argument('--header', action='append', default=[], help='Extra request header, as "Name: value"')
+
+  def handle(self, *args, **options):
+    url = urlsplit(options['url'])
+    if url.scheme not in ('http', 'https'):
+      raise CommandError('Only http and https URLs are supported')
+    self.host = url.hostname
+    self.port = url.port or (443 if url.scheme == 'https' else 80)
+    self.ssl = ssl.create_default_context() if url.scheme == 'https' else None
+    target = (url.path or '/') + ('?' + url.query if url.query else '')
+    headers = ''.join('%s\r\n' % header for header in options['header'])
+    self.request = ('GET %s HTTP/1.1\r\nHost: %s\r\n%sConnection: keep-alive\r\n\r\n' % (target, url.netloc, headers)).encode()
+
+    timings, errors, elapsed = asyncio.run(self.load(options['concurrency'], options['requests']))
+    if not timings:
+      raise CommandError('Every request failed')
+    timings.sort()
+    percentile = lambda p: timings[min(int(len(timings) * p), len(timings) - 1)] * 1000
+    self.stdout.write(self.style.SUCCESS(
+      '%d requests, %d errors in %.1fs: %.0f req/s, p50 %.1fms, p90 %.1fms, p99 %.1fms, max %.1fms' % (
+        len(timings), errors, elapsed, len(timings) / elapsed,
+        percentile(0.5), percentile(0.9), percentile(0.99), timings[-1] * 1000
+      )
+    ))
+
+  async def load(self, concurrency, total):
+    timings = []
+    errors = 0
+    remaining = total
+
+    async def run_client():
+      nonlocal errors, remaining
+      reader = writer = None
+      while remaining > 0:
+        remaining -= 1
+        try:
+          if writer is None:
+            reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+          start = time.perf_counter()
+          writer.write(self.request)
+          status, headers = await read_response(reader)
+          timings.append(time.perf_counter() - start)
+          if status >= 400:
+            errors += 1
+          if headers.get('connection', '').lower() == 'close':
+            writer.close()
+            writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+          errors += 1
+          if writer is not None:
+            writer.close()
+          writer = None
+      if writer is not None:
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(concurrency)))
+    return timings, errors, time.perf_counter() - start
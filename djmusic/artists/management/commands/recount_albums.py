@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from artists.models import Artist
+
+class Command(BaseCommand):
+  help = 'Recompute the stored album counters of all artists in batches'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=1000, help='Number of artists updated per statement')
+
+  def handle(self, *args, **options):
+    batch_size = options['batch_size']
+    last_id = 0
+    total = 0
+    while True:
+      ids = list(Artist.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+      if not ids:
+        break
+      with transaction.atomic():
+        total += Artist.objects.refresh_album_counts(ids)
+      last_id = ids[-1]
+
+    self.stdout.write(self.style.SUCCESS('Recounted albums of %d artists' % total))
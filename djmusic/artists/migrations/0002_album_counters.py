@@ -0,0 +1,39 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_album_counts(apps, schema_editor):
+    Artist = apps.get_model('artists', 'Artist')
+    Album = apps.get_model('albums', 'Album')
+    albums = Album.objects.filter(artist=OuterRef('pk')).order_by().values('artist')
+    total = albums.annotate(count=Count('pk')).values('count')
+    approved = albums.filter(is_approved=True).annotate(count=Count('pk')).values('count')
+    Artist.objects.update(
+        album_count=Coalesce(Subquery(total), Value(0)),
+        approved_album_count=Coalesce(Subquery(approved), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0001_initial'),
+        ('albums', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='album_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='approved_album_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_album_counts, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,47 @@
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from changes.outbox import OutboxManager, OutboxMixin
 
-class ArtistManager(models.Manager):
-  def get_queryset(self):
-    return super().get_queryset().annotate(approved_albums=Count('album__is_approved', filter=Q(album__is_approved=True)))
+class ArtistManager(OutboxManager):
+  # Recompute the stored album counters in a single UPDATE statement
+  def refresh_album_counts(self, artist_ids=None):
+    Album = self.model._meta.get_field('album').related_model
+    albums = Album.objects.filter(artist=OuterRef('pk')).order_by().values('artist')
+    total = albums.annotate(count=Count('pk')).values('count')
+    approved = albums.filter(is_approved=True).annotate(count=Count('pk')).values('count')
 
-class Artist(models.Model):
+    queryset = self.get_queryset()
+    if artist_ids is not None:
+      queryset = queryset.filter(pk__in=artist_ids)
+    return queryset.update(
+      album_count=Coalesce(Subquery(total), Value(0)),
+      approved_album_count=Coalesce(Subquery(approved), Value(0))
+    )
+
+class Artist(OutboxMixin, models.Model):
   objects = ArtistManager()
+  # Counter updates are not catalogue changes (see changes.outbox)
+  outbox_ignored_fields = ('album_count', 'approved_album_count')
   stage_name = models.CharField(max_length=200, unique=True, blank=False)
   # TextField has null=False by default
   social_link = models.TextField(blank=True)
+  # Kept up to date by the album signals and bulk paths instead of being
+  # aggregated on every query (see albums.signals)
+  album_count = models.PositiveIntegerField(default=0, editable=False)
+  approved_album_count = models.PositiveIntegerField(default=0, editable=False)
 
   def __str__(self):
     return self.stage_name
+
+  def save(self, *args, **kwargs):
+    # The counters are only written with F() updates, saving a stale instance must not overwrite them
+    if not self._state.adding and not args and kwargs.get('update_fields') is None:
+      kwargs['update_fields'] = [
+        field.name for field in self._meta.concrete_fields
+        if not field.primary_key and field.name not in ('album_count', 'approved_album_count')
+      ]
+    super().save(*args, **kwargs)
   
   class Meta:
     ordering = ['stage_name']
@@ -0,0 +1,80 @@
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+class ArtistCursorPagination(CursorPagination):
+  # Keyset pagination over the same columns as Artist.Meta.ordering,
+  # with id as a tie breaker so the cursor position is always unique
+  ordering = ('stage_name', 'id')
+  page_size = 50
+  page_size_query_param = 'page_size'
+  max_page_size = 200
+
+  # CursorPagination.paginate_queryset split in the query and the handling of
+  # its results, so that the async views can run the query with the async ORM
+  def paginate_queryset(self, queryset, request, view=None):
+    queryset = self.page_queryset(queryset, request, view)
+    return None if queryset is None else self.set_page(list(queryset))
+
+  async def apaginate_queryset(self, queryset, request, view=None):
+    queryset = self.page_queryset(queryset, request, view)
+    return None if queryset is None else self.set_page([obj async for obj in queryset])
+
+  def page_queryset(self, queryset, request, view=None):
+    self.page_size = self.get_page_size(request)
+    if not self.page_size:
+      return None
+
+    self.base_url = request.build_absolute_uri()
+    self.ordering = self.get_ordering(request, queryset, view)
+    self.cursor = self.decode_cursor(request)
+    if self.cursor is None:
+      (offset, self.reverse, self.current_position) = (0, False, None)
+    else:
+      (offset, self.reverse, self.current_position) = self.cursor
+
+    if self.reverse:
+      queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+    else:
+      queryset = queryset.order_by(*self.ordering)
+
+    if self.current_position is not None:
+      order = self.ordering[0]
+      is_reversed = order.startswith('-')
+      order_attr = order.lstrip('-')
+      # (cursor reversed) XOR (queryset reversed)
+      if self.cursor.reverse != is_reversed:
+        queryset = queryset.filter(**{order_attr + '__lt': self.current_position})
+      else:
+        queryset = queryset.filter(**{order_attr + '__gt': self.current_position})
+
+    # One extra item tells whether there is a following page
+    return queryset[offset:offset + self.page_size + 1]
+
+  def set_page(self, results):
+    self.page = list(results[:self.page_size])
+    if len(results) > len(self.page):
+      has_following_position = True
+      following_position = self._get_position_from_instance(results[-1], self.ordering)
+    else:
+      has_following_position = False
+      following_position = None
+
+    offset = self.cursor.offset if self.cursor else 0
+    if self.reverse:
+      self.page = list(reversed(self.page))
+      self.has_next = (self.current_position is not None) or (offset > 0)
+      self.has_previous = has_following_position
+      if self.has_next:
+        self.next_position = self.current_position
+      if self.has_previous:
+        self.previous_position = following_position
+    else:
+      self.has_next = has_following_position
+      self.has_previous = (self.current_position is not None) or (offset > 0)
+      if self.has_next:
+        self.next_position = following_position
+      if self.has_previous:
+        self.previous_position = self.current_position
+
+    if (self.has_previous or self.has_next) and self.template is not None:
+      self.display_page_controls = True
+    return self.page
@@ -1,7 +1,16 @@
 from rest_framework import serializers
 from .models import Artist
+from albums.serializers import AlbumWithSongsSerializer
+from albums.selection import SelectableFieldsMixin
 
 class ArtistSerializer(serializers.ModelSerializer):
   class Meta:
     model = Artist
-    fields = ['id', 'stage_name', 'social_link']
\ No newline at end of file
+    fields = ['id', 'stage_name', 'social_link']
+
+class ArtistDetailSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
+  albums = AlbumWithSongsSerializer(many=True, read_only=True, source='album_set')
+
+  class Meta:
+    model = Artist
+    fields = ['id', 'stage_name', 'social_link', 'album_count', 'approved_album_count', 'albums']
@@ -0,0 +1,9 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Artist
+from .cache import bump_list_version
+
+@receiver([post_save, post_delete], sender=Artist, dispatch_uid='artists_list_cache')
+def invalidate_artists_list(sender, **kwargs):
+  transaction.on_commit(bump_list_version)
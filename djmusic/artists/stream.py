@@ -0,0 +1,52 @@
+from itertools import islice
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from .catalogue import CONTENT_TYPES, catalogue_rows, encode_artists, group_artist_albums
+
+PATH = '/artists/catalogue/'
+# Artists encoded in the worker thread per message sent
+BATCH_SIZE = 500
+
+
+# The catalogue export (see ArtistCatalogueExportView), an ASGI application.
+# Django 4.1 iterates streaming responses inside the event loop, where the
+# queries of catalogue_rows() can't run: the artists are read and encoded here
+# a batch at a time in the thread of the sync views instead
+async def catalogue_export(scope, receive, send):
+  if scope['method'] != 'GET':
+    await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+    await send({'type': 'http.response.body', 'body': b''})
+    return
+
+  query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+  json_array = query.get('format') == ['json']
+  chunks = encode_artists(group_artist_albums(catalogue_rows()), json_array)
+
+  def next_batch():
+    return ''.join(islice(chunks, BATCH_SIZE)).encode()
+
+  def close():
+    chunks.close()
+    close_old_connections()
+
+  try:
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', CONTENT_TYPES[json_array].encode())]})
+    while True:
+      body = await sync_to_async(next_batch)()
+      if not body:
+        break
+      await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+  finally:
+    await sync_to_async(close)()
+
+
+# Serves the catalogue export at PATH and the rest with `application`
+def with_catalogue_export(application):
+  async def app(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == PATH:
+      await catalogue_export(scope, receive, send)
+    else:
+      await application(scope, receive, send)
+  return app
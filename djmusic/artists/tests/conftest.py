@@ -1,6 +1,9 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
+from albums import renditions
 from .test_factories import ArtistFactory
+from users.tests.test_factories import UserFactory
 
 @pytest.fixture
 def auth_client():
@@ -16,3 +19,21 @@ def create_artists():
   def batch_create(n = 3):
     return ArtistFactory.create_batch(n)
   return batch_create
+
+@pytest.fixture
+def create_users():
+  def batch_create(n = 3):
+    return UserFactory.create_batch(n)
+  return batch_create
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+  cache.clear()
+  yield
+  cache.clear()
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  yield
+  renditions.backend.wait(timeout=10)
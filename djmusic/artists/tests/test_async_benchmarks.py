@@ -0,0 +1,60 @@
+import asyncio
+import os
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import path
+from artists.views import ArtistsView, AsyncArtistsView
+from users.views import UserDetailView, AsyncUserDetailView
+
+# Throughput and latency of the sync and async views served by the ASGI
+# handler to concurrent clients, only run with DJMUSIC_BENCHMARKS=1:
+#   DJMUSIC_BENCHMARKS=1 pytest artists/tests/test_async_benchmarks.py -s
+# Use `manage.py loadtest` to compare real deployments
+pytestmark = [
+  pytest.mark.skipif(not os.environ.get('DJMUSIC_BENCHMARKS'), reason='Set DJMUSIC_BENCHMARKS=1 to run benchmarks'),
+  pytest.mark.urls(__name__),
+]
+
+CLIENTS = int(os.environ.get('DJMUSIC_BENCHMARK_CLIENTS', 50))
+REQUESTS = int(os.environ.get('DJMUSIC_BENCHMARK_REQUESTS', 2000))
+
+urlpatterns = [
+  path('sync/artists/', ArtistsView.as_view()),
+  path('async/artists/', AsyncArtistsView.as_view()),
+  path('sync/users/<int:pk>/', UserDetailView.as_view()),
+  path('async/users/<int:pk>/', AsyncUserDetailView.as_view()),
+]
+
+async def load(url):
+  client = AsyncClient()
+  timings = []
+
+  async def run_client(count):
+    for _ in range(count):
+      start = time.perf_counter()
+      response = await client.get(url)
+      timings.append(time.perf_counter() - start)
+      assert response.status_code == 200
+
+  start = time.perf_counter()
+  await asyncio.gather(*(run_client(REQUESTS // CLIENTS) for _ in range(CLIENTS)))
+  elapsed = time.perf_counter() - start
+  timings.sort()
+  return len(timings) / elapsed, timings[len(timings) // 2], timings[int(len(timings) * 0.99) - 1]
+
+def compare(name, sync_url, async_url):
+  for mode, url in (('sync', sync_url), ('async', async_url)):
+    throughput, p50, p99 = async_to_sync(load)(url)
+    print('\n%s %-5s %d clients: %7.0f req/s, p50 %.1fms, p99 %.1fms' % (name, mode, CLIENTS, throughput, p50 * 1000, p99 * 1000))
+
+@pytest.mark.django_db
+def test_artists_list(create_artists):
+  create_artists(100)
+  compare('artists', '/sync/artists/', '/async/artists/')
+
+@pytest.mark.django_db
+def test_user_detail(create_users):
+  user = create_users(1)[0]
+  compare('user', f'/sync/users/{user.id}/', f'/async/users/{user.id}/')
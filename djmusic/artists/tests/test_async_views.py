@@ -0,0 +1,58 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import path
+from knox.models import AuthToken
+from artists.models import Artist
+from artists.views import AsyncArtistsView
+
+# Routes of an ASYNC_VIEWS deployment, used through pytest.mark.urls
+urlpatterns = [
+  path('artists/', AsyncArtistsView.as_view()),
+]
+pytestmark = pytest.mark.urls(__name__)
+
+def request(method, url, data=None, **headers):
+  async def send():
+    client = AsyncClient()
+    if method == 'post':
+      return await client.post(url, json.dumps(data), content_type='application/json', **headers)
+    return await client.get(url, data, **headers)
+  return async_to_sync(send)()
+
+@pytest.mark.django_db
+def test_async_artists_list(create_artists):
+  create_artists(3)
+  response = request('get', '/artists/', {'page_size': 2})
+  assert response.status_code == 200
+  data = json.loads(response.content)
+  names = sorted(Artist.objects.values_list('stage_name', flat=True))
+  assert [artist['stage_name'] for artist in data['results']] == names[:2]
+  assert data['previous'] is None
+
+  data = json.loads(request('get', data['next']).content)
+  assert [artist['stage_name'] for artist in data['results']] == names[2:]
+  assert data['next'] is None
+  assert data['previous'] is not None
+
+@pytest.mark.django_db
+def test_async_artists_list_is_cached(create_artists, django_assert_num_queries):
+  create_artists(3)
+  response = request('get', '/artists/')
+  with django_assert_num_queries(0):
+    assert json.loads(request('get', '/artists/').content) == json.loads(response.content)
+  # The 4.1 AsyncClient sends extra keyword arguments as plain header names
+  response = request('get', '/artists/', **{'if-none-match': response['ETag']})
+  assert response.status_code == 304
+
+@pytest.mark.django_db
+def test_async_artists_authentication(create_users):
+  user = create_users(1)[0]
+  # Writes are served by ArtistsView
+  assert request('post', '/artists/', {'stage_name': 'New'}).status_code == 401
+  instance, token = AuthToken.objects.create(user)
+  response = request('post', '/artists/', {'stage_name': 'New'}, authorization='Token ' + token)
+  assert response.status_code == 201
+  assert request('get', '/artists/', authorization='Token ' + token).status_code == 200
+  assert request('get', '/artists/', authorization='Token ' + 'ab' * 32).status_code == 401
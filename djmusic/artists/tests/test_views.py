@@ -1,5 +1,12 @@
 import pytest
 import json
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from .test_factories import ArtistFactory
+from albums.tests.test_factories import AlbumFactory, SongFactory
+from artists import stream
+from artists.views import ArtistListView
+from djmusic.asgi import application
 
 @pytest.mark.django_db
 def test_artists_view(auth_client, create_artists):
@@ -8,10 +15,149 @@ def test_artists_view(auth_client, create_artists):
   response = client.get('/artists/')
   
   assert response.status_code == 200
-  assert len(json.loads(response.content)) == len(artists)
-  artists_list = json.loads(response.content)
+  assert len(json.loads(response.content)['results']) == len(artists)
+  artists_list = json.loads(response.content)['results']
   for i in range(len(artists)):
     assert {
       'id': artists[i].id, 'stage_name': artists[i].stage_name, 'social_link': artists[i].social_link
       } in artists_list
 
+@pytest.mark.django_db
+def test_artists_view_cursor_pagination(auth_client, create_artists):
+  artists = create_artists(5)
+  client = auth_client()
+  response = client.get('/artists/', {'page_size': 2})
+  content = json.loads(response.content)
+  assert response.status_code == 200
+  assert content['previous'] is None
+  stage_names = [artist['stage_name'] for artist in content['results']]
+
+  while content['next']:
+    content = json.loads(client.get(content['next']).content)
+    stage_names += [artist['stage_name'] for artist in content['results']]
+
+  assert stage_names == sorted(artist.stage_name for artist in artists)
+
+@pytest.mark.django_db
+def test_artists_view_cached(auth_client, create_artists, django_assert_num_queries):
+  create_artists(3)
+  client = auth_client()
+  client.get('/artists/')
+  with django_assert_num_queries(0):
+    response = client.get('/artists/')
+  assert response.status_code == 200
+  assert len(json.loads(response.content)['results']) == 3
+
+@pytest.mark.django_db
+def test_artists_view_not_modified(auth_client, create_artists):
+  create_artists(3)
+  client = auth_client()
+  etag = client.get('/artists/')['ETag']
+  response = client.get('/artists/', HTTP_IF_NONE_MATCH=etag)
+  assert response.status_code == 304
+  assert response.content == b''
+
+@pytest.mark.django_db
+def test_artists_view_invalidated_on_write(auth_client, create_artists, create_users, django_capture_on_commit_callbacks):
+  create_artists(3)
+  client = auth_client(create_users(1)[0])
+  etag = client.get('/artists/')['ETag']
+  with django_capture_on_commit_callbacks(execute=True):
+    response = client.post('/artists/', {'stage_name': 'new_artist'})
+  assert response.status_code == 201
+
+  response = client.get('/artists/', HTTP_IF_NONE_MATCH=etag)
+  assert response.status_code == 200
+  assert response['ETag'] != etag
+  assert 'new_artist' in [artist['stage_name'] for artist in json.loads(response.content)['results']]
+
+@pytest.mark.django_db
+def test_artist_detail_view(auth_client, django_assert_num_queries):
+  artist = ArtistFactory()
+  albums = AlbumFactory.create_batch(3, artist=artist)
+  for album in albums:
+    SongFactory.create_batch(2, album=album)
+
+  client = auth_client()
+  with django_assert_num_queries(3):
+    response = client.get(f'/artists/{artist.id}/')
+  content = json.loads(response.content)
+  assert response.status_code == 200
+  assert content['album_count'] == 3
+  assert len(content['albums']) == 3
+  assert all(len(album['songs']) == 2 for album in content['albums'])
+
+@pytest.mark.django_db
+def test_artist_detail_view_field_selection(auth_client, django_assert_num_queries):
+  artist = ArtistFactory()
+  SongFactory.create_batch(2, album=AlbumFactory(artist=artist))
+
+  client = auth_client()
+  with django_assert_num_queries(1):
+    response = client.get(f'/artists/{artist.id}/', {'fields': 'id,stage_name'})
+  assert json.loads(response.content) == {'id': artist.id, 'stage_name': artist.stage_name}
+
+  with django_assert_num_queries(3):
+    response = client.get(f'/artists/{artist.id}/', {'fields': 'id,albums.album_name,albums.songs.name'})
+  album = json.loads(response.content)['albums'][0]
+  assert set(album) == {'album_name', 'songs'}
+  assert [set(song) for song in album['songs']] == [{'name'}] * 2
+
+@pytest.mark.django_db
+def test_artist_catalogue_export(auth_client):
+  [artist1, artist2] = sorted(ArtistFactory.create_batch(2), key=lambda artist: artist.stage_name)
+  albums = AlbumFactory.create_batch(2, artist=artist1)
+
+  response = auth_client().get('/artists/catalogue/')
+  assert response.status_code == 200
+  assert response['Content-Type'] == 'application/x-ndjson'
+  lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+  assert [artist['id'] for artist in lines] == [artist1.id, artist2.id]
+  assert [album['id'] for album in lines[0]['albums']] == [album.id for album in albums]
+  assert lines[1]['albums'] == []
+
+  response = auth_client().get('/artists/catalogue/', {'format': 'json'})
+  assert json.loads(b''.join(response.streaming_content)) == lines
+
+async def asgi_get(path, query_string=b''):
+  scope = {'type': 'http', 'path': path, 'method': 'GET', 'headers': [], 'query_string': query_string}
+  communicator = ApplicationCommunicator(application, scope)
+  await communicator.send_input({'type': 'http.request'})
+  start = await communicator.receive_output(5)
+  body = b''
+  while True:
+    message = await communicator.receive_output(5)
+    body += message['body']
+    if not message.get('more_body'):
+      return start, body
+
+# The queries run outside of the event loop of the ASGI entry point
+@pytest.mark.django_db(transaction=True)
+def test_artist_catalogue_export_under_asgi(monkeypatch):
+  monkeypatch.setattr(stream, 'BATCH_SIZE', 2)
+  artists = sorted(ArtistFactory.create_batch(3), key=lambda artist: artist.stage_name)
+  AlbumFactory.create_batch(2, artist=artists[0])
+
+  start, body = async_to_sync(asgi_get)('/artists/catalogue/')
+  assert start['status'] == 200
+  assert dict(start['headers'])[b'content-type'] == b'application/x-ndjson'
+  lines = [json.loads(line) for line in body.splitlines()]
+  assert [artist['id'] for artist in lines] == [artist.id for artist in artists]
+  assert len(lines[0]['albums']) == 2
+
+  start, body = async_to_sync(asgi_get)('/artists/catalogue/', b'format=json')
+  assert dict(start['headers'])[b'content-type'] == b'application/json'
+  assert json.loads(body) == lines
+
+@pytest.mark.django_db
+def test_artist_list_view_page(rf, django_assert_num_queries):
+  artists = sorted(ArtistFactory.create_batch(25), key=lambda artist: artist.stage_name)
+  AlbumFactory.create_batch(3, artist=artists[0])
+
+  # Count, page of artists and the grouped albums of that page
+  with django_assert_num_queries(3):
+    response = ArtistListView.as_view()(rf.get('/', {'page': 1}))
+  page = response.context_data['artists_albums']
+  assert [artist['stage_name'] for artist in page] == [artist.stage_name for artist in artists[:20]]
+  assert len(page[0]['albums']) == 3
+  assert all(artist['albums'] == [] for artist in page[1:])
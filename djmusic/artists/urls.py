@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from django.contrib.auth.decorators import login_required
@@ -5,8 +6,11 @@ from rest_framework.urlpatterns import format_suffix_patterns
 
 app_name = 'artists'
 urlpatterns = [
-  path('', views.ArtistsView.as_view(), name='json_list'),
+  path('', (views.AsyncArtistsView if settings.ASYNC_VIEWS else views.ArtistsView).as_view(), name='json_list'),
+  path('<int:pk>/', views.ArtistDetailView.as_view(), name='detail'),
+  path('catalogue/', views.ArtistCatalogueExportView.as_view(), name='catalogue'),
   # path('old/create/',  login_required(views.CreateArtistView.as_view()), name='create'),
+  # Its template links to the login and create pages, which aren't routed either
   # path('old/', views.ArtistListView.as_view(), name='list')
 ]
 urlpatterns = format_suffix_patterns(urlpatterns)
@@ -1,21 +1,73 @@
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse, JsonResponse, HttpResponseNotModified
+from django.views import View
+from django.core.cache import cache
 from django.shortcuts import redirect
+from django.utils.http import parse_etags
 from django.urls import reverse_lazy
 from .forms import CreateArtistForm
 from .models import Artist
 from django.views.generic import ListView
 from django.views.generic.edit import FormView
-from .serializers import ArtistSerializer
+from .serializers import ArtistSerializer, ArtistDetailSerializer
+from albums.selection import SelectableFieldsViewMixin
+from .pagination import ArtistCursorPagination
+from .catalogue import CONTENT_TYPES, catalogue_rows, encode_artists, group_artist_albums
+from .cache import aget_list_version, list_signature, list_cache_key, list_etag, LIST_CACHE_TIMEOUT
+from authentication.asyncviews import AsyncAPIView
 #from rest_framework.views import APIView
 #from rest_framework.response import Response
+from rest_framework.request import Request
 #from rest_framework import status
 from rest_framework import generics
 from rest_framework import permissions
+from rest_framework import status
+from rest_framework.response import Response
 
 class ArtistsView(generics.ListCreateAPIView):
   queryset = Artist.objects.all()
   serializer_class = ArtistSerializer
   permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+  pagination_class = ArtistCursorPagination
+  # GET requests read from a replica (see djmusic.replicas)
+  read_replica = True
+
+  # Pages are cached under a version that is bumped on every Artist/Album write
+  def list(self, request, *args, **kwargs):
+    signature = list_signature(request)
+    etag = list_etag(signature)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+      return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    key = list_cache_key(signature)
+    data = cache.get(key)
+    if data is None:
+      data = super().list(request, *args, **kwargs).data
+      cache.set(key, data, LIST_CACHE_TIMEOUT)
+    return Response(data, headers={'ETag': etag})
+
+class AsyncArtistsView(AsyncAPIView):
+  sync_view = ArtistsView
+  read_replica = True
+
+  # Same pages and cache entries as ArtistsView.list
+  async def get(self, request):
+    signature = list_signature(request, version=await aget_list_version(), format='json')
+    etag = list_etag(signature)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+      return HttpResponseNotModified(headers={'ETag': etag})
+
+    key = list_cache_key(signature)
+    data = await cache.aget(key)
+    if data is None:
+      paginator = ArtistCursorPagination()
+      page = await paginator.apaginate_queryset(Artist.objects.all(), Request(request))
+      data = paginator.get_paginated_response(ArtistSerializer(page, many=True).data).data
+      await cache.aset(key, data, LIST_CACHE_TIMEOUT)
+    return JsonResponse(data, headers={'ETag': etag})
 
 # class ArtistsView(APIView):
   # """
@@ -33,6 +85,10 @@ class ArtistsView(generics.ListCreateAPIView):
   #     return Response(serializer.data, status=status.HTTP_201_CREATED)
   #   return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ArtistDetailView(SelectableFieldsViewMixin, generics.RetrieveAPIView):
+  queryset = Artist.objects.all()
+  serializer_class = ArtistDetailSerializer
+
 class CreateArtistView(FormView):
   
   form_class = CreateArtistForm
@@ -40,14 +96,15 @@ class CreateArtistView(FormView):
   success_url = reverse_lazy('artists:list')
 
   def form_valid(self, form):
-      if Artist.objects.filter(stage_name=form.cleaned_data['stage_name']).exists():
+      # The unique constraint on stage_name does the existence check in the same query
+      try:
+        with transaction.atomic():
+          Artist.objects.create(stage_name=form.cleaned_data['stage_name'], social_link=form.cleaned_data['social_link'])
+      except IntegrityError:
         form.add_error('stage_name', 'Stage name already exists')
         error = 'Data Error: Please follow the instructions'
         return super().render_to_response({'error': error, 'form': form})
-      else:
-        new_artits = Artist(stage_name=form.cleaned_data['stage_name'], social_link=form.cleaned_data['social_link'])
-        new_artits.save()
-        return super().form_valid(form);
+      return super().form_valid(form)
 
   def form_invalid(self, form):
     error = 'Filling Error: Please fill all the required fields correctly'
@@ -57,23 +114,24 @@ class CreateArtistView(FormView):
 class ArtistListView(ListView):
   context_object_name = 'artists_albums'
   template_name = 'artists/list.html'
+  paginate_by = 20
   
-  # Get all albums grouped and ordered by artists in one SQL query
   def get_queryset(self):
-    # Selection with join
-    return \
-      Artist.objects.all().prefetch_related('album_set').order_by('id') \
-      .values('id', 'stage_name', 'social_link', 'album__id', 'album__album_name', 'album__created', 'album__released_at', 'album__cost')
+    return Artist.objects.only('id').order_by('stage_name', 'id')
     
+  # Albums of the artists in the current page, grouped while the joined rows are read
   def get_context_data(self,**kwargs):
     context = super().get_context_data(**kwargs)
-    data_list = list(context['artists_albums'])
-    organized_data = {}
-    for entry in data_list:
-      if entry['stage_name'] not in organized_data:
-        organized_data[entry['stage_name']] = {'id': entry['id'], 'social_link': entry['social_link'], 'albums': []}
-      organized_data[entry['stage_name']]['albums'].append(entry)
-    
-    context['artists_albums'] = organized_data
+    page_ids = [artist.id for artist in context['artists_albums']]
+    context['artists_albums'] = list(group_artist_albums(catalogue_rows(Artist.objects.filter(pk__in=page_ids))))
     return context
-    
\ No newline at end of file
+
+
+class ArtistCatalogueExportView(View):
+  
+  # Streams every artist with its albums as NDJSON (default) or as a JSON array.
+  # Under ASGI the export is served by artists.stream instead
+  def get(self, request):
+    json_array = request.GET.get('format') == 'json'
+    chunks = encode_artists(group_artist_albums(catalogue_rows()), json_array)
+    return StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[json_array])
@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+from rest_framework.request import Request
+from .auth import CachedTokenAuthentication
+
+# Base of the async API views used with ASYNC_VIEWS under ASGI. They answer
+# with the same JSON as their DRF counterpart, which still serves every
+# method the async view doesn't implement (`sync_view`)
+class AsyncAPIView(View):
+  sync_view = None
+  authentication = CachedTokenAuthentication()
+  parser_classes = (JSONParser, FormParser, MultiPartParser)
+
+  @classmethod
+  def as_view(cls, **initkwargs):
+    view = super().as_view(**initkwargs)
+    # Token authentication, like the DRF views
+    view.csrf_exempt = True
+    return view
+
+  async def dispatch(self, request, *args, **kwargs):
+    method = request.method.lower()
+    handler = getattr(self, method, None) if method in self.http_method_names else None
+    if handler is None or method == 'options':
+      if self.sync_view is not None:
+        return await sync_to_async(self.sync_view.as_view())(request, *args, **kwargs)
+      return self.http_method_not_allowed(request, *args, **kwargs)
+
+    try:
+      result = await self.authentication.aauthenticate(request)
+    except exceptions.AuthenticationFailed as e:
+      return JsonResponse({'detail': e.detail}, status=401, headers={'WWW-Authenticate': self.authentication.authenticate_header(request)})
+    request.user = result[0] if result else AnonymousUser()
+    request.auth = result[1] if result else None
+    # Suffixed URLs (format_suffix_patterns) are always answered with JSON
+    kwargs.pop('format', None)
+    return await handler(request, *args, **kwargs)
+
+  def parse(self, request):
+    return Request(request, parsers=[parser() for parser in self.parser_classes]).data
@@ -0,0 +1,249 @@
+import binascii
+import copy
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Case, When
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from knox.settings import knox_settings
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+
+TOKEN_FIELDS = [field.attname for field in AuthToken._meta.concrete_fields]
+
+
+def _token_values(auth_token):
+  return {name: getattr(auth_token, name) for name in TOKEN_FIELDS}
+
+
+def _token_instance(values, user):
+  auth_token = AuthToken(**values)
+  auth_token._state.adding = False
+  auth_token.user = user
+  return auth_token
+
+
+# Verified token digests, kept in a bounded LRU of the process and in a cache
+# shared by every process (TOKEN_CACHE_ALIAS, if set) for TOKEN_CACHE_TTL.
+# Every user has a generation number, bumped when one of their tokens is
+# deleted or the user is saved; cached entries of an older generation are
+# ignored, so logouts and deactivations take effect immediately. The
+# generation lives in the shared cache when there is one, so that it reaches
+# the other processes as well
+class TokenCache(object):
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.entries = OrderedDict()
+    self.user_digests = defaultdict(set)
+    self.generations = defaultdict(int)
+    self.pending_refresh = {}
+    self.last_refresh = time.monotonic()
+
+  @property
+  def shared(self):
+    alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+  def _generation_key(self, user_id):
+    return 'knox:generation:%s' % user_id
+
+  def _digest_key(self, digest):
+    return 'knox:digest:%s' % digest
+
+  def generation(self, user_id):
+    shared = self.shared
+    if shared is not None:
+      return shared.get(self._generation_key(user_id), 0)
+    with self.lock:
+      return self.generations[user_id]
+
+  async def ageneration(self, user_id):
+    shared = self.shared
+    if shared is not None:
+      return await shared.aget(self._generation_key(user_id), 0)
+    with self.lock:
+      return self.generations[user_id]
+
+  def _lookup(self, digest):
+    with self.lock:
+      entry = self.entries.get(digest)
+      if entry is None:
+        return None
+      if entry[3] < time.monotonic():
+        self._pop(digest)
+        return None
+      self.entries.move_to_end(digest)
+      return entry
+
+  # Returns (token values, user) or None.
+  # Requests may change their user, so the cached instances are never handed out
+  def get(self, digest):
+    entry = self._lookup(digest)
+    if entry is None or entry[2] != self.generation(entry[0]['user_id']):
+      return None
+    return dict(entry[0]), copy.copy(entry[1])
+
+  async def aget(self, digest):
+    entry = self._lookup(digest)
+    if entry is None or entry[2] != await self.ageneration(entry[0]['user_id']):
+      return None
+    return dict(entry[0]), copy.copy(entry[1])
+
+  def get_shared(self, digest):
+    shared = self.shared
+    return shared.get(self._digest_key(digest)) if shared is not None else None
+
+  def set(self, digest, values, user, generation):
+    ttl = getattr(settings, 'TOKEN_CACHE_TTL', 30)
+    with self.lock:
+      self._pop(digest)
+      self.entries[digest] = (values, copy.copy(user), generation, time.monotonic() + ttl)
+      self.user_digests[values['user_id']].add(digest)
+      while len(self.entries) > getattr(settings, 'TOKEN_CACHE_SIZE', 10000):
+        self._pop(next(iter(self.entries)))
+    shared = self.shared
+    if shared is not None:
+      shared.set(self._digest_key(digest), values, ttl)
+
+  def _pop(self, digest):
+    entry = self.entries.pop(digest, None)
+    if entry is not None:
+      digests = self.user_digests[entry[0]['user_id']]
+      digests.discard(digest)
+      if not digests:
+        del self.user_digests[entry[0]['user_id']]
+
+  def invalidate_user(self, user_id, digests=()):
+    with self.lock:
+      self.generations[user_id] += 1
+      for digest in list(self.user_digests.get(user_id, ())):
+        self._pop(digest)
+    shared = self.shared
+    if shared is not None:
+      key = self._generation_key(user_id)
+      if not shared.add(key, 1, None):
+        shared.incr(key)
+      shared.delete_many([self._digest_key(digest) for digest in digests])
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+      self.user_digests.clear()
+      self.generations.clear()
+      self.pending_refresh.clear()
+      self.last_refresh = time.monotonic()
+
+  # Expiry refreshes are collected and written with a single UPDATE at most
+  # every TOKEN_REFRESH_INTERVAL seconds instead of once per request. The
+  # authentication of any later request writes them once they are due
+  def schedule_refresh(self, digest, expiry):
+    with self.lock:
+      self.pending_refresh[digest] = expiry
+      entry = self.entries.get(digest)
+      if entry is not None:
+        entry[0]['expiry'] = expiry
+    if self.refresh_due():
+      self.flush_refreshes()
+
+  def refresh_due(self):
+    with self.lock:
+      elapsed = time.monotonic() - self.last_refresh
+      return bool(self.pending_refresh) and elapsed >= getattr(settings, 'TOKEN_REFRESH_INTERVAL', 60)
+
+  def flush_refreshes(self):
+    with self.lock:
+      pending, self.pending_refresh = self.pending_refresh, {}
+      self.last_refresh = time.monotonic()
+    self.write_refreshes(pending)
+
+  def write_refreshes(self, pending):
+    if pending:
+      AuthToken.objects.filter(digest__in=list(pending)).update(
+        expiry=Case(*[When(digest=digest, then=expiry) for digest, expiry in pending.items()])
+      )
+
+
+token_cache = TokenCache()
+
+
+# knox TokenAuthentication answering from token_cache. A cached request costs
+# no query at all (one user query if only the shared cache has the digest),
+# while knox looks the token up, cleans up the expired tokens of the user and
+# possibly writes the new expiry on every request
+class CachedTokenAuthentication(TokenAuthentication):
+  def _digest(self, token):
+    try:
+      return hash_token(token.decode('utf-8'))
+    except (TypeError, binascii.Error, UnicodeDecodeError):
+      raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+  def _cached_token(self, cached):
+    values, user = cached
+    if values['expiry'] is None or values['expiry'] >= timezone.now():
+      return _token_instance(values, user)
+    return None
+
+  def authenticate_credentials(self, token):
+    if token_cache.refresh_due():
+      token_cache.flush_refreshes()
+    digest = self._digest(token)
+    cached = token_cache.get(digest)
+    if cached is None:
+      cached = self.load_shared(digest)
+    auth_token = self._cached_token(cached) if cached is not None else None
+    if auth_token is not None:
+      if knox_settings.AUTO_REFRESH and auth_token.expiry:
+        self.renew_token(auth_token)
+      return self.validate_user(auth_token)
+
+    # The generation is read before knox loads the token, so a logout running
+    # meanwhile can't leave it cached as valid
+    user_id = AuthToken.objects.filter(digest=digest).values_list('user_id', flat=True).first()
+    generation = token_cache.generation(user_id) if user_id else None
+    user, auth_token = super().authenticate_credentials(token)
+    token_cache.set(digest, _token_values(auth_token), user, generation)
+    return user, auth_token
+
+  # For async views: tokens of the in-process cache are checked without
+  # leaving the event loop, anything else goes through the sync path in a thread
+  async def aauthenticate(self, request):
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != knox_settings.AUTH_HEADER_PREFIX.encode().lower():
+      return None
+    if len(auth) != 2:
+      return await sync_to_async(self.authenticate)(request)
+
+    if token_cache.refresh_due():
+      await sync_to_async(token_cache.flush_refreshes)()
+    cached = await token_cache.aget(self._digest(auth[1]))
+    auth_token = self._cached_token(cached) if cached is not None else None
+    if auth_token is None:
+      return await sync_to_async(self.authenticate_credentials)(auth[1])
+    if knox_settings.AUTO_REFRESH and auth_token.expiry:
+      await sync_to_async(self.renew_token)(auth_token)
+    return self.validate_user(auth_token)
+
+  def load_shared(self, digest):
+    values = token_cache.get_shared(digest)
+    if values is None:
+      return None
+    generation = token_cache.generation(values['user_id'])
+    user = get_user_model()._default_manager.filter(pk=values['user_id']).first()
+    if user is None:
+      return None
+    token_cache.set(digest, values, user, generation)
+    return values, user
+
+  def renew_token(self, auth_token):
+    new_expiry = timezone.now() + knox_settings.TOKEN_TTL
+    if (new_expiry - auth_token.expiry).total_seconds() > knox_settings.MIN_REFRESH_INTERVAL:
+      auth_token.expiry = new_expiry
+      token_cache.schedule_refresh(auth_token.digest, new_expiry)
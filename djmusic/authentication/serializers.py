@@ -1,10 +1,14 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from rest_framework.validators import UniqueValidator
 from users.models import User
+from users.serializers import unique_errors
 from django.contrib.auth.password_validation import validate_password
 
 class RegisterSerializer(serializers.ModelSerializer):
-  username = serializers.CharField(required=True, validators=[UniqueValidator(queryset=User.objects.all())])
+  # Uniqueness is checked by the database on insert instead of a query per field
+  username = serializers.CharField(required=True, max_length=150, validators=[UnicodeUsernameValidator()])
   email = serializers.EmailField(required=False)
   password1 = serializers.CharField(write_only=True, required=True, validators=[validate_password])
   password2 = serializers.CharField(write_only=True, required=True)
@@ -12,10 +16,8 @@ class RegisterSerializer(serializers.ModelSerializer):
     model = User
     fields = ['username', 'email', 'password1', 'password2']
 
-  # Case insensitive validation
+  # Case insensitive, the database has a unique index on Lower(email)
   def validate_email(self,value):
-    if User.objects.filter(email=value.lower()).exists():
-      raise serializers.ValidationError("This field must be unique.")
     return value.lower()
 
   def validate(self, attrs):
@@ -23,12 +25,32 @@ class RegisterSerializer(serializers.ModelSerializer):
       raise serializers.ValidationError({"password2": "Password fields do not match"})
     
     return attrs
-  
-  def create(self, validated_data):
-    if('email' not in validated_data):
-      validated_data['email'] = ''
 
-    user = User.objects.create_user(username=validated_data['username'], email=validated_data['email'].lower(), password=validated_data['password1'])    
-    
+  # An invalid registration reports taken usernames and emails along with the other errors
+  def run_validation(self, data=serializers.empty):
+    try:
+      return super().run_validation(data)
+    except serializers.ValidationError as e:
+      if isinstance(e.detail, dict) and hasattr(data, 'get'):
+        username = data.get('username') if 'username' not in e.detail else None
+        email = data.get('email') if 'email' not in e.detail else None
+        for field, messages in unique_errors(username, email).items():
+          e.detail.setdefault(field, []).extend(serializers.ErrorDetail(message, code='unique') for message in messages)
+      raise
+
+  # `password` may be the hash computed beforehand by the async registration view
+  def create(self, validated_data):
+    user = User(
+      username=User.normalize_username(validated_data['username']),
+      email=validated_data.get('email', ''),
+      password=validated_data.get('password') or make_password(validated_data['password1'])
+    )
+    try:
+      with transaction.atomic():
+        user.save(force_insert=True)
+    except IntegrityError:
+      errors = unique_errors(user.username, user.email)
+      if not errors:
+        raise
+      raise serializers.ValidationError(errors)
     return user
-  
\ No newline at end of file
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from knox.models import AuthToken
+from .auth import token_cache
+
+# Covers logout, logout from all devices, expired tokens cleaned up by knox and the admin
+@receiver(post_delete, sender=AuthToken, dispatch_uid='invalidate_deleted_token')
+def invalidate_deleted_token(sender, instance, **kwargs):
+  token_cache.invalidate_user(instance.user_id, [instance.digest])
+
+# Fields deciding whether a cached token still authenticates its user
+AUTH_FIELDS = {'is_active', 'password', 'is_staff', 'is_superuser'}
+
+# Cached tokens keep a copy of their user, which may have been deactivated.
+# Saves of other fields only (last_login at every login, password rehashes
+# keep the password valid, profile edits) keep the tokens cached
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='invalidate_user_tokens')
+def invalidate_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+  if not created and (update_fields is None or AUTH_FIELDS & set(update_fields)):
+    token_cache.invalidate_user(instance.pk)
@@ -1,5 +1,8 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
+from knox.models import AuthToken
+from authentication.auth import token_cache
 from .test_factories import UserFactory
 
 @pytest.fixture
@@ -16,3 +19,24 @@ def create_users():
   def batch_create(n = 3):
     return UserFactory.create_batch(n)
   return batch_create
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+  token_cache.clear()
+  yield
+  token_cache.clear()
+
+@pytest.fixture
+def token_client():
+  def make_client(user):
+    instance, token = AuthToken.objects.create(user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+    return client
+  return make_client
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+  cache.clear()
+  yield
+  cache.clear()
@@ -0,0 +1,149 @@
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from knox.models import AuthToken
+from authentication import auth
+from authentication.auth import token_cache
+
+def get_user(client, user):
+  return client.get(f'/users/{user.id}/')
+
+@pytest.mark.django_db
+def test_cached_token_needs_no_query(token_client, create_users, django_assert_num_queries):
+  user = create_users(1)[0]
+  client = token_client(user)
+  assert get_user(client, user).status_code == 200
+  # The user details are cached as well
+  with django_assert_num_queries(0):
+    assert get_user(client, user).status_code == 200
+
+@pytest.mark.django_db
+def test_invalid_token(auth_client, create_users):
+  client = auth_client()
+  client.credentials(HTTP_AUTHORIZATION='Token zz')
+  assert client.get('/users/1/').status_code == 401
+  client.credentials(HTTP_AUTHORIZATION='Token ' + 'ab' * 32)
+  assert client.get('/users/1/').status_code == 401
+
+@pytest.mark.django_db
+def test_logout_invalidates_cached_token(token_client, create_users):
+  user = create_users(1)[0]
+  client = token_client(user)
+  other = token_client(user)
+  assert get_user(client, user).status_code == 200
+  assert get_user(other, user).status_code == 200
+  assert client.post('/authentication/logout/').status_code == 204
+  assert get_user(client, user).status_code == 401
+  assert get_user(other, user).status_code == 200
+  assert AuthToken.objects.count() == 1
+
+@pytest.mark.django_db
+def test_logout_all_invalidates_cached_tokens(token_client, create_users):
+  user = create_users(1)[0]
+  clients = [token_client(user) for _ in range(2)]
+  for client in clients:
+    assert get_user(client, user).status_code == 200
+  assert clients[0].post('/authentication/logoutall/').status_code == 204
+  for client in clients:
+    assert get_user(client, user).status_code == 401
+  assert not AuthToken.objects.exists()
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected(token_client, create_users):
+  user = create_users(1)[0]
+  client = token_client(user)
+  assert get_user(client, user).status_code == 200
+  user.is_active = False
+  user.save()
+  assert get_user(client, user).status_code == 401
+
+@pytest.mark.django_db
+def test_unrelated_user_saves_keep_tokens_cached(token_client, create_users, django_assert_num_queries):
+  user = create_users(1)[0]
+  client = token_client(user)
+  assert get_user(client, user).status_code == 200
+  user.last_login = timezone.now()
+  user.save(update_fields=['last_login'])
+  user.bio = 'Updated'
+  user.save(update_fields=['bio'])
+  with django_assert_num_queries(0):
+    assert get_user(client, user).status_code == 200
+  user.is_active = False
+  user.save(update_fields=['is_active'])
+  assert get_user(client, user).status_code == 401
+
+@pytest.mark.django_db
+def test_expired_cached_token_is_rejected(token_client, create_users):
+  user = create_users(1)[0]
+  client = token_client(user)
+  assert get_user(client, user).status_code == 200
+  AuthToken.objects.update(expiry=timezone.now() - timedelta(seconds=1))
+  token_cache.entries[AuthToken.objects.get().digest][0]['expiry'] = timezone.now() - timedelta(seconds=1)
+  assert get_user(client, user).status_code == 401
+  assert not AuthToken.objects.exists()
+
+@pytest.mark.django_db
+def test_cache_is_bounded(token_client, create_users, settings):
+  settings.TOKEN_CACHE_SIZE = 2
+  user = create_users(1)[0]
+  for _ in range(3):
+    assert get_user(token_client(user), user).status_code == 200
+  assert len(token_cache.entries) == 2
+
+@pytest.mark.django_db
+def test_shared_cache(token_client, create_users, settings, django_assert_num_queries):
+  settings.TOKEN_CACHE_ALIAS = 'default'
+  cache.clear()
+  user = create_users(1)[0]
+  client = token_client(user)
+  assert get_user(client, user).status_code == 200
+  # Another process only finds the digest in the shared cache and loads the user
+  token_cache.entries.clear()
+  with django_assert_num_queries(1):
+    assert get_user(client, user).status_code == 200
+  # Logouts of other processes are seen through the shared generation
+  cache.set('knox:generation:%s' % user.id, 1)
+  with django_assert_num_queries(1):
+    assert get_user(client, user).status_code == 200
+  assert client.post('/authentication/logout/').status_code == 204
+  assert get_user(client, user).status_code == 401
+
+@pytest.mark.django_db
+def test_expiry_refreshes_are_coalesced(token_client, create_users, settings, monkeypatch, django_assert_num_queries):
+  monkeypatch.setattr(auth.knox_settings, 'AUTO_REFRESH', True)
+  monkeypatch.setattr(auth.knox_settings, 'MIN_REFRESH_INTERVAL', 0)
+  settings.TOKEN_REFRESH_INTERVAL = 3600
+  user = create_users(1)[0]
+  clients = [token_client(user) for _ in range(2)]
+  before = dict(AuthToken.objects.values_list('digest', 'expiry'))
+  for client in clients:
+    get_user(client, user)
+  with django_assert_num_queries(0):
+    for client in clients:
+      get_user(client, user)
+  assert dict(AuthToken.objects.values_list('digest', 'expiry')) == before
+
+  with django_assert_num_queries(1):
+    token_cache.flush_refreshes()
+  for digest, expiry in AuthToken.objects.values_list('digest', 'expiry'):
+    assert expiry > before[digest]
+
+@pytest.mark.django_db
+def test_due_refreshes_are_written_by_later_requests(token_client, create_users, settings, monkeypatch):
+  monkeypatch.setattr(auth.knox_settings, 'AUTO_REFRESH', True)
+  monkeypatch.setattr(auth.knox_settings, 'MIN_REFRESH_INTERVAL', 0)
+  settings.TOKEN_REFRESH_INTERVAL = 3600
+  user = create_users(1)[0]
+  client = token_client(user)
+  before = dict(AuthToken.objects.values_list('digest', 'expiry'))
+  get_user(client, user)
+  assert token_cache.pending_refresh
+
+  # Once the interval passed, a request that doesn't refresh its token writes them
+  monkeypatch.setattr(auth.knox_settings, 'MIN_REFRESH_INTERVAL', 10 ** 9)
+  token_cache.last_refresh -= 3600
+  assert get_user(client, user).status_code == 200
+  assert not token_cache.pending_refresh
+  for digest, expiry in AuthToken.objects.values_list('digest', 'expiry'):
+    assert expiry > before[digest]
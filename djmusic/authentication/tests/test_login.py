@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from users.hashers import upgrades
+from users.models import User
+
+CREDENTIALS = {'username': 'user1234', 'password': 'Strong1234Pass'}
+
+@pytest.fixture
+def user():
+  return User.objects.create_user(**CREDENTIALS)
+
+@pytest.mark.django_db
+def test_login_starts_a_session_by_default(auth_client, user):
+  response = auth_client().post('/authentication/login/', CREDENTIALS)
+  assert response.status_code == 200
+  assert 'sessionid' in response.cookies
+  assert Session.objects.count() == 1
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', ['?session=false', '?session=0'])
+def test_token_only_login(auth_client, user, params):
+  response = auth_client().post('/authentication/login/' + params, CREDENTIALS)
+  assert response.status_code == 200
+  assert response.data['user']['id'] == user.id
+  assert 'sessionid' not in response.cookies
+  assert not Session.objects.exists()
+  user.refresh_from_db()
+  assert user.last_login is not None
+
+@pytest.mark.django_db
+def test_token_only_login_by_default(auth_client, user, settings):
+  settings.LOGIN_SESSION = False
+  assert 'sessionid' not in auth_client().post('/authentication/login/', CREDENTIALS).cookies
+  response = auth_client().post('/authentication/login/', {**CREDENTIALS, 'session': 'true'})
+  assert 'sessionid' in response.cookies
+
+@pytest.mark.django_db
+def test_login_ignores_authorization_header(auth_client, user):
+  client = auth_client()
+  client.credentials(HTTP_AUTHORIZATION='Token invalid')
+  assert client.post('/authentication/login/?session=false', CREDENTIALS).status_code == 200
+
+@pytest.mark.django_db(transaction=True)
+def test_outdated_hash_is_upgraded_in_background(auth_client, user, settings):
+  settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+  user.set_password(CREDENTIALS['password'])
+  user.save()
+  settings.PASSWORD_PBKDF2_ITERATIONS = 2000
+
+  response = auth_client().post('/authentication/login/?session=false', CREDENTIALS)
+  assert response.status_code == 200
+  upgrades.wait(timeout=10)
+  user.refresh_from_db()
+  assert user.password.startswith('pbkdf2_sha256$2000$')
+  assert user.check_password(CREDENTIALS['password'])
+
+@pytest.mark.django_db(transaction=True)
+def test_upgrade_keeps_a_changed_password(user, settings):
+  settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+  user.set_password(CREDENTIALS['password'])
+  user.save()
+  outdated = user.password
+  User.objects.filter(pk=user.pk).update(password='changed')
+  upgrades.schedule(User, user.pk, CREDENTIALS['password'], outdated)
+  upgrades.wait(timeout=10)
+  assert User.objects.get(pk=user.pk).password == 'changed'
+
+def test_benchmark_hashers(capsys):
+  call_command('benchmark_hashers', iterations=[100, 200], rounds=1, target_ms=1)
+  output = capsys.readouterr().out
+  assert '100 iterations' in output and '200 iterations' in output
+  assert 'iterations take 1ms' in output
@@ -0,0 +1,69 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from authentication.views import AsyncRegisterView
+from users.models import User
+
+VALID = {'username': 'user123456', 'email': 'Email@Example.com', 'password1': 'Strong123Pass', 'password2': 'Strong123Pass'}
+
+def register_async(data):
+  async def post():
+    request = AsyncRequestFactory().post('/authentication/register/', json.dumps(data), content_type='application/json')
+    return await AsyncRegisterView.as_view()(request)
+  return async_to_sync(post)()
+
+@pytest.mark.django_db
+def test_register_checks_uniqueness_with_the_insert(auth_client):
+  with CaptureQueriesContext(connection) as context:
+    response = auth_client().post('/authentication/register/', VALID)
+  assert response.status_code == 201
+  statements = [query['sql'].split()[0] for query in context.captured_queries]
+  assert 'SELECT' not in statements
+  assert statements.count('INSERT') == 1
+
+@pytest.mark.django_db
+def test_register_email_is_unique_regardless_of_case(auth_client, create_users):
+  user = create_users(1)[0]
+  User.objects.filter(pk=user.pk).update(email='Taken@Example.com')
+  response = auth_client().post('/authentication/register/', {**VALID, 'email': 'taken@EXAMPLE.com'})
+  assert response.status_code == 400
+  assert response.data == {'email': ['This field must be unique.']}
+  response = auth_client().post('/authentication/register/', {**VALID, 'username': user.username})
+  assert response.status_code == 400
+  assert response.data == {'username': ['This field must be unique.']}
+
+@pytest.mark.django_db
+def test_users_without_email_are_not_conflicting(auth_client):
+  for username in ('first', 'second'):
+    data = {key: value for key, value in VALID.items() if key != 'email'}
+    assert auth_client().post('/authentication/register/', {**data, 'username': username}).status_code == 201
+  assert User.objects.filter(email='').count() == 2
+
+@pytest.mark.django_db
+def test_user_update_to_taken_email(auth_client, create_users):
+  user1, user2 = create_users(2)
+  response = auth_client(user1).patch(f'/users/{user1.id}/', {'email': user2.email.upper()})
+  assert response.status_code == 400
+  assert response.data == {'email': ['This field must be unique.']}
+
+@pytest.mark.django_db
+def test_async_register(create_users):
+  response = register_async(VALID)
+  assert response.status_code == 201
+  assert json.loads(response.content) == {'username': 'user123456', 'email': 'email@example.com'}
+  user = User.objects.get(username='user123456')
+  assert user.check_password('Strong123Pass')
+
+  response = register_async({**VALID, 'username': 'other'})
+  assert response.status_code == 400
+  assert json.loads(response.content) == {'email': ['This field must be unique.']}
+
+@pytest.mark.django_db
+def test_async_register_invalid():
+  response = register_async({'username': 'user123456', 'password1': 'weak'})
+  assert response.status_code == 400
+  errors = json.loads(response.content)
+  assert set(errors) == {'password1', 'password2'}
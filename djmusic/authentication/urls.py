@@ -1,12 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from rest_framework.urlpatterns import format_suffix_patterns
 
 app_name = 'authentication'
 urlpatterns = [
-  path('register/', views.RegisterView.as_view(), name='register'),
+  path('register/', (views.AsyncRegisterView if settings.ASYNC_VIEWS else views.RegisterView).as_view(), name='register'),
   path('login/', views.LoginView.as_view(), name='login'),
   path('logout/', views.LogoutView.as_view(), name='logout'),
+  path('logoutall/', views.LogoutAllView.as_view(), name='logout_all'),
   
 ]
 urlpatterns = format_suffix_patterns(urlpatterns)
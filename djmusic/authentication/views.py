@@ -2,24 +2,71 @@ from rest_framework import generics
 from rest_framework import permissions
 from .serializers import RegisterSerializer
 from users.serializers import UserSerializer
-from knox.views import LoginView as KnoxLoginView, LogoutView as KnoxLogoutView
+from knox.views import LoginView as KnoxLoginView, LogoutView as KnoxLogoutView, LogoutAllView as KnoxLogoutAllView
+from .auth import CachedTokenAuthentication
 from rest_framework.authtoken.serializers import AuthTokenSerializer
+from django.conf import settings
 from django.contrib.auth import login, logout
-from django.http import HttpResponse
+from django.contrib.auth.signals import user_logged_in
+from django.utils import timezone
+from knox.models import AuthToken
+from rest_framework.response import Response
+from django.http import HttpResponse, JsonResponse
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import ValidationError
+from .asyncviews import AsyncAPIView
+from users.hashers import make_password_async
 class RegisterView(generics.CreateAPIView):
   permission_classes = [permissions.AllowAny]
   serializer_class = RegisterSerializer
 
+class AsyncRegisterView(AsyncAPIView):
+  sync_view = RegisterView
+
+  # The password is hashed on the hashing pool, only validation and the insert run in the sync thread
+  async def post(self, request):
+    serializer = RegisterSerializer(data=self.parse(request))
+    if not await sync_to_async(serializer.is_valid)():
+      return JsonResponse(serializer.errors, status=400)
+    password = await make_password_async(serializer.validated_data['password1'])
+    try:
+      await sync_to_async(serializer.save)(password=password)
+    except ValidationError as e:
+      return JsonResponse(e.detail, status=400)
+    return JsonResponse(serializer.data, status=201)
+
 class LoginView(KnoxLoginView):
   permission_classes = (permissions.AllowAny,)
-  
+  # The credentials are checked by AuthTokenSerializer, don't authenticate the request as well
+  authentication_classes = ()
+
+  # A session is only started if asked for (?session=true or LOGIN_SESSION),
+  # it costs a session row and a CSRF token that token clients never use
+  def wants_session(self, request):
+    value = request.query_params.get('session', request.data.get('session'))
+    if value is None:
+      return settings.LOGIN_SESSION
+    return str(value).lower() not in ('0', 'false', 'no', 'off')
+
   def post(self, request, format=None):
-    serializer = AuthTokenSerializer(data=request.data)
+    serializer = AuthTokenSerializer(data=request.data, context={'request': request})
     serializer.is_valid(raise_exception=True)
     user = serializer.validated_data['user']
-    login(request, user)
-    return super(LoginView, self).post(request, format=None)
-  
+
+    token_limit_per_user = self.get_token_limit_per_user()
+    if token_limit_per_user is not None:
+      if user.auth_token_set.filter(expiry__gt=timezone.now()).count() >= token_limit_per_user:
+        return Response({'error': 'Maximum amount of tokens allowed per user exceeded.'}, status=403)
+    instance, token = AuthToken.objects.create(user, self.get_token_ttl())
+
+    # Both send user_logged_in once, which updates last_login
+    if self.wants_session(request):
+      login(request, user)
+    else:
+      request.user = user
+      user_logged_in.send(sender=user.__class__, request=request, user=user)
+    return Response(self.get_post_response_data(request, token, instance))
+
   def get_post_response_data(self, request, token, instance):
     UserSerializer = self.get_user_serializer_class()
     
@@ -34,7 +81,20 @@ class LoginView(KnoxLoginView):
     return UserSerializer
 
 class LogoutView(KnoxLogoutView):
+  authentication_classes = (CachedTokenAuthentication,)
+
+  # Deleting the token also drops it from the token cache (see authentication.signals)
+  def post(self, request, format=None):
+    if request.auth is not None:
+      request.auth.delete()
+    logout(request)
+    return HttpResponse(status=204)
+
+class LogoutAllView(KnoxLogoutAllView):
+  authentication_classes = (CachedTokenAuthentication,)
+
   def post(self, request, format=None):
+    request.user.auth_token_set.all().delete()
     logout(request)
     return HttpResponse(status=204)
 
@@ -0,0 +1,76 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Min
+from django.utils import timezone
+from .models import Change, ChangeCursor
+
+FIELDS = ('id', 'kind', 'object_id', 'action', 'fields', 'created')
+
+
+# Reads the change feed in id order after `position`, `batch_size` changes at
+# a time. Ids are allocated when a change is inserted but only become visible
+# when its transaction commits, so on PostgreSQL a gap in the ids may be a
+# transaction still running. The changes after a gap are held back until
+# every transaction that was running when it was seen has finished, a gap
+# still there afterwards was rolled back and is skipped. This relies on
+# changes being inserted after the write they describe, so that their
+# transaction already has an id when it allocates theirs.
+# SQLite runs one writing transaction at a time, its ids become visible in order
+class ChangeReader(object):
+  def __init__(self, position=0, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    self.position = position
+    self.batch_size = batch_size
+    self.using = using
+    # (position, snapshot xmax) of the gap being waited on
+    self.gap = None
+
+  @property
+  def tracks_gaps(self):
+    return connections[self.using].vendor == 'postgresql'
+
+  # xmin and xmax of a new PostgreSQL snapshot: the oldest running transaction
+  # and the first transaction id not yet assigned
+  def horizon(self):
+    with connections[self.using].cursor() as cursor:
+      cursor.execute('SELECT txid_snapshot_xmin(s), txid_snapshot_xmax(s) FROM (SELECT txid_current_snapshot() AS s) AS snapshot')
+      return cursor.fetchone()
+
+  def read(self):
+    settled = not self.tracks_gaps
+    if not settled and self.gap is not None and self.gap[0] == self.position:
+      settled = self.horizon()[0] >= self.gap[1]
+
+    changes = Change.objects.using(self.using).filter(pk__gt=self.position).order_by('pk').values(*FIELDS)
+    batch = []
+    expected = self.position + 1
+    for change in changes[:self.batch_size]:
+      if change['id'] != expected and not (settled and not batch):
+        if not batch and (self.gap is None or self.gap[0] != self.position):
+          self.gap = (self.position, self.horizon()[1])
+        break
+      batch.append(change)
+      expected = change['id'] + 1
+    if batch:
+      self.position = batch[-1]['id']
+    return batch
+
+
+def cursor_for(consumer, using=DEFAULT_DB_ALIAS):
+  return ChangeCursor.objects.using(using).get_or_create(consumer=consumer)[0]
+
+
+def acknowledge(consumer, position, using=DEFAULT_DB_ALIAS):
+  ChangeCursor.objects.using(using).filter(consumer=consumer).update(position=position, modified=timezone.now())
+
+
+# Deletes the changes every consumer has acknowledged but the last `keep`,
+# returns how many
+def prune(using=DEFAULT_DB_ALIAS, keep=0):
+  position = ChangeCursor.objects.using(using).aggregate(position=Min('position'))['position']
+  if not position:
+    return 0
+  if keep:
+    kept = Change.objects.using(using).order_by('-pk').values_list('pk', flat=True)[keep:keep + 1]
+    if not kept:
+      return 0
+    position = min(position, kept[0])
+  return Change.objects.using(using).filter(pk__lte=position).delete()[0]
@@ -0,0 +1,62 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+from changes.feed import ChangeReader, acknowledge, cursor_for, prune
+
+class Command(BaseCommand):
+  help = 'Stream the catalogue change feed in id order, acknowledging every batch'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--consumer', default='default', help='Name the position is stored under')
+    parser.add_argument('--handler', help='Dotted path of a callable receiving every batch (a list of dicts), JSON lines on stdout by default')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Changes read and acknowledged together')
+    parser.add_argument('--from-id', type=int, help='Start after this change id instead of the stored position')
+    parser.add_argument('--limit', type=int, help='Stop after this many changes')
+    parser.add_argument('--follow', action='store_true', help='Keep waiting for new changes')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between reads when there is no new change')
+    parser.add_argument('--prune', action='store_true', help='Delete the changes acknowledged by every consumer before exiting')
+    # The event streams read the outbox without a cursor (see events.backends)
+    parser.add_argument(
+      '--keep', type=int, default=settings.EVENTS_REPLAY_SIZE,
+      help='Changes kept by --prune for the event streams, EVENTS_REPLAY_SIZE by default'
+    )
+
+  def handle(self, *args, **options):
+    try:
+      handler = import_string(options['handler']) if options['handler'] else self.write
+    except ImportError as e:
+      raise CommandError(e)
+    consumer = options['consumer']
+    cursor = cursor_for(consumer)
+    reader = ChangeReader(cursor.position if options['from_id'] is None else options['from_id'], options['batch_size'])
+    limit = options['limit']
+    consumed = 0
+    start = time.monotonic()
+
+    try:
+      while limit is None or consumed < limit:
+        if limit is not None:
+          reader.batch_size = min(options['batch_size'], limit - consumed)
+        batch = reader.read()
+        if batch:
+          handler(batch)
+          # At least once: a batch is acknowledged after it was handled
+          acknowledge(consumer, reader.position)
+          consumed += len(batch)
+        elif options['follow']:
+          time.sleep(options['poll_interval'])
+        else:
+          break
+    except KeyboardInterrupt:
+      pass
+
+    if options['prune']:
+      self.stderr.write('Pruned %d changes' % prune(keep=options['keep']))
+    elapsed = time.monotonic() - start
+    self.stderr.write('Consumed %d changes in %.1fs, %s is at change %d' % (consumed, elapsed, consumer, reader.position))
+
+  def write(self, batch):
+    self.stdout.write('\n'.join(json.dumps(change, cls=DjangoJSONEncoder) for change in batch))
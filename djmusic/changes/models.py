@@ -0,0 +1,36 @@
+from django.db import models
+
+# Outbox of the catalogue writes: one row per created, updated, approved or
+# deleted artist, album or song, inserted in the transaction of the write
+# (see changes.outbox and changes.signals). Consumers read it in id order
+# and store the last id they processed in a ChangeCursor
+class Change(models.Model):
+  ARTIST = 'artist'
+  ALBUM = 'album'
+  SONG = 'song'
+  KIND_CHOICES = [(ARTIST, 'Artist'), (ALBUM, 'Album'), (SONG, 'Song')]
+  CREATED = 'created'
+  UPDATED = 'updated'
+  APPROVED = 'approved'
+  DELETED = 'deleted'
+  ACTION_CHOICES = [(CREATED, 'Created'), (UPDATED, 'Updated'), (APPROVED, 'Approved'), (DELETED, 'Deleted')]
+
+  kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+  object_id = models.BigIntegerField()
+  action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+  # Fields written by an update, null when they are not known (a full save)
+  fields = models.JSONField(null=True, blank=True)
+  created = models.DateTimeField(auto_now_add=True)
+
+  def __str__(self):
+    return '%s %s %s' % (self.kind, self.object_id, self.action)
+
+
+# Position of a consumer of the change feed, the id of the last change it acknowledged
+class ChangeCursor(models.Model):
+  consumer = models.CharField(max_length=100, unique=True)
+  position = models.BigIntegerField(default=0)
+  modified = models.DateTimeField(auto_now=True)
+
+  def __str__(self):
+    return '%s at %d' % (self.consumer, self.position)
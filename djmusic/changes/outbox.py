@@ -0,0 +1,77 @@
+from django.db import models, router, transaction
+from django.dispatch import Signal
+from .models import Change
+
+BATCH_SIZE = 1000
+# Updates setting these fields to True are recorded as approvals
+APPROVAL_FIELDS = {Change.ALBUM: 'is_approved'}
+
+
+def action_for(model, values):
+  field = APPROVAL_FIELDS.get(model._meta.model_name)
+  return Change.APPROVED if field and values.get(field) is True else Change.UPDATED
+
+
+def build_changes(model, action, object_ids, fields=None):
+  kind = model._meta.model_name
+  return [Change(kind=kind, object_id=object_id, action=action, fields=fields) for object_id in object_ids]
+
+
+# Sent with every list of changes added to the outbox, in their transaction
+# and before their insert, so that the outbox table stays locked for as short
+# as possible. Every catalogue write goes through it, bulk and imported ones
+# included
+changes_recorded = Signal()
+
+
+# Adds changes to the outbox, in the current transaction of `using`
+def insert_changes(changes, using=None):
+  using = using or router.db_for_write(Change)
+  changes_recorded.send(sender=Change, changes=changes, using=using)
+  Change.objects.using(using).bulk_create(changes, batch_size=BATCH_SIZE)
+
+
+def record(model, action, object_ids, fields=None, using=None):
+  insert_changes(build_changes(model, action, object_ids, fields), using=using)
+
+
+# QuerySet recording its bulk writes in the outbox. update() locks and
+# records the rows it changes, updates of the model's outbox_ignored_fields
+# only (derived counters) are not recorded. bulk_create() records the created
+# objects, except with ignore_conflicts or update_conflicts where it can't
+# tell which rows were written: callers record those themselves
+class OutboxQuerySet(models.QuerySet):
+  def update(self, **kwargs):
+    ignored = getattr(self.model, 'outbox_ignored_fields', ())
+    if self.query.is_sliced or all(name in ignored for name in kwargs):
+      return super().update(**kwargs)
+    with transaction.atomic(using=self.db, savepoint=False):
+      object_ids = list(self.select_for_update().order_by().values_list('pk', flat=True))
+      updated = 0
+      for start in range(0, len(object_ids), BATCH_SIZE):
+        updated += models.QuerySet(self.model, using=self.db) \
+          .filter(pk__in=object_ids[start:start + BATCH_SIZE]).update(**kwargs)
+      record(self.model, action_for(self.model, kwargs), object_ids, fields=sorted(kwargs), using=self.db)
+    return updated
+
+  def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False, update_fields=None, unique_fields=None):
+    with transaction.atomic(using=self.db, savepoint=False):
+      objs = super().bulk_create(
+        objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts,
+        update_conflicts=update_conflicts, update_fields=update_fields, unique_fields=unique_fields
+      )
+      if not ignore_conflicts and not update_conflicts:
+        record(self.model, Change.CREATED, [obj.pk for obj in objs if obj.pk is not None], using=self.db)
+    return objs
+
+
+OutboxManager = models.Manager.from_queryset(OutboxQuerySet)
+
+
+# Saves run in a transaction, so that the change recorded by changes.signals
+# is committed or rolled back with the row
+class OutboxMixin(object):
+  def save_base(self, *args, using=None, **kwargs):
+    using = using or router.db_for_write(self.__class__, instance=self)
+    with transaction.atomic(using=using, savepoint=False):
+      super().save_base(*args, using=using, **kwargs)
@@ -0,0 +1,44 @@
+from collections import defaultdict
+from weakref import WeakKeyDictionary
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from albums.models import Album, Song
+from artists.models import Artist
+from .models import Change
+from .outbox import APPROVAL_FIELDS, build_changes, insert_changes, record
+
+@receiver(post_save, sender=Artist, dispatch_uid='changes_save_artist')
+@receiver(post_save, sender=Album, dispatch_uid='changes_save_album')
+@receiver(post_save, sender=Song, dispatch_uid='changes_save_song')
+def record_save(sender, instance, created, raw=False, update_fields=None, using=None, **kwargs):
+  if raw:
+    return
+  if created:
+    action = Change.CREATED
+  else:
+    action = Change.UPDATED
+    approval_field = APPROVAL_FIELDS.get(sender._meta.model_name)
+    if approval_field and getattr(instance, approval_field) and not instance.tracker.previous(approval_field):
+      action = Change.APPROVED
+  fields = sorted(update_fields) if update_fields and not created else None
+  record(sender, action, [instance.pk], fields=fields, using=using)
+
+# Like the search index, deleted objects are collected per delete operation
+# (origin), cascades included, and recorded together by the first post_delete
+_pending_deletes = WeakKeyDictionary()
+
+@receiver(pre_delete, sender=Artist, dispatch_uid='changes_collect_artist')
+@receiver(pre_delete, sender=Album, dispatch_uid='changes_collect_album')
+@receiver(pre_delete, sender=Song, dispatch_uid='changes_collect_song')
+def collect_deleted(sender, instance, origin=None, **kwargs):
+  _pending_deletes.setdefault(origin, defaultdict(list))[sender].append(instance.pk)
+
+@receiver(post_delete, sender=Artist, dispatch_uid='changes_delete_artist')
+@receiver(post_delete, sender=Album, dispatch_uid='changes_delete_album')
+@receiver(post_delete, sender=Song, dispatch_uid='changes_delete_song')
+def record_deleted(sender, instance, origin=None, using=None, **kwargs):
+  pending = _pending_deletes.pop(origin, None)
+  if pending:
+    insert_changes([
+      change for model, object_ids in pending.items() for change in build_changes(model, Change.DELETED, object_ids)
+    ], using=using)
@@ -0,0 +1,8 @@
+import pytest
+from albums import renditions
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  yield
+  renditions.backend.wait(timeout=10)
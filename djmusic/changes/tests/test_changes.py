@@ -0,0 +1,145 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from albums.approval import create_job, run_job
+from albums.importer import CatalogueImporter
+from albums.models import Album, Song
+from albums.tests.test_factories import AlbumFactory, SongFactory
+from artists.models import Artist
+from artists.tests.test_factories import ArtistFactory
+from changes.feed import ChangeReader, acknowledge, cursor_for, prune
+from changes.models import Change
+
+def changes(**filters):
+  return list(Change.objects.filter(**filters).order_by('pk').values_list('kind', 'object_id', 'action', 'fields'))
+
+def consume(capsys, **options):
+  call_command('consume_changes', **options)
+  out = capsys.readouterr().out
+  return [json.loads(line) for line in out.splitlines() if line]
+
+@pytest.mark.django_db
+def test_saves_are_recorded():
+  album = AlbumFactory(is_approved=False)
+  song = SongFactory(album=album)
+  album.cost = 5
+  album.save(update_fields=['cost'])
+  album.is_approved = True
+  album.save()
+  assert changes() == [
+    ('artist', album.artist_id, 'created', None),
+    ('album', album.pk, 'created', None),
+    ('song', song.pk, 'created', None),
+    ('album', album.pk, 'updated', ['cost', 'modified']),
+    ('album', album.pk, 'approved', None),
+  ]
+
+@pytest.mark.django_db
+def test_bulk_updates_are_recorded():
+  albums = AlbumFactory.create_batch(3, is_approved=False)
+  Change.objects.all().delete()
+  Album.objects.filter(pk__in=[albums[0].pk, albums[1].pk]).update(cost=1)
+  run_job(create_job(album_ids=[album.pk for album in albums[1:]]))
+  assert changes() == [
+    ('album', albums[0].pk, 'updated', ['cost']),
+    ('album', albums[1].pk, 'updated', ['cost']),
+    ('album', albums[1].pk, 'approved', ['is_approved', 'modified']),
+    ('album', albums[2].pk, 'approved', ['is_approved', 'modified']),
+  ]
+  # The album counters are derived data, their updates aren't changes
+  assert changes(kind='artist') == []
+
+@pytest.mark.django_db
+def test_deletes_are_recorded_once_per_operation():
+  album = AlbumFactory()
+  songs = SongFactory.create_batch(2, album=album)
+  album_id, song_ids = album.pk, [song.pk for song in songs]
+  Change.objects.all().delete()
+  with CaptureQueriesContext(connection) as context:
+    album.delete()
+  assert sorted(changes()) == sorted([
+    ('album', album_id, 'deleted', None),
+    ('song', song_ids[0], 'deleted', None),
+    ('song', song_ids[1], 'deleted', None),
+  ])
+  assert len([query for query in context.captured_queries if query['sql'].startswith('INSERT INTO "changes_change"')]) == 1
+
+@pytest.mark.django_db
+def test_imports_are_recorded():
+  existing = ArtistFactory(stage_name='Existing')
+  Change.objects.all().delete()
+  rows = [
+    {'stage_name': 'Existing', 'social_link': 'https://example.com/existing'},
+    {'stage_name': 'New', 'album_name': 'First', 'released_at': '2020-01-01T00:00:00', 'cost': '9.99',
+     'song_name': 'One', 'audio': 'one.mp3'},
+  ]
+  CatalogueImporter(use_copy=False).run(rows)
+  artist = Artist.objects.get(stage_name='New')
+  album = Album.objects.get()
+  song = Song.objects.get()
+  assert changes() == [
+    ('artist', existing.pk, 'updated', ['social_link']),
+    ('artist', artist.pk, 'created', None),
+    ('album', album.pk, 'created', None),
+    ('song', song.pk, 'created', None),
+  ]
+  # Importing the same rows again only updates the artists
+  CatalogueImporter(use_copy=False).run(rows)
+  assert changes(action='created') == changes()[1:4]
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_writes_are_not_recorded():
+  with pytest.raises(ZeroDivisionError):
+    with transaction.atomic():
+      ArtistFactory()
+      1 / 0
+  assert not Change.objects.exists()
+  artist = ArtistFactory()
+  assert changes() == [('artist', artist.pk, 'created', None)]
+
+@pytest.mark.django_db
+def test_reader_reads_batches_in_order():
+  artists = ArtistFactory.create_batch(5)
+  reader = ChangeReader(batch_size=2)
+  batches = [reader.read() for _ in range(4)]
+  assert [[change['object_id'] for change in batch] for batch in batches] == [
+    [artists[0].pk, artists[1].pk], [artists[2].pk, artists[3].pk], [artists[4].pk], []
+  ]
+  assert set(batches[0][0]) == {'id', 'kind', 'object_id', 'action', 'fields', 'created'}
+  assert reader.position == Change.objects.latest('pk').pk
+
+@pytest.mark.django_db
+def test_consume_changes_acknowledges_and_resumes(capsys):
+  artists = ArtistFactory.create_batch(3)
+  assert [change['object_id'] for change in consume(capsys, consumer='mirror', limit=2)] == [artists[0].pk, artists[1].pk]
+  assert cursor_for('mirror').position == Change.objects.order_by('pk')[1].pk
+  assert [change['object_id'] for change in consume(capsys, consumer='mirror')] == [artists[2].pk]
+  assert consume(capsys, consumer='mirror') == []
+  # Another consumer starts from the beginning
+  assert len(consume(capsys, consumer='other', batch_size=1)) == 3
+
+@pytest.mark.django_db
+def test_prune_keeps_what_a_consumer_still_needs():
+  ArtistFactory.create_batch(3)
+  ids = list(Change.objects.order_by('pk').values_list('pk', flat=True))
+  cursor_for('slow')
+  cursor_for('fast')
+  acknowledge('fast', ids[2])
+  assert prune() == 0
+  acknowledge('slow', ids[0])
+  assert prune() == 1
+  assert list(Change.objects.values_list('pk', flat=True)) == ids[1:]
+
+@pytest.mark.django_db
+def test_prune_keeps_the_latest_changes_for_the_event_streams(settings, capsys):
+  settings.EVENTS_REPLAY_SIZE = 2
+  ArtistFactory.create_batch(4)
+  ids = list(Change.objects.order_by('pk').values_list('pk', flat=True))
+  cursor_for('default')
+  acknowledge('default', ids[-1])
+  assert prune(keep=5) == 0
+  assert prune(keep=3) == 1
+  call_command('consume_changes', prune=True)
+  assert list(Change.objects.order_by('pk').values_list('pk', flat=True)) == ids[-2:]
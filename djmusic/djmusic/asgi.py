@@ -13,4 +13,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djmusic.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from artists.stream import with_catalogue_export  # noqa: E402
+from djmusic.events.stream import with_events  # noqa: E402
+
+# Server-sent events of catalogue changes at /events/ (see djmusic.events),
+# and the catalogue export whose queries can't run in Django's event loop
+application = with_events(with_catalogue_export(django_application))
@@ -0,0 +1,62 @@
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+from changes.feed import ChangeReader
+from changes.models import Change
+
+
+# Reads the events from the change outbox (see changes.feed), so every server
+# process sees the writes of all of them. Each process polls it from a
+# single thread, whatever its number of connections
+class OutboxBackend(object):
+  def __init__(self, poll_interval=None, batch_size=1000):
+    self.poll_interval = settings.EVENTS_POLL_INTERVAL if poll_interval is None else poll_interval
+    self.batch_size = batch_size
+    # Id of the last change before the backend started
+    self.position = None
+    self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='events')
+
+  def run(self, function, *args):
+    def call():
+      close_old_connections()
+      return function(*args)
+    return asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+  # Only the changes made after the backend started are events
+  def latest(self):
+    return Change.objects.aggregate(position=Max('pk'))['position'] or 0
+
+  async def listen(self):
+    self.position = await self.run(self.latest)
+    reader = ChangeReader(self.position, self.batch_size)
+    while True:
+      batch = await self.run(reader.read)
+      for change in batch:
+        yield change
+      if len(batch) < self.batch_size:
+        await asyncio.sleep(self.poll_interval)
+
+
+# In-process stand-in of the outbox, for tests and single process development
+# servers: changes are published by calling publish(), from any thread
+class LocalBackend(object):
+  def __init__(self):
+    self.ids = itertools.count(1)
+    self.position = 0
+    self.loop = None
+    self.queue = None
+
+  def publish(self, kind, object_id, action):
+    change = {'id': next(self.ids), 'kind': kind, 'object_id': object_id, 'action': action}
+    if self.loop is not None:
+      self.loop.call_soon_threadsafe(self.queue.put_nowait, change)
+    return change
+
+  async def listen(self):
+    self.loop = asyncio.get_running_loop()
+    self.queue = asyncio.Queue()
+    while True:
+      yield await self.queue.get()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from django.conf import settings
+from django.utils.module_loading import import_string
+from changes.models import Change
+
+logger = logging.getLogger(__name__)
+
+# Changes pushed to the clients, as "<kind>.<action>" events
+EVENTS = {(Change.ARTIST, Change.CREATED), (Change.ALBUM, Change.CREATED), (Change.ALBUM, Change.APPROVED)}
+HEARTBEAT = b':\n\n'
+# Tells a client that events it missed are not available anymore, it reloads what it shows
+RESET = b'event: reset\ndata: {}\n\n'
+
+
+def encode(change):
+  data = json.dumps({'kind': change['kind'], 'id': change['object_id'], 'action': change['action']})
+  return ('id: %d\nevent: %s.%s\ndata: %s\n\n' % (change['id'], change['kind'], change['action'], data)).encode()
+
+
+# Events waiting to be sent to one client. Pushing never waits: a client that
+# falls max_pending events behind is disconnected and resumes from the replay
+# buffer of the hub when it reconnects
+class Subscriber(object):
+  __slots__ = ('pending', 'max_pending', 'waiter', 'closed')
+
+  def __init__(self, max_pending):
+    self.pending = []
+    self.max_pending = max_pending
+    self.waiter = None
+    self.closed = False
+
+  def push(self, data):
+    if self.closed:
+      return
+    if len(self.pending) >= self.max_pending:
+      self.close()
+    else:
+      self.pending.append(data)
+      self.wake()
+
+  def close(self):
+    self.closed = True
+    self.pending = []
+    self.wake()
+
+  def wake(self):
+    if self.waiter is not None and not self.waiter.done():
+      self.waiter.set_result(None)
+
+  # The pending events in a single chunk, None once closed
+  async def next(self):
+    while not self.pending and not self.closed:
+      self.waiter = asyncio.get_running_loop().create_future()
+      try:
+        await self.waiter
+      finally:
+        self.waiter = None
+    if self.closed:
+      return None
+    data = b''.join(self.pending)
+    self.pending = []
+    return data
+
+
+# Broadcasts the events of a backend to the subscribers of the process. Events
+# are encoded once and idle subscribers cost a future, so a worker holds tens
+# of thousands of connections. The last replay_size events are kept for the
+# clients reconnecting with a Last-Event-ID
+class EventHub(object):
+  def __init__(self, backend, max_pending=100, replay_size=1000, heartbeat=15):
+    self.backend = backend
+    self.max_pending = max_pending
+    self.heartbeat = heartbeat
+    self.loop = asyncio.get_running_loop()
+    self.subscribers = set()
+    self.recent = deque(maxlen=replay_size)
+    self.evicted = 0
+    self.tasks = []
+
+  # Every event after this id is in the replay buffer, None until the backend started
+  @property
+  def horizon(self):
+    position = getattr(self.backend, 'position', None)
+    return None if position is None else max(position, self.evicted)
+
+  def start(self):
+    if not self.tasks:
+      self.tasks = [self.loop.create_task(self.pump()), self.loop.create_task(self.beat())]
+
+  async def pump(self):
+    while True:
+      try:
+        async for change in self.backend.listen():
+          self.broadcast(change)
+      except Exception:
+        logger.exception('Event backend failed, restarting it')
+      await asyncio.sleep(1)
+
+  async def beat(self):
+    while True:
+      await asyncio.sleep(self.heartbeat)
+      for subscriber in self.subscribers:
+        subscriber.push(HEARTBEAT)
+
+  def broadcast(self, change):
+    if (change['kind'], change['action']) not in EVENTS:
+      return
+    data = encode(change)
+    if len(self.recent) == self.recent.maxlen:
+      self.evicted = self.recent[0][0]
+    self.recent.append((change['id'], data))
+    for subscriber in self.subscribers:
+      subscriber.push(data)
+
+  def subscribe(self, last_event_id=None):
+    self.start()
+    subscriber = Subscriber(self.max_pending)
+    if last_event_id is not None:
+      horizon = self.horizon
+      if horizon is None or last_event_id < horizon:
+        subscriber.push(RESET)
+      else:
+        missed = b''.join(data for event_id, data in self.recent if event_id > last_event_id)
+        if missed:
+          subscriber.push(missed)
+    self.subscribers.add(subscriber)
+    return subscriber
+
+  def unsubscribe(self, subscriber):
+    self.subscribers.discard(subscriber)
+
+
+_hub = None
+
+
+# The hub of the running event loop, ASGI servers run one per worker process
+def get_hub():
+  global _hub
+  if _hub is None or _hub.loop is not asyncio.get_running_loop():
+    _hub = EventHub(
+      import_string(settings.EVENTS_BACKEND)(), max_pending=settings.EVENTS_MAX_PENDING,
+      replay_size=settings.EVENTS_REPLAY_SIZE, heartbeat=settings.EVENTS_HEARTBEAT
+    )
+  return _hub
@@ -0,0 +1,67 @@
+import asyncio
+from urllib.parse import parse_qs
+from .hub import get_hub
+
+PATH = '/events/'
+# Milliseconds a client waits before reconnecting
+RETRY = 3000
+HEADERS = [
+  (b'content-type', b'text/event-stream'),
+  (b'cache-control', b'no-cache'),
+  # Stops nginx from buffering the stream
+  (b'x-accel-buffering', b'no'),
+]
+
+
+# Last-Event-ID header sent by reconnecting EventSource clients, or the
+# last_event_id parameter for clients that can't set headers
+def last_event_id(scope):
+  value = dict(scope['headers']).get(b'last-event-id', b'').decode('latin-1')
+  if not value:
+    value = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('last_event_id', [''])[0]
+  try:
+    return int(value)
+  except ValueError:
+    return None
+
+
+async def wait_for_disconnect(receive, subscriber):
+  while (await receive())['type'] != 'http.disconnect':
+    pass
+  subscriber.close()
+
+
+# Server-sent events of catalogue changes, an ASGI application. The response
+# lasts until the client disconnects or falls too far behind (see events.hub)
+async def event_stream(scope, receive, send):
+  if scope['method'] != 'GET':
+    await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+    await send({'type': 'http.response.body', 'body': b''})
+    return
+
+  hub = get_hub()
+  subscriber = hub.subscribe(last_event_id(scope))
+  disconnect = asyncio.ensure_future(wait_for_disconnect(receive, subscriber))
+  try:
+    await send({'type': 'http.response.start', 'status': 200, 'headers': HEADERS})
+    await send({'type': 'http.response.body', 'body': b'retry: %d\n\n' % RETRY, 'more_body': True})
+    while True:
+      data = await subscriber.next()
+      if data is None:
+        break
+      await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+    if not disconnect.done():
+      await send({'type': 'http.response.body', 'body': b''})
+  finally:
+    hub.unsubscribe(subscriber)
+    disconnect.cancel()
+
+
+# Serves the event stream at PATH and the rest with `application`
+def with_events(application):
+  async def app(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == PATH:
+      await event_stream(scope, receive, send)
+    else:
+      await application(scope, receive, send)
+  return app
@@ -0,0 +1,135 @@
+import threading
+import time
+from django.conf import settings
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+import psycopg2.extras
+from psycopg2 import extensions
+
+# Idle connections older than this are pinged before being handed out
+PING_AFTER = 30
+
+
+class PoolTimeout(OperationalError):
+  pass
+
+
+# Blocking pool of at most `size` psycopg2 connections. Connections are opened
+# on demand and kept idle once returned, the ones that were closed or left in
+# an unknown state are dropped
+class ConnectionPool(object):
+  def __init__(self, connect, size, timeout=None):
+    self.connect = connect
+    self.timeout = timeout
+    self.slots = threading.BoundedSemaphore(size)
+    self.lock = threading.Lock()
+    self.idle = []
+
+  def get(self, check=True):
+    if not self.slots.acquire(timeout=self.timeout):
+      raise PoolTimeout('No database connection available after %ss' % self.timeout)
+    try:
+      while True:
+        with self.lock:
+          if not self.idle:
+            break
+          connection, returned = self.idle.pop()
+        if not check or time.monotonic() - returned < PING_AFTER or self.usable(connection):
+          return connection
+        self.discard(connection)
+      return self.connect()
+    except BaseException:
+      self.slots.release()
+      raise
+
+  def put(self, connection, discard=False):
+    try:
+      if not discard and not connection.closed:
+        status = connection.get_transaction_status()
+        if status != extensions.TRANSACTION_STATUS_IDLE and status != extensions.TRANSACTION_STATUS_UNKNOWN:
+          connection.rollback()
+          status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+          with self.lock:
+            self.idle.append((connection, time.monotonic()))
+          return
+      self.discard(connection)
+    except psycopg2.Error:
+      self.discard(connection)
+    finally:
+      self.slots.release()
+
+  def usable(self, connection):
+    try:
+      with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    except psycopg2.Error:
+      return False
+    return True
+
+  def discard(self, connection):
+    try:
+      connection.close()
+    except psycopg2.Error:
+      pass
+
+  def close(self):
+    with self.lock:
+      idle, self.idle = self.idle, []
+    for connection, returned in idle:
+      self.discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_pools():
+  with _pools_lock:
+    pools = list(_pools.values())
+    _pools.clear()
+  for pool in pools:
+    pool.close()
+
+
+def connect(conn_params, options):
+  connection = psycopg2.connect(**conn_params)
+  # Same session setup as the PostgreSQL backend does for new connections
+  if 'isolation_level' in options and options['isolation_level'] != connection.isolation_level:
+    connection.set_session(isolation_level=options['isolation_level'])
+  psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+  return connection
+
+
+def get_pool(alias, conn_params, options):
+  key = (alias, tuple(sorted((name, repr(value)) for name, value in conn_params.items())))
+  with _pools_lock:
+    pool = _pools.get(key)
+    if pool is None:
+      pool = _pools[key] = ConnectionPool(
+        lambda: connect(conn_params, options),
+        getattr(settings, 'DATABASE_POOL_SIZE', 0) or 10,
+        getattr(settings, 'DATABASE_POOL_TIMEOUT', None)
+      )
+    return pool
+
+
+# PostgreSQL backend (ENGINE 'djmusic.postgresql_pool') taking its connections
+# from a pool of DATABASE_POOL_SIZE connections per database, shared by every
+# thread of the process. Closing the connection at the end of a request gives
+# it back to the pool, which is what makes connections reusable under ASGI,
+# where persistent connections (CONN_MAX_AGE) are tied to a thread that may
+# never run another request. Use it with CONN_MAX_AGE = 0
+class DatabaseWrapper(base.DatabaseWrapper):
+  connection_pool = None
+
+  def get_new_connection(self, conn_params):
+    options = self.settings_dict['OPTIONS']
+    self.connection_pool = get_pool(self.alias, conn_params, options)
+    connection = self.connection_pool.get(check=self.settings_dict['CONN_HEALTH_CHECKS'])
+    self.isolation_level = options.get('isolation_level', connection.isolation_level)
+    return connection
+
+  def _close(self):
+    if self.connection is not None:
+      self.connection_pool.put(self.connection)
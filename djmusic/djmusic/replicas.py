@@ -0,0 +1,153 @@
+import asyncio
+import functools
+import hashlib
+import random
+import re
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+# Models always read from the primary: a token or session must be usable as
+# soon as it is created, and gone as soon as it is deleted
+PRIMARY_MODELS = {'knox.authtoken', 'sessions.session'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'primary_db'
+WRITE_RE = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)', re.IGNORECASE)
+
+# Routing of the request being handled, shared with the threads of sync_to_async
+current_routing = ContextVar('replica_routing', default=None)
+
+
+class Routing(object):
+  def __init__(self):
+    self.replica = None
+    self.written = False
+
+
+def replicas():
+  return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+# Marks the request as written when a statement changing the catalogue runs
+# on the primary. Writes of tokens and sessions (expiry refreshes, cleanups of
+# an authenticated GET) don't, they are always read from the primary anyway
+def record_write(execute, sql, params, many, context):
+  routing = current_routing.get()
+  if routing is not None and not routing.written and context['connection'].alias == DEFAULT_DB_ALIAS:
+    match = WRITE_RE.match(sql)
+    if match and match.group(1) not in primary_tables():
+      routing.written = True
+  return execute(sql, params, many, context)
+
+
+@functools.lru_cache(maxsize=None)
+def primary_tables():
+  return {apps.get_model(label)._meta.db_table for label in PRIMARY_MODELS}
+
+
+def install_wrapper(connection, **kwargs):
+  if record_write not in connection.execute_wrappers:
+    connection.execute_wrappers.append(record_write)
+
+
+def pin_key(request):
+  authorization = request.headers.get('Authorization')
+  if not authorization:
+    return None
+  return 'replicas:pin:%s' % hashlib.sha1(authorization.encode()).hexdigest()
+
+
+# Sends the reads of the views marked with `read_replica = True` to one of
+# DATABASE_REPLICAS, every other query goes to the primary. The first write
+# of a request (see record_write) sends the rest of its reads to the primary
+# as well. Querysets only asking where a write would go, such as
+# get_or_create() and select_for_update(), don't
+class ReplicaRouter(object):
+  def db_for_read(self, model, **hints):
+    routing = current_routing.get()
+    if routing is None or routing.replica is None or routing.written:
+      return None
+    instance = hints.get('instance')
+    if instance is not None and instance._state.db:
+      return instance._state.db
+    if model._meta.label_lower in PRIMARY_MODELS:
+      return DEFAULT_DB_ALIAS
+    return routing.replica
+
+  def db_for_write(self, model, **hints):
+    return DEFAULT_DB_ALIAS
+
+  def allow_relation(self, obj1, obj2, **hints):
+    return True
+
+  def allow_migrate(self, db, app_label, model_name=None, **hints):
+    return db not in replicas()
+
+
+# Chooses the database of every request for ReplicaRouter. Safe requests to
+# read_replica views use a random replica, unless the same client wrote less
+# than REPLICA_STICKY_SECONDS ago: requests that wrote set a cookie and, for
+# token clients, a cache entry keyed by their Authorization header, so that
+# they read their own writes while the replicas catch up.
+# Disabled when there are no replicas
+class ReplicaMiddleware(object):
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    if not replicas():
+      raise MiddlewareNotUsed()
+    self.get_response = get_response
+    if asyncio.iscoroutinefunction(get_response):
+      self._is_coroutine = asyncio.coroutines._is_coroutine
+    connection_created.connect(install_wrapper, dispatch_uid='replicas_install_wrapper')
+    for connection in connections.all():
+      install_wrapper(connection)
+
+  def __call__(self, request):
+    if asyncio.iscoroutinefunction(self.get_response):
+      return self.__acall__(request)
+    routing = Routing()
+    token = current_routing.set(routing)
+    try:
+      response = self.get_response(request)
+    finally:
+      current_routing.reset(token)
+    self.stick(request, response, routing)
+    return response
+
+  async def __acall__(self, request):
+    routing = Routing()
+    token = current_routing.set(routing)
+    try:
+      response = await self.get_response(request)
+    finally:
+      current_routing.reset(token)
+    self.stick(request, response, routing)
+    return response
+
+  def process_view(self, request, view_func, view_args, view_kwargs):
+    routing = current_routing.get()
+    view_class = getattr(view_func, 'view_class', None)
+    if routing is None or request.method not in SAFE_METHODS or not getattr(view_class, 'read_replica', False):
+      return None
+    if STICKY_COOKIE in request.COOKIES:
+      return None
+    key = pin_key(request)
+    if key is not None and cache.get(key):
+      return None
+    routing.replica = random.choice(replicas())
+    return None
+
+  def stick(self, request, response, routing):
+    if not routing.written:
+      return
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    response.set_cookie(STICKY_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+    key = pin_key(request)
+    if key is not None:
+      cache.set(key, True, seconds)
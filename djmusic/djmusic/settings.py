@@ -42,12 +42,17 @@ INSTALLED_APPS = [
     'artists',
     'albums.apps.AlbumsConfig',
     'users',
+    'authentication.apps.AuthenticationConfig',
+    'search.apps.SearchConfig',
+    'changes.apps.ChangesConfig',
+    'metrics.apps.MetricsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'imagekit',
     'rest_framework',
     'rest_framework.authtoken',
@@ -56,6 +61,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'metrics.middleware.MetricsMiddleware',
+    'djmusic.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,16 +93,28 @@ TEMPLATES = [
 WSGI_APPLICATION = 'djmusic.wsgi.application'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('knox.auth.TokenAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('authentication.auth.CachedTokenAuthentication',),
 }
 
+# Verified tokens are cached by authentication.auth.CachedTokenAuthentication.
+# Logouts reach the other server processes through the TOKEN_CACHE_ALIAS cache:
+# with a cache that isn't shared by them (locmem, or an empty alias), they may
+# accept a revoked token for up to TOKEN_CACHE_TTL seconds
+TOKEN_CACHE_SIZE = env.int('TOKEN_CACHE_SIZE', default=10000)
+TOKEN_CACHE_TTL = env.int('TOKEN_CACHE_TTL', default=30)
+TOKEN_CACHE_ALIAS = env('TOKEN_CACHE_ALIAS', default='default') or None
+# Seconds between the writes of refreshed token expiries when REST_KNOX AUTO_REFRESH is on
+TOKEN_REFRESH_INTERVAL = env.int('TOKEN_REFRESH_INTERVAL', default=60)
+
 AUTH_USER_MODEL = 'users.User'
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# DATABASE_URL (e.g. sqlite:///db.sqlite3) replaces the DB_* variables, the
+# performance tests run against any of them (see metrics/tests)
 DATABASES = {
-    'default': {
+    'default': env.db('DATABASE_URL') if env('DATABASE_URL', default=None) else {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': env('DB_NAME'),
         'USER': env('DB_USER'),
@@ -105,6 +124,40 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, as 'replica', 'replica2', ... used by
+# the read only API views (see djmusic.replicas)
+for index, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[])):
+    DATABASES['replica%s' % (index + 1 if index else '')] = dict(env.db_url_config(url), TEST={'MIRROR': 'default'})
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['djmusic.replicas.ReplicaRouter']
+# Seconds a client keeps reading from the primary after a write
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=10)
+
+# Connections are kept for CONN_MAX_AGE seconds and checked before being reused.
+# With DATABASE_POOL_SIZE, PostgreSQL connections come from a pool of that many
+# connections per database shared by the threads of the process instead
+# (see djmusic.postgresql_pool), which also works under ASGI
+CONN_MAX_AGE = env.int('CONN_MAX_AGE', default=60)
+DATABASE_POOL_SIZE = env.int('DATABASE_POOL_SIZE', default=0)
+# Seconds to wait for a pooled connection before failing
+DATABASE_POOL_TIMEOUT = env.float('DATABASE_POOL_TIMEOUT', default=10)
+for database in DATABASES.values():
+    database['CONN_HEALTH_CHECKS'] = True
+    if DATABASE_POOL_SIZE and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['ENGINE'] = 'djmusic.postgresql_pool'
+        database['CONN_MAX_AGE'] = 0
+    else:
+        database.setdefault('CONN_MAX_AGE', CONN_MAX_AGE)
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Use a shared backend (e.g. redis:// or memcache://) when running several workers,
+# otherwise cached artist pages are only invalidated in the process that wrote
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -125,6 +178,28 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# PBKDF2 work factor, measure it with `manage.py benchmark_hashers`. Hashes
+# of another hasher or work factor are upgraded in the background at login
+PASSWORD_HASHERS = [
+    'users.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = env.int('PASSWORD_PBKDF2_ITERATIONS', default=390000)
+PASSWORD_UPGRADE_WORKERS = env.int('PASSWORD_UPGRADE_WORKERS', default=1)
+# Threads hashing passwords for the async views, defaults to the number of CPUs
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=None)
+
+# Route the API to the async views, for ASGI deployments (see djmusic/asgi.py)
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+# Whether /authentication/login/ also starts a session by default, clients
+# can choose with the `session` parameter. API clients only need the token
+LOGIN_SESSION = env.bool('LOGIN_SESSION', default=True)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -145,6 +220,58 @@ STATIC_URL = 'static/'
 MEDIA_ROOT  = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Song image renditions are generated by a local thread pool (see albums.renditions)
+SONG_RENDITION_WORKERS = env.int('SONG_RENDITION_WORKERS', default=2)
+# Seconds a rendition stays marked as generating, it is scheduled again on the
+# next access afterwards if the process generating it died
+SONG_RENDITION_GENERATING_TIMEOUT = env.int('SONG_RENDITION_GENERATING_TIMEOUT', default=300)
+
+# Largest audio file accepted by the chunked upload API (see albums.uploads)
+SONG_UPLOAD_MAX_SIZE = env.int('SONG_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3)
+
+# Song images and audio are stored under the hash of their content (see albums.storage).
+# Files no song references anymore are kept this many seconds after they were last
+# written, so a song being saved with the same content at that time keeps its file
+SONG_MEDIA_GRACE_SECONDS = env.int('SONG_MEDIA_GRACE_SECONDS', default=3600)
+
+# Bulk album approvals of the API run on a local thread pool (see albums.approval)
+ALBUM_APPROVAL_WORKERS = env.int('ALBUM_APPROVAL_WORKERS', default=1)
+
+# Song audio is streamed by albums.views.SongAudioView. Set to 'x-accel-redirect' (nginx)
+# or 'x-sendfile' (apache, lighttpd) to let the front proxy send the file instead
+SONG_AUDIO_SENDFILE = env('SONG_AUDIO_SENDFILE', default=None)
+# Internal location the proxy maps to MEDIA_ROOT when using x-accel-redirect
+SONG_AUDIO_ACCEL_PREFIX = env('SONG_AUDIO_ACCEL_PREFIX', default='/protected-media/')
+
+# Admin changelists of larger unfiltered tables show the row count estimated by PostgreSQL (see albums.paginator)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = env.int('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000)
+
+# Backend class of the /search/ API, by default chosen from the database vendor (see search.backends)
+SEARCH_BACKEND = env('SEARCH_BACKEND', default=None)
+
+# Server-sent events of catalogue changes at /events/, served under ASGI (see djmusic.events)
+EVENTS_BACKEND = env('EVENTS_BACKEND', default='djmusic.events.backends.OutboxBackend')
+# Seconds between two reads of the change outbox by a server process
+EVENTS_POLL_INTERVAL = env.float('EVENTS_POLL_INTERVAL', default=0.5)
+# Events a slow client may be behind before it's disconnected, and events kept
+# for the clients reconnecting
+EVENTS_MAX_PENDING = env.int('EVENTS_MAX_PENDING', default=100)
+EVENTS_REPLAY_SIZE = env.int('EVENTS_REPLAY_SIZE', default=1000)
+# Seconds between two keep-alive comments sent to every client
+EVENTS_HEARTBEAT = env.int('EVENTS_HEARTBEAT', default=15)
+
+# Per route query count and latency histograms, served at /metrics (see metrics.middleware)
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=False)
+# Clients allowed to read /metrics without a staff account, by REMOTE_ADDR.
+# Behind a reverse proxy every request comes from the proxy address, don't
+# list it there
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=[])
+# Requests over these budgets are logged as warnings, METRICS_BUDGETS overrides
+# them per route, e.g. {'artists/': {'queries': 3, 'latency_ms': 100}}
+METRICS_QUERY_BUDGET = env.int('METRICS_QUERY_BUDGET', default=None)
+METRICS_LATENCY_BUDGET_MS = env.int('METRICS_LATENCY_BUDGET_MS', default=None)
+METRICS_BUDGETS = {}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from artists.tests.test_factories import ArtistFactory
+from djmusic.events.backends import LocalBackend
+from djmusic.events.hub import HEARTBEAT, RESET, EventHub, Subscriber, get_hub
+from djmusic.events.stream import with_events
+
+@pytest.fixture(autouse=True)
+def events(settings):
+  settings.EVENTS_BACKEND = 'djmusic.events.backends.LocalBackend'
+  settings.EVENTS_POLL_INTERVAL = 0.01
+
+def scope(path='/events/', method='GET', headers=(), query_string=b''):
+  return {'type': 'http', 'path': path, 'method': method, 'headers': list(headers), 'query_string': query_string}
+
+async def not_found(scope, receive, send):
+  await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+  await send({'type': 'http.response.body', 'body': b''})
+
+application = with_events(not_found)
+
+def parse(data):
+  return [
+    dict(line.split(': ', 1) for line in block.split('\n') if line and not line.startswith(':'))
+    for block in data.decode().split('\n\n') if block and not block.startswith(':')
+  ]
+
+async def connect(**kwargs):
+  communicator = ApplicationCommunicator(application, scope(**kwargs))
+  start = await communicator.receive_output(1)
+  assert start['status'] == 200
+  assert dict(start['headers'])[b'content-type'] == b'text/event-stream'
+  assert (await communicator.receive_output(1))['body'] == b'retry: 3000\n\n'
+  return communicator
+
+async def disconnect(communicator):
+  await communicator.send_input({'type': 'http.disconnect'})
+  await communicator.wait(1)
+
+def test_stream_pushes_catalogue_events():
+  async def scenario():
+    first, second = await connect(), await connect()
+    await asyncio.sleep(0)
+    hub = get_hub()
+    assert len(hub.subscribers) == 2
+    hub.backend.publish('artist', 1, 'created')
+    hub.backend.publish('song', 1, 'created')
+    hub.backend.publish('album', 2, 'approved')
+    events = []
+    while len(events) < 2:
+      events += parse((await first.receive_output(1))['body'])
+    assert events == [
+      {'id': '1', 'event': 'artist.created', 'data': json.dumps({'kind': 'artist', 'id': 1, 'action': 'created'})},
+      {'id': '3', 'event': 'album.approved', 'data': json.dumps({'kind': 'album', 'id': 2, 'action': 'approved'})},
+    ]
+    await disconnect(first)
+    assert len(hub.subscribers) == 1
+    assert parse((await second.receive_output(1))['body'])[0]['id'] == '1'
+    await disconnect(second)
+    assert not hub.subscribers
+
+    # Reconnecting clients receive the events they missed
+    resumed = await connect(headers=[(b'last-event-id', b'1')])
+    assert [event['id'] for event in parse((await resumed.receive_output(1))['body'])] == ['3']
+    await disconnect(resumed)
+  async_to_sync(scenario)()
+
+def test_stream_routes_and_methods():
+  async def scenario():
+    communicator = ApplicationCommunicator(application, scope(method='POST'))
+    assert (await communicator.receive_output(1))['status'] == 405
+    communicator = ApplicationCommunicator(application, scope(path='/artists/'))
+    assert (await communicator.receive_output(1))['status'] == 404
+  async_to_sync(scenario)()
+
+def test_slow_subscribers_are_disconnected():
+  async def scenario():
+    subscriber = Subscriber(max_pending=2)
+    subscriber.push(b'a')
+    subscriber.push(b'b')
+    assert await subscriber.next() == b'ab'
+    for data in (b'c', b'd', b'e'):
+      subscriber.push(data)
+    assert subscriber.closed and await subscriber.next() is None
+  async_to_sync(scenario)()
+
+def test_replay_resets_clients_too_far_behind():
+  async def scenario():
+    hub = EventHub(LocalBackend(), replay_size=2)
+    for object_id in range(1, 4):
+      hub.broadcast({'id': object_id, 'kind': 'artist', 'object_id': object_id, 'action': 'created'})
+    assert [event['id'] for event in parse(await hub.subscribe(last_event_id=1).next())] == ['2', '3']
+    assert await hub.subscribe(last_event_id=0).next() == RESET
+    assert hub.subscribe().pending == []
+    for subscriber in hub.subscribers:
+      subscriber.push(HEARTBEAT)
+    for task in hub.tasks:
+      task.cancel()
+  async_to_sync(scenario)()
+
+@pytest.mark.django_db(transaction=True)
+def test_outbox_backend_reads_the_change_feed(settings):
+  settings.EVENTS_BACKEND = 'djmusic.events.backends.OutboxBackend'
+  async def scenario():
+    communicator = await connect()
+    while get_hub().backend.position is None:
+      await asyncio.sleep(0.01)
+    artist = await sync_to_async(ArtistFactory)()
+    events = parse((await communicator.receive_output(2))['body'])
+    assert events[0]['event'] == 'artist.created'
+    assert json.loads(events[0]['data'])['id'] == artist.pk
+    await disconnect(communicator)
+  async_to_sync(scenario)()
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from psycopg2 import extensions
+from djmusic.postgresql_pool.base import ConnectionPool, DatabaseWrapper, PoolTimeout, close_pools
+
+
+# Stands in for a psycopg2 connection, the pool only looks at its state
+class Connection(object):
+  def __init__(self):
+    self.closed = 0
+    self.status = extensions.TRANSACTION_STATUS_IDLE
+    self.rollbacks = 0
+
+  def get_transaction_status(self):
+    return self.status
+
+  def rollback(self):
+    self.rollbacks += 1
+    self.status = extensions.TRANSACTION_STATUS_IDLE
+
+  def close(self):
+    self.closed = 1
+
+
+def test_pool_reuses_connections():
+  opened = []
+  pool = ConnectionPool(lambda: opened.append(Connection()) or opened[-1], 2, timeout=0.01)
+  first = pool.get()
+  second = pool.get()
+  with pytest.raises(PoolTimeout):
+    pool.get()
+
+  # Connections are given back out of their transaction
+  first.status = extensions.TRANSACTION_STATUS_INTRANS
+  pool.put(first)
+  assert first.rollbacks == 1
+  assert pool.get() is first
+
+  # Broken connections are dropped
+  second.status = extensions.TRANSACTION_STATUS_UNKNOWN
+  pool.put(second)
+  assert second.closed
+  assert pool.get() not in (first, second)
+  assert len(opened) == 3
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Needs a PostgreSQL database')
+@pytest.mark.django_db
+def test_pooled_backend():
+  wrapper = DatabaseWrapper(dict(connection.settings_dict, CONN_MAX_AGE=0), alias='pooled')
+  try:
+    with wrapper.cursor() as cursor:
+      cursor.execute('SELECT 1')
+    first = wrapper.connection
+    wrapper.close()
+    assert not first.closed
+    with wrapper.cursor() as cursor:
+      cursor.execute('SELECT 1')
+    assert wrapper.connection is first
+  finally:
+    wrapper.close()
+    close_pools()
@@ -0,0 +1,147 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+from artists.models import Artist
+from artists.views import ArtistsView
+from djmusic import replicas
+from djmusic.replicas import ReplicaMiddleware, ReplicaRouter, Routing, current_routing, install_wrapper
+from users.tests.test_factories import UserFactory
+
+router = ReplicaRouter()
+
+
+@pytest.fixture
+def routing():
+  routing = Routing()
+  token = current_routing.set(routing)
+  yield routing
+  current_routing.reset(token)
+
+
+@pytest.fixture
+def middleware(settings):
+  settings.DATABASE_REPLICAS = ['replica']
+  cache.clear()
+  return ReplicaMiddleware(lambda request: HttpResponse())
+
+
+def test_router_outside_requests():
+  assert router.db_for_read(Artist) is None
+  assert router.db_for_write(Artist) == 'default'
+
+
+def test_router_reads_from_replica(routing):
+  assert router.db_for_read(Artist) is None
+  routing.replica = 'replica'
+  assert router.db_for_read(Artist) == 'replica'
+  # Tokens are always read from the primary
+  assert router.db_for_read(AuthToken) == 'default'
+  artist = Artist(stage_name='Primary')
+  artist._state.db = 'default'
+  assert router.db_for_read(Artist, instance=artist) == 'default'
+
+  # Reads after a write see it
+  routing.written = True
+  assert router.db_for_read(Artist) is None
+
+
+@pytest.mark.django_db
+def test_only_catalogue_writes_pin_the_primary(routing):
+  install_wrapper(connection)
+  user = UserFactory()
+  Artist.objects.create(stage_name='Existing')
+  routing.written = False
+  # Asking where a write would go isn't writing
+  assert router.db_for_write(Artist) == 'default'
+  assert not Artist.objects.get_or_create(stage_name='Existing')[1]
+  with transaction.atomic():
+    list(Artist.objects.select_for_update())
+  # Token expiry refreshes and cleanups of an authenticated GET
+  token = AuthToken.objects.create(user)[0]
+  AuthToken.objects.filter(pk=token.pk).update(expiry=None)
+  AuthToken.objects.filter(pk=token.pk).delete()
+  assert not routing.written
+  Artist.objects.create(stage_name='Written')
+  assert routing.written
+
+
+def test_router_migrations(settings):
+  settings.DATABASE_REPLICAS = ['replica']
+  assert router.allow_migrate('default', 'artists')
+  assert not router.allow_migrate('replica', 'artists')
+
+
+def test_middleware_chooses_replica(middleware, routing):
+  factory = RequestFactory()
+  view = ArtistsView.as_view()
+  middleware.process_view(factory.post('/artists/'), view, (), {})
+  assert routing.replica is None
+  middleware.process_view(factory.get('/users/'), lambda request: None, (), {})
+  assert routing.replica is None
+  middleware.process_view(factory.get('/artists/'), view, (), {})
+  assert routing.replica == 'replica'
+
+
+def test_middleware_sticks_after_write(middleware, settings):
+  settings.REPLICA_STICKY_SECONDS = 30
+  factory = RequestFactory()
+
+  def write(request):
+    current_routing.get().written = True
+    return HttpResponse()
+  writer = ReplicaMiddleware(write)
+  response = writer(factory.post('/artists/', HTTP_AUTHORIZATION='Token abc'))
+  assert response.cookies[replicas.STICKY_COOKIE]['max-age'] == 30
+  assert 'Set-Cookie' not in middleware(factory.get('/artists/')).headers
+
+  # The cookie or the token of the writer pins them to the primary
+  def chosen(request):
+    routing = Routing()
+    token = current_routing.set(routing)
+    middleware.process_view(request, ArtistsView.as_view(), (), {})
+    current_routing.reset(token)
+    return routing.replica
+  assert chosen(factory.get('/artists/', HTTP_AUTHORIZATION='Token abc')) is None
+  request = factory.get('/artists/')
+  request.COOKIES[replicas.STICKY_COOKIE] = '1'
+  assert chosen(request) is None
+  assert chosen(factory.get('/artists/', HTTP_AUTHORIZATION='Token other')) == 'replica'
+
+
+# Needs a replica alias, e.g. with a settings module adding
+# DATABASES['replica'] = {..., 'TEST': {'MIRROR': 'default'}} and DATABASE_REPLICAS = ['replica']
+@pytest.mark.skipif('replica' not in connections.settings, reason='No replica database configured')
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+def test_requests_use_replica(settings):
+  cache.clear()
+  client = APIClient()
+  client.force_authenticate(UserFactory())
+  with CaptureQueriesContext(connections['replica']) as replica:
+    assert client.get('/artists/').status_code == 200
+  assert len(replica) > 0
+
+  with CaptureQueriesContext(connections['replica']) as replica:
+    assert client.post('/artists/', {'stage_name': 'Sticky'}).status_code == 201
+    cache.clear()
+    assert client.get('/artists/').status_code == 200
+  assert len(replica) == 0
+
+
+@pytest.mark.skipif('replica' not in connections.settings, reason='No replica database configured')
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+def test_token_requests_stay_on_replica(settings):
+  settings.TOKEN_REFRESH_INTERVAL = 0
+  cache.clear()
+  client = APIClient()
+  client.credentials(HTTP_AUTHORIZATION='Token ' + AuthToken.objects.create(UserFactory())[1])
+  for _ in range(2):
+    cache.clear()
+    with CaptureQueriesContext(connections['replica']) as replica:
+      response = client.get('/artists/')
+    assert response.status_code == 200 and len(replica) > 0
+    assert replicas.STICKY_COOKIE not in response.cookies
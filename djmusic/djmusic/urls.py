@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.conf.urls.static import static
 from django.conf import settings
+from albums.streaming import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,6 +11,8 @@ urlpatterns = [
     path('albums/', include('albums.urls')),
     path('authentication/', include('authentication.urls')),
     path('users/', include('users.urls')),
+    path('search/', include('search.urls')),
+    path('metrics', include('metrics.urls')),
     # path("accounts/login/", auth_views.LoginView.as_view(), name='login'),
     # path("accounts/logout/", auth_views.LogoutView.as_view(), name='logout')
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,47 @@
+import threading
+
+
+# Log-linear histogram in the spirit of HdrHistogram: every power of two range
+# above 2 ** (precision + 1) is split in 2 ** precision linear buckets, so any
+# value is known within a relative error of 2 ** -precision (about 3% by
+# default) while the memory only grows with the logarithm of the range.
+# Values are non negative integers (microseconds, query counts)
+class Histogram(object):
+  def __init__(self, precision=5):
+    self.precision = precision
+    self.lock = threading.Lock()
+    self.counts = {}
+    self.count = 0
+    self.total = 0
+    self.min = None
+    self.max = None
+
+  def _bucket(self, value):
+    shift = max(value.bit_length() - self.precision - 1, 0)
+    return (value >> shift) << shift, (1 << shift) - 1
+
+  def record(self, value):
+    value = max(int(value), 0)
+    lower, _ = self._bucket(value)
+    with self.lock:
+      self.counts[lower] = self.counts.get(lower, 0) + 1
+      self.count += 1
+      self.total += value
+      self.min = value if self.min is None else min(self.min, value)
+      self.max = value if self.max is None else max(self.max, value)
+
+  # Highest value equivalent to the bucket holding the q-th quantile (0 <= q <= 1)
+  def quantile(self, q):
+    with self.lock:
+      if not self.count:
+        return 0
+      rank = max(int(q * self.count + 0.5), 1)
+      seen = 0
+      for lower in sorted(self.counts):
+        seen += self.counts[lower]
+        if seen >= rank:
+          return min(lower + self._bucket(lower)[1], self.max)
+      return self.max
+
+  def mean(self):
+    return self.total / self.count if self.count else 0
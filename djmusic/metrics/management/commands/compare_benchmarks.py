@@ -0,0 +1,40 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+
+
+def load(path):
+  try:
+    with open(path) as file:
+      return json.load(file)
+  except (OSError, ValueError) as e:
+    raise CommandError('Could not read %s: %s' % (path, e))
+
+
+class Command(BaseCommand):
+  help = 'Compare two benchmark results written by metrics/tests/test_perf.py and fail on regressions'
+
+  def add_arguments(self, parser):
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='Throughput drop or p99 increase (in %%) reported as a regression')
+
+  def handle(self, *args, **options):
+    before, after = load(options['before']), load(options['after'])
+    for key in ('database', 'catalogue'):
+      if before.get(key) != after.get(key):
+        self.stderr.write('Warning: %s differs (%s, %s)' % (key, before.get(key), after.get(key)))
+
+    self.stdout.write('%-22s %12s %12s %8s %10s %10s %8s' % ('path', 'before/s', 'after/s', 'change', 'p99 before', 'p99 after', 'change'))
+    regressions = []
+    for name in sorted(set(before['results']) & set(after['results'])):
+      old, new = before['results'][name], after['results'][name]
+      throughput = (new['throughput'] / old['throughput'] - 1) * 100
+      p99 = (new['p99_ms'] / old['p99_ms'] - 1) * 100 if old['p99_ms'] else 0
+      if throughput < -options['threshold'] or p99 > options['threshold']:
+        regressions.append(name)
+      self.stdout.write('%-22s %12.0f %12.0f %+7.1f%% %9.1fms %9.1fms %+7.1f%%' % (
+        name, old['throughput'], new['throughput'], throughput, old['p99_ms'], new['p99_ms'], p99
+      ))
+    if regressions:
+      raise CommandError('Regressions in %s (%s to %s)' % (', '.join(regressions), before.get('commit'), after.get('commit')))
+    self.stdout.write(self.style.SUCCESS('No regression over %g%%' % options['threshold']))
@@ -0,0 +1,169 @@
+import re
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from albums.importer import CatalogueImporter
+from albums.models import Album, ApprovalJob, Song
+from albums.selection import select_for_serializer
+from albums.serializers import SongSerializer
+from artists.models import Artist
+from artists.serializers import ArtistDetailSerializer
+
+SHAPE_RE = re.compile(r'^(\d+)x(\d+)x(\d+)$')
+# Models whose Meta.indexes are compared, with the foreign key indexes they replaced
+MODELS = [
+  (Album, [models.Index(fields=['artist'], name='explain_album_artist')]),
+  (Song, [models.Index(fields=['album'], name='explain_song_album')]),
+]
+EXPLAIN = {
+  'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+  'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+
+def generated_rows(artists, albums, songs):
+  for a in range(artists):
+    for b in range(albums):
+      for c in range(songs):
+        yield {
+          'stage_name': 'explain artist %d' % a, 'social_link': '', 'album_name': 'album %d' % b,
+          'released_at': '2022-%02d-01T12:00:00' % (b % 12 + 1), 'cost': '9.99',
+          # Most albums of a grown catalogue are approved
+          'is_approved': 'false' if (a + b) % 10 == 0 else 'true',
+          'song_name': 'song %d' % c, 'image': '', 'audio': 'song_audio/explain-%d-%d-%d.mp3' % (a, b, c)
+        }
+
+
+def sample(queryset, count):
+  ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+  step = max(len(ids) // count, 1)
+  return ids[::step][:count]
+
+
+# The queries of the catalogue read paths, as their views and jobs run them
+def workload(artist_ids, album_ids):
+  artists = select_for_serializer(Artist.objects.all(), ArtistDetailSerializer())
+  for pk in artist_ids:
+    artists.filter(pk=pk).first()
+  songs = select_for_serializer(Song.objects.all(), SongSerializer(), extra_columns=['created'])
+  for pk in album_ids:
+    list(songs.filter(album_id=pk).order_by('created', 'id')[:101])
+  list(ApprovalJob().albums().filter(pk__gt=0).order_by('pk').values_list('pk', 'artist_id')[:1000])
+  list(ApprovalJob(artist_ids=artist_ids).albums().filter(pk__gt=0).order_by('pk').values_list('pk', 'artist_id')[:1000])
+  list(Album.objects.filter(artist_id__in=artist_ids).values_list('id', 'artist_id', 'album_name'))
+  Artist.objects.refresh_album_counts(artist_ids)
+
+
+class Recorder(object):
+  def __init__(self):
+    self.queries = {}
+
+  def __call__(self, execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+      return execute(sql, params, many, context)
+    finally:
+      elapsed = time.perf_counter() - start
+      if not many and sql.lstrip().upper().startswith(('SELECT', 'UPDATE')):
+        previous = self.queries.get(sql)
+        if previous is None or elapsed > previous[1]:
+          self.queries[sql] = (params, elapsed)
+
+  def slowest(self, count):
+    return sorted(self.queries.items(), key=lambda item: -item[1][1])[:count]
+
+
+class Command(BaseCommand):
+  help = (
+    'Print the query plans of the slowest catalogue queries without and with the catalogue indexes. '
+    'The indexes of the albums and songs tables are dropped and recreated, which locks the tables until the end: '
+    'only run it on a development or test database, and confirm with --i-know'
+  )
+
+  def add_arguments(self, parser):
+    parser.add_argument('--catalogue', help='Generate artists x albums x songs rows first, e.g. 2000x5x10')
+    parser.add_argument('--top', type=int, default=5, help='Number of queries to explain')
+    parser.add_argument('--sample', type=int, default=20, help='Artists and albums queried by the workload')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs timed per query')
+    parser.add_argument(
+      '--i-know', action='store_true', dest='i_know',
+      help='Confirm that the configured database is not in use, its catalogue indexes are dropped while the command runs'
+    )
+
+  def handle(self, *args, **options):
+    if connection.vendor not in EXPLAIN:
+      raise CommandError('Query plans are only supported on %s' % ', '.join(sorted(EXPLAIN)))
+    if not options['i_know']:
+      raise CommandError(
+        'The catalogue indexes of the %s database are dropped while the command runs, '
+        'run it on a development or test database with --i-know' % connection.settings_dict['NAME']
+      )
+
+    # Everything, including the generated rows, is rolled back at the end
+    with transaction.atomic():
+      if options['catalogue']:
+        self.generate(options['catalogue'])
+      artist_ids = sample(Artist.objects.all(), options['sample'])
+      album_ids = sample(Album.objects.all(), options['sample'])
+      if not album_ids:
+        raise CommandError('The database has no album, generate some with --catalogue')
+
+      self.use_indexes(False)
+      recorder = Recorder()
+      with connection.execute_wrapper(recorder):
+        workload(artist_ids, album_ids)
+      queries = recorder.slowest(options['top'])
+      before = [self.explain(sql, params, max(options['repeat'], 1)) for sql, (params, _) in queries]
+      self.use_indexes(True)
+      after = [self.explain(sql, params, max(options['repeat'], 1)) for sql, (params, _) in queries]
+      transaction.set_rollback(True)
+
+    for number, (old, new) in enumerate(zip(before, after), 1):
+      self.stdout.write(self.style.MIGRATE_HEADING('Query %d: %.2fms without indexes, %.2fms with' % (number, old[1], new[1])))
+      self.stdout.write(old[0])
+      self.stdout.write('-- without the catalogue indexes')
+      self.stdout.write(old[2])
+      self.stdout.write('-- with the catalogue indexes')
+      self.stdout.write(new[2])
+      self.stdout.write('')
+
+  def generate(self, shape):
+    match = SHAPE_RE.match(shape)
+    if match is None:
+      raise CommandError('--catalogue must look like 2000x5x10')
+    counts = CatalogueImporter().run(generated_rows(*[int(value) for value in match.groups()]))
+    self.stdout.write('Generated %(artists)d artists, %(albums)d albums and %(songs)d songs' % counts)
+
+  # Swaps the indexes of the models' Meta for the foreign key indexes they
+  # replaced, or back. The editor isn't entered, SQLite only allows that
+  # outside of transactions, and creating indexes needs nothing it defers
+  def use_indexes(self, enabled):
+    editor = connection.schema_editor()
+    for model, replaced in MODELS:
+      for index in model._meta.indexes:
+        (editor.add_index if enabled else editor.remove_index)(model, index)
+      for index in replaced:
+        (editor.remove_index if enabled else editor.add_index)(model, index)
+    with connection.cursor() as cursor:
+      for model in (Artist, Album, Song):
+        cursor.execute('ANALYZE %s' % connection.ops.quote_name(model._meta.db_table))
+
+  # The query as it was sent, the median time of `repeat` runs and its plan
+  def explain(self, sql, params, repeat):
+    timings = []
+    with connection.cursor() as cursor:
+      for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        if cursor.description:
+          cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+      query = connection.ops.last_executed_query(cursor, sql, params)
+      cursor.execute(EXPLAIN[connection.vendor] + sql, params)
+      rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+      plan = '\n'.join(row[-1] for row in rows)
+    else:
+      plan = '\n'.join(row[0] for row in rows)
+    return query, statistics.median(timings), plan
@@ -0,0 +1,70 @@
+import re
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+
+SAMPLE_RE = re.compile(r'^(?P<name>\w+)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+COLUMNS = (
+  ('requests', '%d'), ('p50 ms', '%.1f'), ('p90 ms', '%.1f'), ('p99 ms', '%.1f'),
+  ('db p99 ms', '%.1f'), ('ser. p99 ms', '%.1f'), ('queries p50', '%d'), ('queries p99', '%d'), ('errors', '%d'),
+)
+
+
+# {(method, route): {column: value}} from the /metrics text
+def parse_metrics(text):
+  routes = defaultdict(dict)
+  for line in text.splitlines():
+    match = SAMPLE_RE.match(line)
+    if match is None:
+      continue
+    labels = {key: value.replace('\\"', '"').replace('\\\\', '\\') for key, value in LABEL_RE.findall(match['labels'] or '')}
+    if 'route' not in labels:
+      continue
+    name, value, quantile = match['name'], float(match['value']), labels.get('quantile')
+    row = routes[(labels['method'], labels['route'])]
+    if name == 'djmusic_request_duration_seconds_count':
+      row['requests'] = value
+    elif name == 'djmusic_request_duration_seconds' and quantile:
+      row['p%d ms' % round(float(quantile) * 100)] = value * 1000
+    elif name == 'djmusic_request_db_seconds' and quantile == '0.99':
+      row['db p99 ms'] = value * 1000
+    elif name == 'djmusic_request_serialization_seconds' and quantile == '0.99':
+      row['ser. p99 ms'] = value * 1000
+    elif name == 'djmusic_request_queries' and quantile in ('0.5', '0.99'):
+      row['queries p%d' % round(float(quantile) * 100)] = value
+    elif name == 'djmusic_request_errors_total':
+      row['errors'] = value
+  return routes
+
+
+class Command(BaseCommand):
+  help = 'Fetch /metrics from a running server and print the latency and query count of every endpoint'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--url', default='http://127.0.0.1:8000/metrics', help='Metrics endpoint of the server')
+    parser.add_argument('--header', action='append', default=[], help='Extra request header, as "Name: value"')
+    parser.add_argument('--sort', choices=[name for name, _ in COLUMNS], default='p99 ms', help='Column sorted in descending order')
+
+  def handle(self, *args, **options):
+    request = urllib.request.Request(options['url'])
+    for header in options['header']:
+      name, _, value = header.partition(':')
+      request.add_header(name.strip(), value.strip())
+    try:
+      with urllib.request.urlopen(request, timeout=10) as response:
+        text = response.read().decode('utf-8')
+    except (urllib.error.URLError, OSError) as e:
+      raise CommandError('Could not fetch %s: %s' % (options['url'], e))
+
+    routes = parse_metrics(text)
+    if not routes:
+      self.stdout.write('No requests recorded')
+      return
+    rows = sorted(routes.items(), key=lambda item: item[1].get(options['sort'], 0), reverse=True)
+    width = max(len('%s %s' % key) for key, _ in rows)
+    self.stdout.write('%-*s  %s' % (width, 'endpoint', '  '.join('%11s' % name for name, _ in COLUMNS)))
+    for (method, route), row in rows:
+      cells = '  '.join('%11s' % (template % row.get(name, 0)) for name, template in COLUMNS)
+      self.stdout.write('%-*s  %s' % (width, '%s %s' % (method, route or '/'), cells))
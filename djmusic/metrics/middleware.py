@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Sample of the request being handled. Context variables follow the request
+# into the threads of sync_to_async, so queries of async views are counted too
+current_sample = ContextVar('metrics_sample', default=None)
+
+
+class Sample(object):
+  def __init__(self):
+    self.start = time.perf_counter()
+    self.queries = 0
+    self.db_time = 0.0
+    self.render_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+  sample = current_sample.get()
+  if sample is None:
+    return execute(sql, params, many, context)
+  start = time.perf_counter()
+  try:
+    return execute(sql, params, many, context)
+  finally:
+    sample.db_time += time.perf_counter() - start
+    sample.queries += 1
+
+
+def install_wrapper(connection, **kwargs):
+  if record_query not in connection.execute_wrappers:
+    connection.execute_wrappers.append(record_query)
+
+
+def budgets(route):
+  budget = {
+    'queries': getattr(settings, 'METRICS_QUERY_BUDGET', None),
+    'latency_ms': getattr(settings, 'METRICS_LATENCY_BUDGET_MS', None),
+  }
+  budget.update(getattr(settings, 'METRICS_BUDGETS', {}).get(route, {}))
+  return budget
+
+
+# Records the query count, database time, serialization time and total
+# latency of every request in per route histograms (see metrics.registry),
+# and logs a warning for requests over their query or latency budget.
+# Enabled by METRICS_ENABLED, it should come first in MIDDLEWARE to see the
+# whole request
+class MetricsMiddleware(object):
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    if not getattr(settings, 'METRICS_ENABLED', False):
+      raise MiddlewareNotUsed()
+    self.get_response = get_response
+    if asyncio.iscoroutinefunction(get_response):
+      # Mark the instance as a coroutine function, like MiddlewareMixin does
+      self._is_coroutine = asyncio.coroutines._is_coroutine
+    connection_created.connect(install_wrapper, dispatch_uid='metrics_install_wrapper')
+    for connection in connections.all():
+      install_wrapper(connection)
+
+  def __call__(self, request):
+    if asyncio.iscoroutinefunction(self.get_response):
+      return self.__acall__(request)
+    sample = Sample()
+    token = current_sample.set(sample)
+    try:
+      response = self.get_response(request)
+    finally:
+      current_sample.reset(token)
+    self.record(request, response, sample)
+    return response
+
+  async def __acall__(self, request):
+    sample = Sample()
+    token = current_sample.set(sample)
+    try:
+      response = await self.get_response(request)
+    finally:
+      current_sample.reset(token)
+    self.record(request, response, sample)
+    return response
+
+  # DRF responses are rendered after the last process_template_response
+  def process_template_response(self, request, response):
+    sample = current_sample.get()
+    if sample is not None:
+      start = time.perf_counter()
+
+      def rendered(response):
+        sample.render_time += time.perf_counter() - start
+      response.add_post_render_callback(rendered)
+    return response
+
+  def record(self, request, response, sample):
+    latency = time.perf_counter() - sample.start
+    match = request.resolver_match
+    route = match.route if match is not None else '<unmatched>'
+    metrics = registry.get(request.method, route)
+    metrics.latency.record(latency * 1e6)
+    metrics.db_time.record(sample.db_time * 1e6)
+    metrics.render_time.record(sample.render_time * 1e6)
+    metrics.queries.record(sample.queries)
+    if response.status_code >= 500:
+      metrics.add_error()
+
+    budget = budgets(route)
+    if budget['queries'] is not None and sample.queries > budget['queries']:
+      logger.warning(
+        '%s %s ran %d queries (budget %d)', request.method, request.path, sample.queries, budget['queries'],
+        extra={'route': route, 'queries': sample.queries}
+      )
+    if budget['latency_ms'] is not None and latency * 1000 > budget['latency_ms']:
+      logger.warning(
+        '%s %s took %.1fms (budget %sms, %.1fms in %d queries)', request.method, request.path,
+        latency * 1000, budget['latency_ms'], sample.db_time * 1000, sample.queries,
+        extra={'route': route, 'latency_ms': latency * 1000}
+      )
@@ -0,0 +1,85 @@
+import threading
+from .histogram import Histogram
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RouteMetrics(object):
+  def __init__(self):
+    self.latency = Histogram()
+    self.db_time = Histogram()
+    self.render_time = Histogram()
+    self.queries = Histogram()
+    self.errors = 0
+    self.lock = threading.Lock()
+
+  def add_error(self):
+    with self.lock:
+      self.errors += 1
+
+
+# Metrics of the requests served by this process, per (method, route)
+class Registry(object):
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.routes = {}
+
+  def get(self, method, route):
+    key = (method, route)
+    with self.lock:
+      metrics = self.routes.get(key)
+      if metrics is None:
+        metrics = self.routes[key] = RouteMetrics()
+      return metrics
+
+  def items(self):
+    with self.lock:
+      return sorted(self.routes.items())
+
+  def clear(self):
+    with self.lock:
+      self.routes.clear()
+
+
+registry = Registry()
+
+
+def _escape(value):
+  return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _summary(lines, name, histogram, labels, scale):
+  for quantile in QUANTILES:
+    lines.append('%s{%s,quantile="%s"} %s' % (name, labels, quantile, histogram.quantile(quantile) * scale))
+  lines.append('%s_sum{%s} %s' % (name, labels, histogram.total * scale))
+  lines.append('%s_count{%s} %d' % (name, labels, histogram.count))
+
+
+SUMMARIES = (
+  ('djmusic_request_duration_seconds', 'Total time spent handling the request', 'latency', 1e-6),
+  ('djmusic_request_db_seconds', 'Time spent running SQL queries', 'db_time', 1e-6),
+  ('djmusic_request_serialization_seconds', 'Time spent rendering (serializing) the response', 'render_time', 1e-6),
+  ('djmusic_request_queries', 'Number of SQL queries per request', 'queries', 1),
+)
+
+
+# Prometheus text exposition format (version 0.0.4). Times are recorded in
+# microseconds and exported in seconds
+def render_prometheus(extra_counters=()):
+  routes = registry.items()
+  lines = []
+  for name, help, attribute, scale in SUMMARIES:
+    lines.append('# HELP %s %s' % (name, help))
+    lines.append('# TYPE %s summary' % name)
+    for (method, route), metrics in routes:
+      labels = 'method="%s",route="%s"' % (_escape(method), _escape(route))
+      _summary(lines, name, getattr(metrics, attribute), labels, scale)
+  lines.append('# HELP djmusic_request_errors_total Requests answered with a 5xx status')
+  lines.append('# TYPE djmusic_request_errors_total counter')
+  for (method, route), metrics in routes:
+    lines.append('djmusic_request_errors_total{method="%s",route="%s"} %d' % (_escape(method), _escape(route), metrics.errors))
+  for name, help, value in extra_counters:
+    lines.append('# HELP %s %s' % (name, help))
+    lines.append('# TYPE %s counter' % name)
+    lines.append('%s %d' % (name, value))
+  return '\n'.join(lines) + '\n'
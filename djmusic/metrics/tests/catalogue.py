@@ -0,0 +1,50 @@
+import factory.random
+from albums.models import Album, Song
+from albums.tests.test_factories import AlbumFactory, SongFactory
+from artists.models import Artist
+from artists.tests.test_factories import ArtistFactory
+from search.indexing import rebuild_index
+
+BATCH_SIZE = 2000
+
+
+# Creates artists × albums × songs objects with the factories, saved with
+# bulk_create (so without signals) and then counted and indexed like the
+# importer does. Songs have no image, so no rendition is generated
+def build_catalogue(artists, albums, songs, seed=0):
+  factory.random.reseed_random(seed)
+  new_artists = ArtistFactory.build_batch(artists)
+  for i, artist in enumerate(new_artists):
+    # Faker user names repeat
+    artist.stage_name = '%s %d-%d' % (artist.stage_name, seed, i)
+  new_artists = Artist.objects.bulk_create(new_artists, batch_size=BATCH_SIZE)
+
+  new_albums = []
+  for i, artist in enumerate(new_artists):
+    new_albums.extend(AlbumFactory.build_batch(albums, artist=artist, is_approved=bool(i % 2)))
+  new_albums = Album.objects.bulk_create(new_albums, batch_size=BATCH_SIZE)
+
+  new_songs = []
+  for album in new_albums:
+    new_songs.extend(
+      SongFactory.build(album=album, image='', audio='song_audio/%d-%d.mp3' % (album.pk, i))
+      for i in range(songs)
+    )
+  Song.objects.bulk_create(new_songs, batch_size=BATCH_SIZE)
+
+  Artist.objects.refresh_album_counts()
+  rebuild_index()
+  return new_artists
+
+
+# Rows of the catalogue importer (see albums.importer) for the same shape
+def catalogue_rows(artists, albums, songs, prefix='imported'):
+  for a in range(artists):
+    for b in range(albums):
+      for c in range(songs):
+        yield {
+          'stage_name': '%s artist %d' % (prefix, a), 'social_link': 'https://example.com/%d' % a,
+          'album_name': 'album %d' % b, 'released_at': '2022-11-07T17:37:00', 'cost': '9.99',
+          'is_approved': 'true' if b % 2 else 'false', 'song_name': 'song %d' % c,
+          'image': '', 'audio': 'song_audio/%s-%d-%d-%d.mp3' % (prefix, a, b, c)
+        }
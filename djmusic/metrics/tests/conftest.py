@@ -0,0 +1,23 @@
+import pytest
+from django.core.cache import cache
+from search import backends
+from metrics.registry import registry
+from users.cache import detail_stats
+from albums import renditions
+
+@pytest.fixture(autouse=True)
+def reset_metrics(settings):
+  settings.METRICS_ENABLED = True
+  registry.clear()
+  detail_stats.reset()
+  cache.clear()
+  backends._backend = None
+  yield
+  registry.clear()
+  backends._backend = None
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  yield
+  renditions.backend.wait(timeout=10)
@@ -0,0 +1,39 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from albums.models import Song
+from artists.models import Artist
+
+@pytest.mark.django_db
+def test_explain_queries():
+  out = io.StringIO()
+  call_command('explain_queries', catalogue='6x3x4', top=20, sample=3, repeat=1, i_know=True, stdout=out)
+  output = out.getvalue()
+  assert 'Generated 6 artists, 18 albums and 72 songs' in output
+  assert output.count('-- without the catalogue indexes') == output.count('-- with the catalogue indexes') > 1
+  # The songs of an album are read in order from the composite index.
+  # PostgreSQL scans tables this small sequentially, whatever their indexes
+  if connection.vendor == 'sqlite':
+    songs = output[output.index('WHERE "albums_song"."album_id" = '):]
+    before, after = songs[:songs.index('\n\n')].split('-- with the catalogue indexes')
+    assert 'explain_song_album' in before and 'TEMP B-TREE' in before
+    assert 'song_album_created_idx' in after and 'TEMP B-TREE' not in after
+
+  # The generated rows and index changes are rolled back
+  assert not Artist.objects.exists()
+  with connection.cursor() as cursor:
+    indexes = connection.introspection.get_constraints(cursor, Song._meta.db_table)
+  assert 'song_album_created_idx' in indexes and 'explain_song_album' not in indexes
+
+@pytest.mark.django_db
+def test_explain_queries_needs_albums():
+  with pytest.raises(CommandError, match='no album'):
+    call_command('explain_queries', i_know=True, stdout=io.StringIO())
+
+@pytest.mark.django_db
+def test_explain_queries_needs_confirmation():
+  with pytest.raises(CommandError, match='--i-know'):
+    call_command('explain_queries', catalogue='1x1x1', stdout=io.StringIO())
+  assert not Artist.objects.exists()
@@ -0,0 +1,123 @@
+import json
+import logging
+import random
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from artists.tests.test_factories import ArtistFactory
+from users.tests.test_factories import UserFactory
+from metrics.histogram import Histogram
+from metrics.registry import registry
+from metrics.management.commands.metrics_report import parse_metrics
+
+def test_histogram_quantiles():
+  histogram = Histogram()
+  values = [random.randint(0, 10 ** 7) for _ in range(10000)]
+  for value in values:
+    histogram.record(value)
+  values.sort()
+  for q in (0.5, 0.9, 0.99):
+    exact = values[int(q * len(values) + 0.5) - 1]
+    assert abs(histogram.quantile(q) - exact) <= exact / 2 ** histogram.precision
+  assert histogram.quantile(1) == values[-1]
+  assert histogram.count == len(values) and histogram.total == sum(values)
+  # Only a few buckets per power of two
+  assert len(histogram.counts) < 24 * 2 ** histogram.precision
+
+def test_histogram_small_values_are_exact():
+  histogram = Histogram()
+  for value in (0, 1, 2, 3, 60):
+    histogram.record(value)
+  assert [histogram.quantile(q) for q in (0.2, 0.4, 0.6, 0.8, 1)] == [0, 1, 2, 3, 60]
+
+@pytest.mark.django_db
+def test_requests_are_recorded_per_route(django_assert_num_queries):
+  artist = ArtistFactory()
+  client = APIClient()
+  for _ in range(3):
+    with django_assert_num_queries(2):
+      assert client.get(f'/artists/{artist.id}/').status_code == 200
+  client.get('/missing/')
+
+  metrics = dict(registry.items())[('GET', 'artists/<int:pk>/')]
+  assert metrics.latency.count == 3
+  assert metrics.queries.quantile(0.5) == 2
+  assert metrics.db_time.count == 3 and metrics.render_time.total > 0
+  assert metrics.errors == 0
+  assert ('GET', '<unmatched>') in dict(registry.items())
+
+@pytest.mark.django_db
+def test_async_requests_are_recorded():
+  artist = ArtistFactory()
+  async def send():
+    return await AsyncClient().get(f'/artists/{artist.id}/')
+  response = async_to_sync(send)()
+  assert response.status_code == 200
+  metrics = dict(registry.items())[('GET', 'artists/<int:pk>/')]
+  assert metrics.queries.quantile(0.5) == 2
+
+@pytest.mark.django_db
+def test_budgets_log_warnings(settings, caplog):
+  artist = ArtistFactory()
+  settings.METRICS_QUERY_BUDGET = 1
+  with caplog.at_level(logging.WARNING, logger='metrics.middleware'):
+    APIClient().get(f'/artists/{artist.id}/')
+    APIClient().get('/search/', {'q': 'x'})
+  assert [record.route for record in caplog.records] == ['artists/<int:pk>/']
+
+  caplog.clear()
+  settings.METRICS_BUDGETS = {'artists/<int:pk>/': {'queries': 5, 'latency_ms': 0}}
+  with caplog.at_level(logging.WARNING, logger='metrics.middleware'):
+    APIClient().get(f'/artists/{artist.id}/')
+  assert len(caplog.records) == 1 and 'budget 0ms' in caplog.records[0].getMessage()
+
+@pytest.mark.django_db
+def test_disabled_by_default(settings):
+  settings.METRICS_ENABLED = False
+  artist = ArtistFactory()
+  APIClient().get(f'/artists/{artist.id}/')
+  assert registry.items() == []
+
+@pytest.mark.django_db
+def test_metrics_endpoint(settings):
+  settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+  artist = ArtistFactory()
+  client = APIClient()
+  client.get(f'/artists/{artist.id}/')
+  response = client.get('/metrics')
+  assert response.status_code == 200
+  assert response['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+  text = response.content.decode()
+  assert '# TYPE djmusic_request_duration_seconds summary' in text
+  assert 'djmusic_request_queries{method="GET",route="artists/<int:pk>/",quantile="0.99"} 2' in text
+  assert 'djmusic_user_cache_hits_total 0' in text
+
+  row = parse_metrics(text)[('GET', 'artists/<int:pk>/')]
+  assert row['requests'] == 1 and row['queries p99'] == 2 and row['errors'] == 0
+
+@pytest.mark.django_db
+def test_metrics_endpoint_access(settings):
+  # Nothing is allowed by address by default, not even localhost (a proxy)
+  assert APIClient(REMOTE_ADDR='127.0.0.1').get('/metrics').status_code in (401, 403)
+  settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+  client = APIClient(REMOTE_ADDR='10.0.0.1')
+  assert client.get('/metrics').status_code in (401, 403)
+  client.force_authenticate(UserFactory(is_staff=True))
+  assert client.get('/metrics').status_code == 200
+
+def test_compare_benchmarks(tmp_path):
+  def write(name, throughput, p99):
+    path = tmp_path / name
+    path.write_text(json.dumps({'commit': name, 'database': 'sqlite', 'catalogue': '1x1x1', 'results': {
+      'search': {'operations': 10, 'throughput': throughput, 'p50_ms': 1, 'p99_ms': p99}
+    }}))
+    return str(path)
+
+  before = write('before', 1000, 2)
+  call_command('compare_benchmarks', before, write('faster', 1200, 1.9))
+  with pytest.raises(CommandError, match='search'):
+    call_command('compare_benchmarks', before, write('slower', 1000, 3))
+  call_command('compare_benchmarks', before, write('noisy', 950, 2.1))
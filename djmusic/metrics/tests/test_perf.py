@@ -0,0 +1,123 @@
+import datetime
+import json
+import os
+import random
+import subprocess
+import time
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from albums.importer import CatalogueImporter
+from albums.models import Album, Song
+from .catalogue import build_catalogue, catalogue_rows
+
+# Throughput and latency of the list, search, import and delete paths on a
+# generated catalogue, only run with DJMUSIC_BENCHMARKS=1:
+#   DJMUSIC_BENCHMARKS=1 pytest djmusic/metrics/tests/test_perf.py -s
+# They run on the configured database, set DATABASE_URL=sqlite:///bench.sqlite3
+# to use SQLite. Results are written as JSON to DJMUSIC_BENCHMARK_RESULTS
+# (by default benchmarks/<commit>-<database>.json), compare two runs with
+#   manage.py compare_benchmarks before.json after.json
+pytestmark = pytest.mark.skipif(not os.environ.get('DJMUSIC_BENCHMARKS'), reason='Set DJMUSIC_BENCHMARKS=1 to run benchmarks')
+
+# artists x albums per artist x songs per album
+CATALOGUE = tuple(int(n) for n in os.environ.get('DJMUSIC_BENCHMARK_CATALOGUE', '200x5x10').split('x'))
+REQUESTS = int(os.environ.get('DJMUSIC_BENCHMARK_REQUESTS', 500))
+
+results = {}
+
+def commit():
+  try:
+    return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return 'unknown'
+
+@pytest.fixture(scope='module', autouse=True)
+def write_results():
+  yield
+  if not results:
+    return
+  revision = commit()
+  path = os.environ.get('DJMUSIC_BENCHMARK_RESULTS') or os.path.join('benchmarks', '%s-%s.json' % (revision, connection.vendor))
+  os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+  with open(path, 'w') as file:
+    json.dump({
+      'commit': revision,
+      'database': connection.vendor,
+      'catalogue': 'x'.join(map(str, CATALOGUE)),
+      'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+      'results': results,
+    }, file, indent=2, sort_keys=True)
+  print('\nBenchmark results written to %s' % path)
+
+# Runs `operation` for every item and records the throughput and latency
+def run(name, operation, items, unit=1):
+  timings = []
+  start = time.perf_counter()
+  for item in items:
+    operation_start = time.perf_counter()
+    operation(item)
+    timings.append(time.perf_counter() - operation_start)
+  elapsed = time.perf_counter() - start
+  timings.sort()
+  results[name] = {
+    'operations': len(timings),
+    'throughput': len(timings) * unit / elapsed,
+    'p50_ms': timings[len(timings) // 2] * 1000,
+    'p99_ms': timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000,
+  }
+  print('\n%-14s %8.0f/s  p50 %.1fms  p99 %.1fms' % (name, results[name]['throughput'], results[name]['p50_ms'], results[name]['p99_ms']))
+
+def get(client, url):
+  response = client.get(url)
+  assert response.status_code == 200
+  if response.streaming:
+    b''.join(response.streaming_content)
+
+@pytest.fixture
+def catalogue(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  return build_catalogue(*CATALOGUE)
+
+@pytest.mark.django_db
+def test_list(catalogue):
+  client = Client()
+  run('artists list', lambda _: get(client, '/artists/'), range(REQUESTS))
+
+  def uncached(_):
+    cache.clear()
+    get(client, '/artists/')
+  run('artists list uncached', uncached, range(REQUESTS))
+
+  run('albums list', lambda _: get(client, '/albums/'), range(REQUESTS))
+  albums = list(Album.objects.values_list('pk', flat=True))
+  generator = random.Random(0)
+  run('album songs', lambda pk: get(client, '/albums/%d/songs/' % pk), generator.choices(albums, k=REQUESTS))
+
+@pytest.mark.django_db
+def test_search(catalogue):
+  client = Client()
+  words = [word for name in Album.objects.values_list('album_name', flat=True)[:500] for word in name.split()]
+  generator = random.Random(0)
+  get(client, '/search/?q=warmup')
+  run('search', lambda text: get(client, '/search/?q=' + text), [' '.join(generator.sample(words, 2)) for _ in range(REQUESTS)])
+
+@pytest.mark.django_db
+def test_import(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  rows = list(catalogue_rows(*CATALOGUE))
+  batches = [rows[start:start + 1000] for start in range(0, len(rows), 1000)]
+  importer = CatalogueImporter(batch_size=1000)
+  # Throughput in rows per second
+  run('import', importer.import_batch, batches, unit=len(rows) / len(batches))
+
+@pytest.mark.django_db
+def test_delete(catalogue):
+  albums = list(Album.objects.order_by('pk'))
+  half = len(albums) // 2
+  run('album delete', lambda album: album.delete(), albums[:half][:REQUESTS])
+
+  def delete_songs(album):
+    Song.objects.filter(album=album).exclude(pk=album.song_set.order_by('pk')[0].pk).delete()
+  run('songs delete', delete_songs, albums[half:][:REQUESTS])
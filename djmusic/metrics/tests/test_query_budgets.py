@@ -0,0 +1,88 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from albums.importer import CatalogueImporter
+from albums.models import Album, Song
+from users.tests.test_factories import UserFactory
+from .catalogue import build_catalogue, catalogue_rows
+
+# Queries per request of every endpoint and admin page. They are measured on
+# a small and a larger catalogue and must not depend on its size. Requests
+# are measured with an empty cache after a first request, so per process
+# state (content types, the in-process search index) is already loaded.
+# Lower a budget when an endpoint gets cheaper, never raise it to make a
+# test pass without understanding why
+BUDGETS = {
+  'artists list': ('/artists/', 1),
+  'artist detail': ('/artists/{artist}/', 3),
+  'artists catalogue': ('/artists/catalogue/', 1),
+  'albums list': ('/albums/', 1),
+  'album songs': ('/albums/{album}/songs/', 2),
+  'user detail': ('/users/{user}/', 1),
+  'search': ('/search/?q=album', 1),
+  # Admin pages also load the session and the staff user
+  'artist changelist': ('/admin/artists/artist/', 4),
+  'album changelist': ('/admin/albums/album/', 4),
+  'song changelist': ('/admin/albums/song/', 4),
+  'user changelist': ('/admin/users/user/', 5),
+  'album change form': ('/admin/albums/album/{album}/change/', 7),
+}
+SIZES = ((2, 2, 2), (6, 3, 4))
+
+def count_queries(client, url):
+  client.get(url)
+  cache.clear()
+  with CaptureQueriesContext(connection) as context:
+    response = client.get(url)
+    if response.streaming:
+      b''.join(response.streaming_content)
+  assert response.status_code == 200
+  return len(context.captured_queries)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', BUDGETS)
+def test_endpoint_query_budget(name):
+  url, budget = BUDGETS[name]
+  admin = UserFactory(is_staff=True, is_superuser=True)
+  client = APIClient()
+  client.force_login(admin)
+  counts = []
+  for seed, size in enumerate(SIZES):
+    artist = build_catalogue(*size, seed=seed)[0]
+    album = Album.objects.filter(artist=artist).first()
+    counts.append(count_queries(client, url.format(artist=artist.pk, album=album.pk, user=admin.pk)))
+  assert counts[0] == counts[1], '%s runs a query per object' % name
+  assert counts[0] <= budget, '%s ran %d queries, its budget is %d' % (name, counts[0], budget)
+
+def measure(operation):
+  with CaptureQueriesContext(connection) as context:
+    operation()
+  return len(context.captured_queries)
+
+@pytest.mark.django_db
+def test_delete_query_budget():
+  counts = []
+  for seed, size in enumerate(SIZES):
+    build_catalogue(*size, seed=seed)
+    album = Album.objects.order_by('-pk').first()
+    counts.append(measure(album.delete))
+    # Every song but one of the next album
+    album = Album.objects.order_by('-pk').first()
+    counts.append(measure(lambda: Song.objects.filter(album=album).exclude(pk=album.song_set.order_by('pk')[0].pk).delete()))
+  # Including the insert of the deleted album and songs in the change outbox
+  assert counts[0] == counts[2] and counts[0] <= 8
+  # Including the SET NULL of the uploads of the songs and the outbox insert
+  assert counts[1] == counts[3] and counts[1] <= 7
+
+@pytest.mark.django_db
+def test_import_query_budget():
+  counts = []
+  for size in SIZES:
+    rows = list(catalogue_rows(*size, prefix='import %d' % len(counts)))
+    counts.append(measure(lambda: CatalogueImporter(batch_size=len(rows), use_copy=False).run(rows)))
+  # Queries per batch, whatever its size. Including the lookup of the artists
+  # before their upsert, the insert of the batch's changes in the outbox and,
+  # per kind, the read and upsert of the search index titles
+  assert counts[0] == counts[1] and counts[0] <= 17
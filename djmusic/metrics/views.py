@@ -0,0 +1,44 @@
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from users.cache import detail_stats
+from .registry import render_prometheus
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class PrometheusRenderer(BaseRenderer):
+  media_type = 'text/plain'
+  format = 'txt'
+  charset = 'utf-8'
+
+  def render(self, data, accepted_media_type=None, renderer_context=None):
+    # Errors (permission denied) are rendered as their message
+    if isinstance(data, dict):
+      data = '%s\n' % data.get('detail', '')
+    return data.encode(self.charset)
+
+
+# Scrapers connecting from METRICS_ALLOWED_IPS, or staff users. REMOTE_ADDR
+# is the address of the proxy when there is one, not of the client
+class CanReadMetrics(BasePermission):
+  def has_permission(self, request, view):
+    if request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+      return True
+    return bool(request.user and request.user.is_staff)
+
+
+class MetricsView(APIView):
+  permission_classes = [CanReadMetrics]
+  renderer_classes = [PrometheusRenderer]
+
+  # Metrics of the process answering the request, every worker has its own
+  def get(self, request, format=None):
+    stats = detail_stats.snapshot()
+    text = render_prometheus([
+      ('djmusic_user_cache_hits_total', 'Hits of the user detail cache', stats['hits']),
+      ('djmusic_user_cache_misses_total', 'Misses of the user detail cache', stats['misses']),
+    ])
+    return Response(text, content_type=CONTENT_TYPE)
@@ -0,0 +1,180 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils.module_loading import import_string
+from .models import SearchEntry
+
+# pg_trgm's default similarity threshold
+SIMILARITY_THRESHOLD = 0.3
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+  return WORD_RE.findall(text.lower())
+
+
+# Same padding as pg_trgm: two spaces before and one after each word
+def trigrams(word):
+  padded = '  %s ' % word
+  return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PostgresBackend(object):
+  def index(self, kind, titles):
+    SearchEntry.objects.bulk_create(
+      [SearchEntry(kind=kind, object_id=object_id, title=title) for object_id, title in titles.items()],
+      update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['title']
+    )
+    SearchEntry.objects.filter(kind=kind, object_id__in=list(titles)) \
+      .update(vector=SearchVector('title', config='simple'))
+
+  def unindex(self, kind, object_ids):
+    SearchEntry.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+  def search(self, text, kind=None, limit=20):
+    query = SearchQuery(text, config='simple', search_type='websearch')
+    entries = SearchEntry.objects \
+      .annotate(rank=SearchRank(F('vector'), query), similarity=TrigramSimilarity('title', text)) \
+      .filter(Q(vector=query) | Q(title__trigram_similar=text))
+    if kind:
+      entries = entries.filter(kind=kind)
+    entries = entries.order_by('-rank', '-similarity', 'id').values_list('kind', 'object_id', 'title', 'rank', 'similarity')
+    return [
+      {'kind': kind, 'id': object_id, 'title': title, 'score': rank + similarity}
+      for kind, object_id, title, rank, similarity in entries[:limit]
+    ]
+
+
+# Pure Python inverted index used when the database has no full-text search.
+# Words map to the entries containing them, and the trigrams of every known
+# word map to the words, so misspelled query words are matched by trigram
+# similarity like pg_trgm does. It is built from SearchEntry on first use and
+# updated in place afterwards, so it only sees writes of its own process
+class InvertedIndexBackend(object):
+  def __init__(self):
+    self.lock = threading.RLock()
+    self.built = False
+    self.titles = {}
+    self.postings = defaultdict(set)
+    self.words = defaultdict(set)
+
+  def build(self, entries=None):
+    with self.lock:
+      self.titles.clear()
+      self.postings.clear()
+      self.words.clear()
+      if entries is None:
+        entries = SearchEntry.objects.values_list('kind', 'object_id', 'title').iterator(chunk_size=10000)
+      for kind, object_id, title in entries:
+        self._add((kind, object_id), title)
+      self.built = True
+
+  def _ensure_built(self):
+    if not self.built:
+      self.build()
+
+  def _add(self, key, title):
+    self.titles[key] = title
+    for word in set(tokenize(title)):
+      if word not in self.postings:
+        for trigram in trigrams(word):
+          self.words[trigram].add(word)
+      self.postings[word].add(key)
+
+  def _remove(self, key):
+    title = self.titles.pop(key, None)
+    if title is None:
+      return
+    for word in set(tokenize(title)):
+      keys = self.postings.get(word)
+      if keys is None:
+        continue
+      keys.discard(key)
+      if not keys:
+        del self.postings[word]
+        for trigram in trigrams(word):
+          self.words[trigram].discard(word)
+
+  def index(self, kind, titles):
+    SearchEntry.objects.bulk_create(
+      [SearchEntry(kind=kind, object_id=object_id, title=title) for object_id, title in titles.items()],
+      update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['title']
+    )
+    transaction.on_commit(lambda: self._update(kind, titles))
+
+  def _update(self, kind, titles):
+    with self.lock:
+      if self.built:
+        for object_id, title in titles.items():
+          self._remove((kind, object_id))
+          self._add((kind, object_id), title)
+
+  def unindex(self, kind, object_ids):
+    object_ids = list(object_ids)
+    SearchEntry.objects.filter(kind=kind, object_id__in=object_ids).delete()
+    transaction.on_commit(lambda: self._discard(kind, object_ids))
+
+  def _discard(self, kind, object_ids):
+    with self.lock:
+      if self.built:
+        for object_id in object_ids:
+          self._remove((kind, object_id))
+
+  # Words of the index similar to `word`, with their trigram similarity
+  def _similar_words(self, word):
+    query_trigrams = trigrams(word)
+    shared = defaultdict(int)
+    for trigram in query_trigrams:
+      for candidate in self.words.get(trigram, ()):
+        shared[candidate] += 1
+    similar = {}
+    for candidate, count in shared.items():
+      similarity = count / (len(query_trigrams) + len(trigrams(candidate)) - count)
+      if similarity >= SIMILARITY_THRESHOLD:
+        similar[candidate] = similarity
+    return similar
+
+  def search(self, text, kind=None, limit=20):
+    self._ensure_built()
+    scores = defaultdict(float)
+    with self.lock:
+      for word in set(tokenize(text)):
+        matches = {word: 1.0} if word in self.postings else self._similar_words(word)
+        best = {}
+        for match, similarity in matches.items():
+          for key in self.postings[match]:
+            if similarity > best.get(key, 0):
+              best[key] = similarity
+        for key, similarity in best.items():
+          if kind is None or key[0] == kind:
+            scores[key] += similarity
+      top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0][1]))
+      return [
+        {'kind': key[0], 'id': key[1], 'title': self.titles[key], 'score': score}
+        for key, score in top
+      ]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# SEARCH_BACKEND may name a backend class, by default PostgreSQL databases use
+# full-text search and every other database the in-process index
+def get_backend():
+  global _backend
+  with _backend_lock:
+    if _backend is None:
+      path = getattr(settings, 'SEARCH_BACKEND', None)
+      if path:
+        _backend = import_string(path)()
+      elif connection.vendor == 'postgresql':
+        _backend = PostgresBackend()
+      else:
+        _backend = InvertedIndexBackend()
+    return _backend
@@ -0,0 +1,28 @@
+from albums.models import Album, Song
+from artists.models import Artist
+from .backends import get_backend
+from .models import SearchEntry
+
+SOURCES = (
+  (SearchEntry.ARTIST, Artist, 'stage_name'),
+  (SearchEntry.ALBUM, Album, 'album_name'),
+  (SearchEntry.SONG, Song, 'name'),
+)
+
+
+# Index every artist, album and song, `batch_size` objects per query.
+# Entries of deleted objects are removed first
+def rebuild_index(batch_size=5000, progress=None):
+  backend = get_backend()
+  for kind, model, field in SOURCES:
+    SearchEntry.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk')).delete()
+    titles = {}
+    for object_id, title in model.objects.order_by('pk').values_list('pk', field).iterator(chunk_size=batch_size):
+      titles[object_id] = title or ''
+      if len(titles) >= batch_size:
+        backend.index(kind, titles)
+        titles = {}
+    if titles:
+      backend.index(kind, titles)
+    if progress:
+      progress(kind)
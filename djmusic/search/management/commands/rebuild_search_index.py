@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from search.indexing import rebuild_index
+
+class Command(BaseCommand):
+  help = 'Index every artist, album and song for the /search/ API'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=5000, help='Number of objects indexed per query')
+
+  def handle(self, *args, **options):
+    start = time.monotonic()
+    rebuild_index(
+      batch_size=options['batch_size'],
+      progress=lambda kind: self.stdout.write('Indexed %s entries (%.1fs)' % (kind, time.monotonic() - start))
+    )
+    self.stdout.write(self.style.SUCCESS('Rebuilt the search index in %.1fs' % (time.monotonic() - start)))
@@ -0,0 +1,67 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:47
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# GIN indexes only exist on PostgreSQL, other databases use the in-process index
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE INDEX search_entry_vector_gin ON search_searchentry USING gin (vector)')
+    schema_editor.execute('CREATE INDEX search_entry_title_trgm ON search_searchentry USING gin (title gin_trgm_ops)')
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS search_entry_vector_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS search_entry_title_trgm')
+
+
+def populate_entries(apps, schema_editor):
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    sources = (
+        ('artist', apps.get_model('artists', 'Artist'), 'stage_name'),
+        ('album', apps.get_model('albums', 'Album'), 'album_name'),
+        ('song', apps.get_model('albums', 'Song'), 'name'),
+    )
+    for kind, model, field in sources:
+        entries = [
+            SearchEntry(kind=kind, object_id=object_id, title=title or '')
+            for object_id, title in model.objects.values_list('pk', field).iterator()
+        ]
+        SearchEntry.objects.bulk_create(entries, batch_size=5000)
+    if schema_editor.connection.vendor == 'postgresql':
+        SearchEntry.objects.update(vector=django.contrib.postgres.search.SearchVector('title', config='simple'))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('artists', '0002_album_counters'),
+        ('albums', '0002_song_audio_metadata'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('artist', 'Artist'), ('album', 'Album'), ('song', 'Song')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_unique_object'),
+        ),
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+        migrations.RunPython(populate_entries, migrations.RunPython.noop),
+    ]
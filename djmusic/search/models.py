@@ -0,0 +1,26 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+# One row per searchable artist, album or song, kept up to date from the change
+# outbox by search.signals.
+# On PostgreSQL `vector` has a GIN index for full-text search and `title` a
+# pg_trgm GIN index for similarity search (see the migrations), other databases
+# use the in-process index of search.backends instead
+class SearchEntry(models.Model):
+  ARTIST = 'artist'
+  ALBUM = 'album'
+  SONG = 'song'
+  KIND_CHOICES = [(ARTIST, 'Artist'), (ALBUM, 'Album'), (SONG, 'Song')]
+
+  kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+  object_id = models.BigIntegerField()
+  title = models.CharField(max_length=200)
+  vector = SearchVectorField(null=True, editable=False)
+
+  def __str__(self):
+    return self.title
+
+  class Meta:
+    constraints = [
+      models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entry_unique_object')
+    ]
@@ -0,0 +1,34 @@
+from collections import defaultdict
+from django.dispatch import receiver
+from changes.models import Change
+from changes.outbox import changes_recorded
+from .backends import get_backend
+from .indexing import SOURCES
+
+# Titles read per query
+BATCH_SIZE = 1000
+
+# The index follows the change outbox rather than the model signals, so that
+# bulk writes (imports, QuerySet.update and bulk_create) are indexed too. The
+# titles of the written objects are read again, updates that didn't write the
+# title are skipped, and each kind is indexed and unindexed in one call
+@receiver(changes_recorded, sender=Change, dispatch_uid='search_index_changes')
+def index_changes(sender, changes, using=None, **kwargs):
+  sources = {model._meta.model_name: (kind, model, field) for kind, model, field in SOURCES}
+  written = defaultdict(set)
+  deleted = defaultdict(set)
+  for change in changes:
+    kind, model, field = sources[change.kind]
+    if change.action == Change.DELETED:
+      deleted[kind].add(change.object_id)
+    elif change.fields is None or field in change.fields:
+      written[kind].add(change.object_id)
+
+  backend = get_backend()
+  for kind, object_ids in deleted.items():
+    backend.unindex(kind, object_ids)
+  for kind, model, field in SOURCES:
+    object_ids = sorted(written[kind] - deleted[kind])
+    for start in range(0, len(object_ids), BATCH_SIZE):
+      titles = model._base_manager.using(using).filter(pk__in=object_ids[start:start + BATCH_SIZE]).values_list('pk', field)
+      backend.index(kind, {object_id: title or '' for object_id, title in titles})
@@ -0,0 +1,21 @@
+import pytest
+from rest_framework.test import APIClient
+from search import backends
+from albums import renditions
+
+@pytest.fixture(autouse=True)
+def search_backend(monkeypatch):
+  # Every test builds its own in-process index from its own database
+  monkeypatch.setattr(backends, '_backend', None)
+  yield
+  monkeypatch.setattr(backends, '_backend', None)
+
+@pytest.fixture
+def client():
+  return APIClient()
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+  settings.MEDIA_ROOT = tmp_path
+  yield
+  renditions.backend.wait(timeout=10)
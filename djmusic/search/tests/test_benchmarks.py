@@ -0,0 +1,69 @@
+import os
+import random
+import time
+import pytest
+from django.db import connection
+from search.backends import InvertedIndexBackend, PostgresBackend
+from search.models import SearchEntry
+
+# Latency of the search backends on a generated catalogue, only run with
+# DJMUSIC_BENCHMARKS=1 since building it takes minutes:
+#   DJMUSIC_BENCHMARKS=1 pytest search/tests/test_benchmarks.py -s
+pytestmark = pytest.mark.skipif(not os.environ.get('DJMUSIC_BENCHMARKS'), reason='Set DJMUSIC_BENCHMARKS=1 to run benchmarks')
+
+SONGS = int(os.environ.get('DJMUSIC_BENCHMARK_SONGS', 1000000))
+QUERIES = 200
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'da', 'fe', 'go', 'ha', 'ji', 'ku', 'le', 'ma', 'no', 'pi', 're', 'zu']
+# 8000 made up three syllable words
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+def generate_titles(n, seed=0):
+  generator = random.Random(seed)
+  for object_id in range(1, n + 1):
+    yield object_id, ' '.join(generator.sample(WORDS, generator.randint(2, 4)))
+
+def queries(seed=1):
+  generator = random.Random(seed)
+  result = []
+  for _ in range(QUERIES):
+    first, second = generator.sample(WORDS, 2)
+    # Every other query has a typo
+    if len(result) % 2:
+      first = first[1:]
+    result.append('%s %s' % (first, second))
+  return result
+
+def measure(backend):
+  timings = []
+  for text in queries():
+    start = time.perf_counter()
+    backend.search(text, limit=20)
+    timings.append(time.perf_counter() - start)
+  timings.sort()
+  p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99) - 1]
+  print('\n%s on %d songs: p50 %.1fms, p99 %.1fms' % (type(backend).__name__, SONGS, p50 * 1000, p99 * 1000))
+  return p50, p99
+
+def test_inverted_index_latency():
+  backend = InvertedIndexBackend()
+  start = time.perf_counter()
+  backend.build(('song', object_id, title) for object_id, title in generate_titles(SONGS))
+  print('\nBuilt the index of %d songs in %.1fs' % (SONGS, time.perf_counter() - start))
+  measure(backend)
+
+@pytest.mark.django_db
+def test_postgres_latency():
+  if connection.vendor != 'postgresql':
+    pytest.skip('Needs PostgreSQL')
+  backend = PostgresBackend()
+  titles = {}
+  for object_id, title in generate_titles(SONGS):
+    titles[object_id] = title
+    if len(titles) == 10000:
+      backend.index(SearchEntry.SONG, titles)
+      titles = {}
+  if titles:
+    backend.index(SearchEntry.SONG, titles)
+  with connection.cursor() as cursor:
+    cursor.execute('ANALYZE search_searchentry')
+  measure(backend)
@@ -0,0 +1,22 @@
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .backends import get_backend
+from .models import SearchEntry
+
+class SearchQuerySerializer(serializers.Serializer):
+  q = serializers.CharField(max_length=200)
+  kind = serializers.ChoiceField(choices=SearchEntry.KIND_CHOICES, required=False)
+  limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class SearchView(APIView):
+  read_replica = True
+
+  # Ranked artists, albums and songs matching ?q=, optionally of one ?kind=
+  def get(self, request):
+    params = SearchQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    results = get_backend().search(
+      params.validated_data['q'], kind=params.validated_data.get('kind'), limit=params.validated_data['limit']
+    )
+    return Response({'results': results})
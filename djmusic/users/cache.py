@@ -0,0 +1,88 @@
+import hashlib
+import json
+import threading
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import User
+from .serializers import UserSerializer
+
+# Bump when the output of UserSerializer changes, so old entries are ignored
+DETAIL_SERIALIZER_VERSION = 1
+DETAIL_CACHE_TIMEOUT = 60 * 60
+
+
+# Hits and misses of the user detail cache in this process
+class CacheStats(object):
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def record(self, hit):
+    with self.lock:
+      if hit:
+        self.hits += 1
+      else:
+        self.misses += 1
+
+  def snapshot(self):
+    with self.lock:
+      total = self.hits + self.misses
+      return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / total if total else None}
+
+  def reset(self):
+    with self.lock:
+      self.hits = self.misses = 0
+
+
+detail_stats = CacheStats()
+
+
+def detail_cache_key(pk):
+  return 'users:detail:%d:%s' % (DETAIL_SERIALIZER_VERSION, pk)
+
+
+# The ETag is computed from the serialized data, it changes whenever a
+# returned field does
+def detail_entry(user):
+  data = UserSerializer(user).data
+  digest = hashlib.sha1(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+  return dict(data), '"%s"' % digest
+
+
+def _queryset():
+  return User.objects.only(*UserSerializer.Meta.fields)
+
+
+# Returns (data, etag) of a user or None if there is no such user. Misses are
+# filled with add() so they never overwrite a newer write-through entry
+def get_user_detail(pk):
+  entry = cache.get(detail_cache_key(pk))
+  detail_stats.record(entry is not None)
+  if entry is None:
+    user = _queryset().filter(pk=pk).first()
+    if user is None:
+      return None
+    entry = detail_entry(user)
+    cache.add(detail_cache_key(pk), entry, DETAIL_CACHE_TIMEOUT)
+  return entry
+
+
+async def aget_user_detail(pk):
+  entry = await cache.aget(detail_cache_key(pk))
+  detail_stats.record(entry is not None)
+  if entry is None:
+    user = await _queryset().filter(pk=pk).afirst()
+    if user is None:
+      return None
+    entry = detail_entry(user)
+    await cache.aadd(detail_cache_key(pk), entry, DETAIL_CACHE_TIMEOUT)
+  return entry
+
+
+def store_user_detail(pk, entry):
+  cache.set(detail_cache_key(pk), entry, DETAIL_CACHE_TIMEOUT)
+
+
+def delete_user_detail(pk):
+  cache.delete(detail_cache_key(pk))
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+# PBKDF2 with its work factor taken from PASSWORD_PBKDF2_ITERATIONS, measure
+# the cost of a value on the production hardware with `manage.py benchmark_hashers`.
+# Stored hashes with another number of iterations are upgraded at login
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+  @property
+  def iterations(self):
+    return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+# Rehashes passwords whose hasher or work factor is outdated on a local worker
+# pool, so the login that noticed it doesn't pay for a second slow hash.
+# The new hash is only written if the password didn't change in the meantime
+class HashUpgradeQueue(object):
+
+  def __init__(self):
+    self._executor = None
+    self._pending = set()
+    self._lock = threading.Lock()
+
+  @property
+  def executor(self):
+    with self._lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(
+          max_workers=getattr(settings, 'PASSWORD_UPGRADE_WORKERS', 1),
+          thread_name_prefix='password-upgrades'
+        )
+      return self._executor
+
+  def schedule(self, model, pk, raw_password, encoded):
+    future = self.executor.submit(self._upgrade, model, pk, raw_password, encoded)
+    with self._lock:
+      self._pending.add(future)
+    future.add_done_callback(self._done)
+
+  def _upgrade(self, model, pk, raw_password, encoded):
+    try:
+      model._default_manager.filter(pk=pk, password=encoded).update(password=hashers.make_password(raw_password))
+    except Exception:
+      logger.exception('Could not upgrade the password hash of user %s', pk)
+    finally:
+      close_old_connections()
+
+  def _done(self, future):
+    with self._lock:
+      self._pending.discard(future)
+
+  def wait(self, timeout=None):
+    with self._lock:
+      pending = set(self._pending)
+    wait(pending, timeout=timeout)
+
+
+upgrades = HashUpgradeQueue()
+
+
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+
+
+# Hash a password on a worker pool from async code. PBKDF2 releases the GIL,
+# so the hashes of concurrent requests run in parallel while the event loop
+# (and the thread that sync views share under ASGI) stays free
+async def make_password_async(raw_password):
+  global _hash_executor
+  with _hash_executor_lock:
+    if _hash_executor is None:
+      _hash_executor = ThreadPoolExecutor(
+        max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count(),
+        thread_name_prefix='password-hashing'
+      )
+  return await asyncio.get_running_loop().run_in_executor(_hash_executor, hashers.make_password, raw_password)
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+  help = 'Measure the cost of PBKDF2 work factors to choose PASSWORD_PBKDF2_ITERATIONS'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--target-ms', type=float, default=100, help='Wanted duration of one password check')
+    parser.add_argument('--iterations', type=int, nargs='*', help='Work factors to measure, defaults to a range around the current one')
+    parser.add_argument('--rounds', type=int, default=5, help='Hashes measured per work factor')
+
+  def handle(self, *args, **options):
+    current = getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+    candidates = options['iterations'] or [current // 4, current // 2, current, current * 2]
+    hasher = PBKDF2PasswordHasher()
+    salt = hasher.salt()
+
+    per_iteration = None
+    for iterations in candidates:
+      timings = []
+      for _ in range(options['rounds']):
+        start = time.perf_counter()
+        hasher.encode('benchmark password', salt, iterations)
+        timings.append(time.perf_counter() - start)
+      median = sorted(timings)[len(timings) // 2]
+      per_iteration = median / iterations
+      self.stdout.write('%9d iterations: %7.1fms' % (iterations, median * 1000))
+
+    suggested = int(options['target_ms'] / 1000 / per_iteration)
+    self.stdout.write(self.style.SUCCESS(
+      'About %d iterations take %.0fms (current PASSWORD_PBKDF2_ITERATIONS: %d)' % (suggested, options['target_ms'], current)
+    ))
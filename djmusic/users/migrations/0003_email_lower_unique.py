@@ -0,0 +1,42 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:55
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+
+# Emails differing only by case were accepted before the constraint, the
+# migration stops and lists them so they can be merged or changed first
+def check_email_duplicates(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    duplicates = (
+        User.objects.using(schema_editor.connection.alias).exclude(email='')
+        .annotate(email_lower=Lower('email')).values('email_lower')
+        .annotate(count=Count('pk')).filter(count__gt=1).values_list('email_lower', flat=True)
+    )
+    users = (
+        User.objects.using(schema_editor.connection.alias)
+        .annotate(email_lower=Lower('email')).filter(email_lower__in=list(duplicates))
+        .order_by('email_lower', 'pk').values_list('pk', 'username', 'email')
+    )
+    if users:
+        raise RuntimeError(
+            'Users share an email differing only by case, change or clear these emails before migrating:\n' +
+            '\n'.join('  user %d (%s): %s' % user for user in users)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_bio'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_email_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_lower_unique'),
+        ),
+    ]
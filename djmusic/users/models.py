@@ -1,5 +1,21 @@
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .hashers import upgrades
 
 class User(AbstractUser):
   bio = models.CharField(max_length=256, blank=True)
+
+  def check_password(self, raw_password):
+    # Outdated hashes are upgraded in the background instead of during the check
+    def setter(raw_password):
+      upgrades.schedule(type(self), self.pk, raw_password, self.password)
+    return check_password(raw_password, self.password, setter)
+
+  class Meta(AbstractUser.Meta):
+    constraints = [
+      # Emails are unique regardless of case, users without email are allowed
+      models.UniqueConstraint(Lower('email'), name='user_email_lower_unique', condition=~Q(email=''))
+    ]
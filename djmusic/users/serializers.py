@@ -1,7 +1,44 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from rest_framework import serializers
 from users.models import User
 
+UNIQUE_MESSAGE = 'This field must be unique.'
+
+# Uniqueness of usernames and emails is enforced by the database, this finds
+# which of them is taken once an insert or update failed (or to report every
+# error of an invalid registration at once)
+def unique_errors(username=None, email=None, exclude_pk=None):
+  conditions = Q()
+  if username:
+    conditions |= Q(username=username)
+  if email:
+    conditions |= Q(email_lower=email.lower())
+  if not conditions:
+    return {}
+  users = User.objects.annotate(email_lower=Lower('email')).filter(conditions)
+  if exclude_pk is not None:
+    users = users.exclude(pk=exclude_pk)
+  errors = {}
+  for found_username, found_email in users.values_list('username', 'email_lower')[:2]:
+    if username and found_username == username:
+      errors['username'] = [UNIQUE_MESSAGE]
+    if email and found_email == email.lower():
+      errors['email'] = [UNIQUE_MESSAGE]
+  return errors
+
 class UserSerializer(serializers.ModelSerializer):
   class Meta:
     model = User
-    fields = ['id', 'username', 'email', 'bio']
\ No newline at end of file
+    fields = ['id', 'username', 'email', 'bio']
+
+  def update(self, instance, validated_data):
+    try:
+      with transaction.atomic():
+        return super().update(instance, validated_data)
+    except IntegrityError:
+      errors = unique_errors(validated_data.get('username'), validated_data.get('email'), exclude_pk=instance.pk)
+      if not errors:
+        raise
+      raise serializers.ValidationError(errors)
@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import detail_entry, store_user_detail, delete_user_detail
+from .models import User
+from .serializers import UserSerializer
+
+# Write-through: the new data is cached once the transaction commits
+@receiver(post_save, sender=User, dispatch_uid='users_detail_cache_save')
+def update_user_detail(sender, instance, update_fields=None, **kwargs):
+  fields = set(UserSerializer.Meta.fields)
+  if update_fields is not None and not fields.intersection(update_fields):
+    return
+  pk = instance.pk
+  if fields & instance.get_deferred_fields():
+    transaction.on_commit(lambda: delete_user_detail(pk))
+  else:
+    entry = detail_entry(instance)
+    transaction.on_commit(lambda: store_user_detail(pk, entry))
+
+@receiver(post_delete, sender=User, dispatch_uid='users_detail_cache_delete')
+def delete_user_detail_on_delete(sender, instance, **kwargs):
+  pk = instance.pk
+  transaction.on_commit(lambda: delete_user_detail(pk))
@@ -1,4 +1,5 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from .test_factories import UserFactory
 
@@ -16,3 +17,9 @@ def create_users():
   def batch_create(n = 3):
     return UserFactory.create_batch(n)
   return batch_create
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+  cache.clear()
+  yield
+  cache.clear()
@@ -0,0 +1,40 @@
+import json
+import pytest
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import path
+from knox.models import AuthToken
+from users.views import AsyncUserDetailView
+
+# Routes of an ASYNC_VIEWS deployment, used through pytest.mark.urls
+urlpatterns = [
+  path('users/<int:pk>/', AsyncUserDetailView.as_view()),
+]
+pytestmark = pytest.mark.urls(__name__)
+
+def request(method, url, data=None, **headers):
+  async def send():
+    client = AsyncClient()
+    if method == 'patch':
+      return await client.patch(url, urlencode(data), content_type='application/x-www-form-urlencoded', **headers)
+    return await client.get(url, **headers)
+  return async_to_sync(send)()
+
+@pytest.mark.django_db
+def test_async_user_detail(create_users, django_assert_num_queries):
+  user = create_users(1)[0]
+  with django_assert_num_queries(1):
+    response = request('get', f'/users/{user.id}/')
+  assert response.status_code == 200
+  assert json.loads(response.content) == {'id': user.id, 'username': user.username, 'email': user.email, 'bio': user.bio}
+  assert request('get', f'/users/{user.id + 1}/').status_code == 404
+
+@pytest.mark.django_db
+def test_async_user_update(create_users):
+  user = create_users(1)[0]
+  instance, token = AuthToken.objects.create(user)
+  assert request('patch', f'/users/{user.id}/', {'username': 'renamed'}).status_code == 401
+  response = request('patch', f'/users/{user.id}/', {'username': 'renamed'}, authorization='Token ' + token)
+  assert response.status_code == 200
+  assert json.loads(request('get', f'/users/{user.id}/').content)['username'] == 'renamed'
@@ -0,0 +1,78 @@
+import pytest
+from urllib.parse import urlencode
+from django.core.cache import cache
+from users.cache import detail_cache_key, detail_stats
+from users.models import User
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+  detail_stats.reset()
+
+@pytest.mark.django_db
+def test_user_detail_is_cached(auth_client, create_users, django_assert_num_queries):
+  user = create_users(1)[0]
+  cache.clear()
+  client = auth_client()
+  response = client.get(f'/users/{user.id}/')
+  with django_assert_num_queries(0):
+    assert client.get(f'/users/{user.id}/').data == response.data
+  assert detail_stats.snapshot() == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
+  assert client.get(f'/users/{user.id + 1}/').status_code == 404
+
+@pytest.mark.django_db
+def test_user_detail_conditional_get(auth_client, create_users, django_capture_on_commit_callbacks):
+  user = create_users(1)[0]
+  client = auth_client()
+  etag = client.get(f'/users/{user.id}/')['ETag']
+  response = client.get(f'/users/{user.id}/', HTTP_IF_NONE_MATCH=etag)
+  assert response.status_code == 304
+  assert response['ETag'] == etag
+
+  with django_capture_on_commit_callbacks(execute=True):
+    user.bio = 'Changed'
+    user.save()
+  response = client.get(f'/users/{user.id}/', HTTP_IF_NONE_MATCH=etag)
+  assert response.status_code == 200
+  assert response['ETag'] != etag
+
+@pytest.mark.django_db
+def test_user_detail_write_through(auth_client, create_users, django_capture_on_commit_callbacks, django_assert_num_queries):
+  user = create_users(1)[0]
+  client = auth_client(user)
+  with django_capture_on_commit_callbacks(execute=True):
+    response = client.patch(f'/users/{user.id}/', urlencode({'bio': 'New bio'}), content_type='application/x-www-form-urlencoded')
+  assert response.status_code == 200
+  with django_assert_num_queries(0):
+    assert client.get(f'/users/{user.id}/').data['bio'] == 'New bio'
+
+@pytest.mark.django_db
+def test_user_detail_ignores_unrelated_saves(create_users, django_capture_on_commit_callbacks):
+  user = create_users(1)[0]
+  with django_capture_on_commit_callbacks(execute=True) as callbacks:
+    user.save(update_fields=['last_login'])
+  assert callbacks == []
+
+@pytest.mark.django_db
+def test_user_detail_deferred_and_deleted(auth_client, create_users, django_capture_on_commit_callbacks):
+  user = create_users(1)[0]
+  client = auth_client()
+  client.get(f'/users/{user.id}/')
+  with django_capture_on_commit_callbacks(execute=True):
+    partial = User.objects.only('id', 'bio').get(pk=user.pk)
+    partial.bio = 'Changed'
+    partial.save()
+  assert cache.get(detail_cache_key(user.pk)) is None
+  assert client.get(f'/users/{user.id}/').data['bio'] == 'Changed'
+  with django_capture_on_commit_callbacks(execute=True):
+    user.delete()
+  assert client.get(f'/users/{user.id}/').status_code == 404
+
+@pytest.mark.django_db
+def test_user_cache_stats_endpoint(auth_client, create_users):
+  user = create_users(1)[0]
+  assert auth_client(user).get('/users/cache-stats/').status_code == 403
+  user.is_staff = True
+  auth_client().get(f'/users/{user.id}/')
+  response = auth_client(user).get('/users/cache-stats/')
+  assert response.status_code == 200
+  assert set(response.data) == {'hits', 'misses', 'hit_ratio'}
@@ -0,0 +1,25 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+def migrate(target):
+  executor = MigrationExecutor(connection)
+  executor.loader.build_graph()
+  executor.migrate([target])
+  return executor.loader.project_state([target]).apps
+
+@pytest.mark.django_db(transaction=True)
+def test_email_constraint_lists_case_duplicates():
+  leaf = MigrationExecutor(connection).loader.graph.leaf_nodes('users')[0]
+  User = migrate(('users', '0002_user_bio')).get_model('users', 'User')
+  first = User.objects.create(username='first', email='Foo@example.com')
+  User.objects.create(username='second', email='foo@example.com')
+  User.objects.create(username='other', email='other@example.com')
+  try:
+    with pytest.raises(RuntimeError) as error:
+      migrate(('users', '0003_email_lower_unique'))
+    assert 'user %d (first): Foo@example.com' % first.pk in str(error.value)
+    assert 'second' in str(error.value) and 'other' not in str(error.value)
+    User.objects.filter(pk=first.pk).update(email='')
+  finally:
+    migrate(leaf)
@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from rest_framework.urlpatterns import format_suffix_patterns
 
 app_name = 'users'
 urlpatterns = [
-  path('<int:pk>/', views.UserDetailView.as_view(), name='user_details'),  
+  path('<int:pk>/', (views.AsyncUserDetailView if settings.ASYNC_VIEWS else views.UserDetailView).as_view(), name='user_details'),
+  path('cache-stats/', views.UserCacheStatsView.as_view(), name='cache_stats'),
 ]
 urlpatterns = format_suffix_patterns(urlpatterns)
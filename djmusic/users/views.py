@@ -1,6 +1,14 @@
-from rest_framework import generics
+from django.http import JsonResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from users.models import User
+from .cache import get_user_detail, aget_user_detail, detail_stats
 from .serializers import UserSerializer
+from authentication.asyncviews import AsyncAPIView
 from rest_framework.permissions import BasePermission
 
 class IsAuthenticatedOrReadOnly(BasePermission):
@@ -14,9 +22,42 @@ class IsAuthenticatedOrReadOnly(BasePermission):
 
     return True
 
+def not_modified(request, etag):
+  if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+  return etag in if_none_match or '*' in if_none_match
+
 class UserDetailView(generics.RetrieveUpdateAPIView):
   serializer_class = UserSerializer
   queryset = User.objects.all()
   permission_classes = [IsAuthenticatedOrReadOnly]
-  
-  
+  read_replica = True
+
+  # Served from the user detail cache (see users.cache), which is updated on every save
+  def retrieve(self, request, *args, **kwargs):
+    entry = get_user_detail(kwargs['pk'])
+    if entry is None:
+      raise NotFound()
+    data, etag = entry
+    if not_modified(request, etag):
+      return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag})
+
+class UserCacheStatsView(APIView):
+  permission_classes = [IsAdminUser]
+
+  # Hits and misses of the user detail cache in the process answering the request
+  def get(self, request, format=None):
+    return Response(detail_stats.snapshot())
+
+class AsyncUserDetailView(AsyncAPIView):
+  sync_view = UserDetailView
+  read_replica = True
+
+  async def get(self, request, pk):
+    entry = await aget_user_detail(pk)
+    if entry is None:
+      return JsonResponse({'detail': 'Not found.'}, status=404)
+    data, etag = entry
+    if not_modified(request, etag):
+      return HttpResponseNotModified(headers={'ETag': etag})
+    return JsonResponse(data, headers={'ETag': etag})